@@ -0,0 +1,296 @@
+# benchmarks/load_sim.py
+
+"""
+Scenario-driven load simulator for the paths that fall over in production.
+
+Drives the real handlers from server.py against a fake Telegram client that
+enforces Bot API style rate limits and answers with FloodWait when they are
+exceeded. Time is virtual: every API call costs ``--rtt-ms`` and
+``asyncio.sleep`` advances the virtual clock instead of blocking, so a
+broadcast over 10k groups finishes in seconds while still reporting the
+wall time it would take against Telegram.
+
+Scenarios:
+    raid        mass joins through handle_new_chat_members
+    broadcast   /broadcast over --groups synthetic groups
+    settings    settings menu of an admin of --admin-groups groups: every page, then a toggle
+    bulk        /bulkban joined 30m after --bulk-targets raiders joined
+
+    python benchmarks/load_sim.py raid --joins 500
+    python benchmarks/load_sim.py broadcast --groups 10000
+    python benchmarks/load_sim.py all --json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+import time
+import tracemalloc
+from collections import Counter, deque
+from unittest import mock
+
+from stubs import OWNER_ID, StubCallbackQuery, StubChat, StubClient, StubMessage, StubUser, setup_environment
+
+setup_environment()
+
+from pyrogram.errors import FloodWait  # noqa: E402
+
+import database  # noqa: E402
+import server  # noqa: E402
+from bulk_actions import RecentUsers  # noqa: E402
+from ratelimit import OutboundLimiter  # noqa: E402
+
+# Telegram भेजने वाले तरीकों पर सख्त सीमाएँ लगाता है
+SEND_METHODS = frozenset({
+    "send_message", "send_photo", "edit_message_text", "edit_message_caption", "delete_messages",
+    "ban_chat_member", "unban_chat_member", "restrict_chat_member",
+})
+# ग्रुप की 20/मिनट वाली सीमा सिर्फ़ ग्रुप में मैसेज डालने/बदलने पर; बैन और डिलीट पर सिर्फ़ कुल सीमा
+GROUP_POST_METHODS = frozenset({"send_message", "send_photo", "edit_message_text", "edit_message_caption"})
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+
+
+class SlidingWindowLimit:
+    """At most ``limit`` calls per ``window`` seconds of virtual time."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._calls: deque[float] = deque()
+
+    def check(self, now: float) -> float:
+        """Returns 0 if the call is allowed (and records it), else the seconds to wait."""
+        while self._calls and self._calls[0] <= now - self.window:
+            self._calls.popleft()
+        if len(self._calls) >= self.limit:
+            return self._calls[0] + self.window - now
+        self._calls.append(now)
+        return 0.0
+
+
+class FakeTelegramClient(StubClient):
+    """
+    StubClient with Bot API rate limits on a virtual clock.
+
+    Sending methods are limited globally (``global_rps``), posts into a group
+    also per group (``group_per_minute``); all other methods share ``read_rps``. A call over
+    the limit raises FloodWait with the remaining wait, like Telegram does.
+    """
+
+    def __init__(self, clock: VirtualClock, rtt: float, global_rps: int = 30, group_per_minute: int = 20,
+                 read_rps: int = 200, **kwargs):
+        super().__init__(**kwargs)
+        self.clock = clock
+        self.rtt = rtt
+        self.group_per_minute = group_per_minute
+        self._global_send = SlidingWindowLimit(global_rps, 1.0)
+        self._reads = SlidingWindowLimit(read_rps, 1.0)
+        self._group_send: dict[int, SlidingWindowLimit] = {}
+        self.flood_waits = Counter()
+        self.flood_wait_seconds = 0
+
+    def _record(self, method: str, chat_id: int | None = None):
+        super()._record(method, chat_id)
+        self.clock.advance(self.rtt)
+        if method in SEND_METHODS:
+            wait = self._global_send.check(self.clock.now)
+            if not wait and method in GROUP_POST_METHODS and chat_id is not None and chat_id < 0:
+                limit = self._group_send.get(chat_id)
+                if limit is None:
+                    limit = self._group_send[chat_id] = SlidingWindowLimit(self.group_per_minute, 60.0)
+                wait = limit.check(self.clock.now)
+        else:
+            wait = self._reads.check(self.clock.now)
+        if wait:
+            seconds = max(1, math.ceil(wait))
+            self.flood_waits[method] += 1
+            self.flood_wait_seconds += seconds
+            raise FloodWait(value=seconds)
+
+
+def unwrap(handler):
+    return getattr(handler, "__wrapped__", handler)
+
+
+async def scenario_raid(client: FakeTelegramClient, args) -> dict:
+    chat_id = -1002000000000
+    database.add_or_update_group(chat_id, "Raided Group", OWNER_ID)
+    handler = unwrap(server.handle_new_chat_members)
+    chat = StubChat(chat_id, "Raided Group")
+    batch = max(1, args.join_batch)
+    handled_errors = 0
+    for start in range(0, args.joins, batch):
+        members = [StubUser(500_000 + i, f"Raider{i}", f"raider{i}", is_bot=(i % 10 == 0)) for i in range(start, min(start + batch, args.joins))]
+        message = StubMessage(client, chat, members[0], None, message_id=start + 1, new_chat_members=members)
+        try:
+            await handler(client, message)
+        except FloodWait:
+            handled_errors += 1
+    return {"join_events": math.ceil(args.joins / batch), "members": args.joins, "unhandled_floodwaits": handled_errors}
+
+
+async def scenario_broadcast(client: FakeTelegramClient, args) -> dict:
+    database.storage.import_documents("groups", [
+        {"_id": -1003000000000 - i, "title": f"Group {i}", "bot_enabled": True} for i in range(args.groups)
+    ])
+    owner = StubUser(OWNER_ID, "Owner", "owner")
+    text = "/broadcast scheduled maintenance tonight"
+    message = StubMessage(client, StubChat(OWNER_ID, "Owner"), owner, text, command=text[1:].split())
+    await unwrap(server.broadcast_command)(client, message)
+    return {"groups": args.groups}
+
+
+async def scenario_settings(client: FakeTelegramClient, args) -> dict:
+    admin_id = 777
+    admin = StubUser(admin_id, "Admin", "admin")
+    # एडमिन के ग्रुप्स के बीच दो-दो ऐसे ग्रुप्स जिनमें वह एडमिन नहीं है
+    groups = [{"_id": -1004000000000 - i, "title": f"Group {i}"} for i in range(args.admin_groups * 3)]
+    database.storage.import_documents("groups", groups)
+    for group in groups[::3]:
+        client.admins.setdefault(group["_id"], set()).add(admin_id)
+
+    async def press(message, data: str):
+        await server.callback_router.dispatch(client, StubCallbackQuery(message, admin, data))
+
+    # /start मेनू का "सेटिंग्स" बटन
+    menu = StubMessage(client, StubChat(admin_id, "Admin"), client.me, "menu")
+    await press(menu, "settings")
+    pages, listed, first_group = 1, 0, None
+    while True:
+        buttons = [button for row in menu.reply_markup.inline_keyboard for button in row]
+        group_buttons = [button for button in buttons if button.callback_data.startswith("sel:")]
+        listed += len(group_buttons)
+        first_group = first_group or group_buttons[0].callback_data
+        next_page = next((button.callback_data for button in buttons if button.callback_data.startswith("setp:")), None)
+        if next_page is None:
+            break
+        await press(menu, next_page)
+        pages += 1
+
+    await press(menu, first_group)
+    toggle = next(button.callback_data for row in menu.reply_markup.inline_keyboard for button in row if button.callback_data.startswith("tgl:"))
+    await press(menu, toggle)
+    # दोबारा वही ग्रुप खोलना: मेनू पहले जैसा है, एडिट नहीं भेजा जाता
+    await press(menu, first_group)
+    await press(menu, first_group)
+    return {
+        "admin_groups": args.admin_groups,
+        "pages": pages,
+        "groups_listed": listed,
+        "edits_skipped": server.shown_menus.cache_hits,
+    }
+
+
+async def scenario_bulk(client: FakeTelegramClient, args) -> dict:
+    chat_id, admin_id = -1005000000000, 888
+    chat = StubChat(chat_id, "Raided Group")
+    database.add_or_update_group(chat_id, "Raided Group", admin_id)
+    client.admins.setdefault(chat_id, set()).add(admin_id)
+    for i in range(args.bulk_targets):
+        server.recent_joins.record(chat_id, 600_000 + i)
+    text = "/bulkban joined 30m"
+    message = StubMessage(client, chat, StubUser(admin_id, "Admin", "admin"), text, command=text[1:].split())
+    await unwrap(server.bulk_moderation_command)(client, message)
+    job = server.bulk_jobs.get(chat_id)
+    if job is not None:
+        await job
+    return {
+        "targets": args.bulk_targets,
+        "banned": client.api_calls["ban_chat_member"],
+        "limiter_waited_seconds": round(server.outbound_limiter.waited_seconds, 2),
+    }
+
+
+SCENARIOS = {
+    "raid": scenario_raid,
+    "broadcast": scenario_broadcast,
+    "settings": scenario_settings,
+    "bulk": scenario_bulk,
+}
+
+
+def reset_database():
+    database.storage.clear()
+
+
+def run_scenario(name: str, args) -> dict:
+    reset_database()
+    clock = VirtualClock()
+    client = FakeTelegramClient(clock, args.rtt_ms / 1000, args.global_rps, args.group_per_minute, args.read_rps)
+    # लिमिटर और हाल के यूज़र भी वर्चुअल घड़ी पर, हर सीनारियो के लिए नए
+    server.outbound_limiter = OutboundLimiter(clock=lambda: clock.now)
+    server.recent_joins = RecentUsers()
+    real_sleep = asyncio.sleep
+
+    async def virtual_sleep(delay, result=None):
+        clock.advance(delay)
+        await real_sleep(0)
+        return result
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with mock.patch.object(asyncio, "sleep", virtual_sleep):
+        details = asyncio.run(SCENARIOS[name](client, args))
+    real_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "simulated_wall_seconds": round(clock.now, 2),
+        "real_seconds": round(real_seconds, 3),
+        "api_calls": client.total_api_calls(),
+        "api_calls_by_method": dict(client.api_calls),
+        "floodwaits": sum(client.flood_waits.values()),
+        "floodwait_seconds": client.flood_wait_seconds,
+        "peak_memory_mb": round(peak / (1024 * 1024), 2),
+        **details,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scenario", choices=[*SCENARIOS, "all"])
+    parser.add_argument("--joins", type=int, default=300, help="raid: members joining")
+    parser.add_argument("--join-batch", type=int, default=5, help="raid: members per join event")
+    parser.add_argument("--groups", type=int, default=10_000, help="broadcast: groups in the database")
+    parser.add_argument("--admin-groups", type=int, default=300, help="settings: groups the admin manages")
+    parser.add_argument("--bulk-targets", type=int, default=1000, help="bulk: recent joiners to ban")
+    parser.add_argument("--rtt-ms", type=float, default=40.0, help="virtual latency of one API call")
+    parser.add_argument("--global-rps", type=int, default=30, help="send limit across all chats per second")
+    parser.add_argument("--group-per-minute", type=int, default=20, help="send limit per group per minute")
+    parser.add_argument("--read-rps", type=int, default=200, help="limit for non-send methods per second")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="keep the handlers' error logs (FloodWait etc.)")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.ERROR)
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = [run_scenario(name, args) for name in names]
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        for result in results:
+            print(f"== {result['scenario']} ==")
+            for key, value in result.items():
+                if key != "scenario":
+                    print(f"  {key:<24} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# benchmarks/stubs.py
+
+"""
+Stub Pyrogram objects and environment setup shared by the offline benchmarks.
+
+Nothing here talks to Telegram or a real MongoDB: ``setup_environment()``
+points database.py at mongomock and fills in dummy credentials, so that
+``import server`` works on a CI runner.
+"""
+
+import os
+import sys
+from collections import Counter
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOT_ID = 999000
+OWNER_ID = 1
+
+
+def setup_environment():
+    """Sets dummy config values (without overriding real ones) and makes the repo importable."""
+    defaults = {
+        "BOT_TOKEN": f"{BOT_ID}:benchmark",
+        "API_ID": "1",
+        "API_HASH": "benchmark",
+        "CASE_LOG_CHANNEL_ID": "-1000000000001",
+        "NEW_USER_GROUP_LOG_CHANNEL_ID": "-1000000000002",
+        "OWNER_ID": str(OWNER_ID),
+        "MONGODB_URI": "mongomock://benchmark",
+        "LOG_FILE": "",
+        "LOG_LEVEL": "WARNING",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+
+class StubUser(SimpleNamespace):
+    def __init__(self, user_id: int, first_name: str = "User", username: str | None = None, is_bot: bool = False, bio: str | None = None):
+        super().__init__(id=user_id, first_name=first_name, last_name=None, username=username, is_bot=is_bot, bio=bio)
+
+    @property
+    def mention(self) -> str:
+        return f"[{self.first_name}](tg://user?id={self.id})"
+
+
+class StubChat(SimpleNamespace):
+    def __init__(self, chat_id: int, title: str = "Benchmark Group", username: str | None = None):
+        from pyrogram.enums import ChatType
+        super().__init__(id=chat_id, title=title, username=username, type=ChatType.SUPERGROUP)
+
+
+class StubClient:
+    """
+    Records every awaited API method instead of calling Telegram.
+
+    Known methods return plausible objects; any other method is accepted and
+    returns None, so handlers never fail on an unexpected call.
+    """
+
+    def __init__(self, admins: dict[int, set[int]] | None = None, bios: dict[int, str] | None = None):
+        self.me = StubUser(BOT_ID, "PoliceBot", "police_bot", is_bot=True)
+        self.api_calls = Counter()
+        self.admins = admins or {}
+        self.bios = bios or {}
+        self._next_message_id = 1_000_000
+
+    def _record(self, method: str, chat_id: int | None = None):
+        self.api_calls[method] += 1
+
+    def total_api_calls(self) -> int:
+        return sum(self.api_calls.values())
+
+    def _new_message(self, chat_id: int, text: str | None = None):
+        self._next_message_id += 1
+        return StubMessage(self, StubChat(chat_id), self.me, text or "", message_id=self._next_message_id)
+
+    async def get_chat_member(self, chat_id: int, user_id: "int | str"):
+        from pyrogram.enums import ChatMemberStatus
+        from pyrogram.errors import UserNotParticipant
+        self._record("get_chat_member", chat_id)
+        if isinstance(user_id, str):
+            # @username से पूछे गए यूज़र (प्रमोशन वाले चैनल) ग्रुप के सदस्य नहीं माने जाते
+            raise UserNotParticipant()
+        is_admin = user_id == self.me.id or user_id in self.admins.get(chat_id, ())
+        return SimpleNamespace(
+            status=ChatMemberStatus.ADMINISTRATOR if is_admin else ChatMemberStatus.MEMBER,
+            can_delete_messages=True,
+            can_restrict_members=True
+        )
+
+    async def get_chat_members(self, chat_id: int, *args, **kwargs):
+        from pyrogram.enums import ChatMemberStatus
+        self._record("get_chat_members", chat_id)
+        for user_id in self.admins.get(chat_id, ()):
+            yield SimpleNamespace(user=StubUser(user_id), status=ChatMemberStatus.ADMINISTRATOR)
+
+    async def get_users(self, user_ids):
+        self._record("get_users")
+        if isinstance(user_ids, (list, tuple)):
+            return [StubUser(user_id, bio=self.bios.get(user_id)) for user_id in user_ids]
+        return StubUser(user_ids, bio=self.bios.get(user_ids))
+
+    async def get_chat(self, chat_id: int):
+        self._record("get_chat", chat_id)
+        return StubChat(chat_id)
+
+    async def send_message(self, chat_id: int, text: str, *args, **kwargs):
+        self._record("send_message", chat_id)
+        return self._new_message(chat_id, text)
+
+    async def delete_messages(self, chat_id: int, message_ids, *args, **kwargs):
+        self._record("delete_messages", chat_id)
+        return True
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        async def method(*args, **kwargs):
+            chat_id = kwargs.get("chat_id", args[0] if args and isinstance(args[0], int) else None)
+            self._record(name, chat_id)
+        return method
+
+
+class StubMessage(SimpleNamespace):
+    """The subset of pyrogram.types.Message that the handlers read."""
+
+    def __init__(self, client: StubClient, chat: StubChat, from_user: StubUser, text: str | None, message_id: int = 1, **fields):
+        attributes = dict(
+            _client=client, id=message_id, chat=chat, from_user=from_user, text=text,
+            caption=None, entities=None, caption_entities=None, reply_markup=None,
+            forward_from=None, forward_from_chat=None, sticker=None, via_bot=None,
+            edit_date=None, reply_to_message=None, new_chat_members=None, left_chat_member=None,
+            command=None, photo=None
+        )
+        attributes.update(fields)
+        super().__init__(**attributes)
+
+    async def delete(self, *args, **kwargs):
+        self._client._record("delete_messages", self.chat.id)
+        return True
+
+    async def reply_text(self, text: str, *args, **kwargs):
+        self._client._record("send_message", self.chat.id)
+        return self._client._new_message(self.chat.id, text)
+
+    async def edit_text(self, text: str, *args, **kwargs):
+        self._client._record("edit_message_text", self.chat.id)
+        self.text = text
+        self.reply_markup = kwargs.get("reply_markup")
+        return self
+
+    async def edit_caption(self, caption: str, *args, **kwargs):
+        self._client._record("edit_message_caption", self.chat.id)
+        self.caption = caption
+        self.reply_markup = kwargs.get("reply_markup")
+        return self
+
+
+class StubCallbackQuery(SimpleNamespace):
+    """A button press on ``message``; ``answer`` is recorded like the other API calls."""
+
+    def __init__(self, message: StubMessage, from_user: StubUser, data: str):
+        super().__init__(message=message, from_user=from_user, data=data)
+
+    async def answer(self, *args, **kwargs):
+        self.message._client._record("answer_callback_query")
+        return True
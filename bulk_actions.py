@@ -0,0 +1,167 @@
+# bulk_actions.py
+#
+# रेड के बाद सफ़ाई: बहुत से यूज़र्स पर एक ही कार्रवाई (बैन/किक/म्यूट/चेतावनी), OutboundLimiter से
+# सीमित रफ़्तार और सीमित समानांतर कॉल के साथ।
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+
+from ratelimit import OutboundLimiter
+from warn_ladder import parse_duration
+
+logger = logging.getLogger(__name__)
+
+# /bulkmute का पहला तर्क अवधि तभी है जब वह `30m`/`2h`/`1d` जैसा हो, वरना `joined`/`flagged` भी अवधि मान लिए जाते
+_DURATION_ARG = re.compile(r"\d+[mhd]", re.IGNORECASE)
+
+
+class RecentUsers:
+    """
+    Per chat, the users recorded in the last ``ttl`` seconds (joins, or users
+    flagged by the spam checks), newest last. In memory only: a chat is
+    always handled by the same process, also in sharded mode.
+    """
+
+    def __init__(self, ttl: float = 86400, max_per_chat: int = 5000, max_chats: int = 4096):
+        self.ttl = ttl
+        self.max_per_chat = max_per_chat
+        self.max_chats = max_chats
+        self._chats: OrderedDict[int, OrderedDict[int, float]] = OrderedDict()
+
+    def record(self, chat_id: int, user_id: int):
+        users = self._chats.get(chat_id)
+        if users is None:
+            users = self._chats[chat_id] = OrderedDict()
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        users[user_id] = time.monotonic()
+        users.move_to_end(user_id)
+        while len(users) > self.max_per_chat:
+            users.popitem(last=False)
+
+    def since(self, chat_id: int, seconds: float | None = None) -> list[int]:
+        """Users recorded in the last ``seconds`` (default: ``ttl``), oldest first."""
+        users = self._chats.get(chat_id)
+        if not users:
+            return []
+        cutoff = time.monotonic() - min(seconds or self.ttl, self.ttl)
+        return [user_id for user_id, recorded_at in users.items() if recorded_at >= cutoff]
+
+    def discard(self, chat_id: int, user_ids):
+        users = self._chats.get(chat_id)
+        if users:
+            for user_id in user_ids:
+                users.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return sum(len(users) for users in self._chats.values())
+
+
+class PartialFailure(Exception):
+    """The action was only partly applied; the message (for the user) says how far it got."""
+
+
+def parse_bulk_args(args: list[str], with_duration: bool = False) -> tuple:
+    """
+    Parses the arguments of a bulk command into ``(source, value, duration)``:
+
+        /bulkban 111 222 333          -> ("ids", [111, 222, 333], None)
+        /bulkban joined 30m           -> ("joined", 1800, None)
+        /bulkkick flagged [2h]        -> ("flagged", 7200 or None, None)
+        /bulkmute 1d joined 30m       -> ("joined", 1800, 86400)
+        /bulkmute joined 30m          -> ("joined", 1800, None)
+        /bulkmute flagged [2h]        -> ("flagged", 7200 or None, None)
+
+    With ``with_duration`` a first argument like ``1h`` is the mute
+    duration (none means forever). Raises ValueError with a message for the user.
+    """
+    duration = None
+    if with_duration and args and _DURATION_ARG.fullmatch(args[0]):
+        duration, args = parse_duration(args[0]), args[1:]
+    if not args:
+        raise ValueError("यूज़र ID की सूची, `joined <समय>` या `flagged` दें।")
+
+    source = args[0].lower()
+    if source == "joined":
+        if len(args) != 2:
+            raise ValueError("उदाहरण: `joined 30m` (पिछले 30 मिनट में जुड़े सभी)")
+        return "joined", parse_duration(args[1]), duration
+    if source == "flagged":
+        if len(args) > 2:
+            raise ValueError("उदाहरण: `flagged` या `flagged 2h`")
+        return "flagged", parse_duration(args[1]) if len(args) == 2 else None, duration
+
+    user_ids = []
+    for arg in args:
+        if not arg.isdigit():
+            raise ValueError(f"अमान्य यूज़र ID: `{arg}`")
+        if int(arg) not in user_ids:
+            user_ids.append(int(arg))
+    return "ids", user_ids, duration
+
+
+class BulkJob:
+    """
+    Applies ``action(target)`` to every target (user ids for the bulk
+    commands, group ids for federation bans) through ``limiter`` with at
+    most ``concurrency`` calls in flight.
+
+    ``on_progress(job)`` is awaited at most every ``progress_interval``
+    seconds while the job runs. Counters stay valid if the task running
+    ``run`` is cancelled, so a stopped job can still report how far it got.
+    """
+
+    def __init__(self, targets: list[int], action, limiter: OutboundLimiter, concurrency: int = 4,
+                 retries: int = 2, on_progress=None, progress_interval: float = 5.0):
+        self.targets = targets
+        self.action = action
+        self.limiter = limiter
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.done = 0
+        self.failed: dict[int, str] = {}
+        self.started_at = limiter.clock()
+        self._last_progress = self.started_at
+
+    @property
+    def total(self) -> int:
+        return len(self.targets)
+
+    @property
+    def finished(self) -> int:
+        return self.done + len(self.failed)
+
+    def elapsed(self) -> float:
+        return self.limiter.clock() - self.started_at
+
+    async def run(self):
+        pending = iter(self.targets)
+        await asyncio.gather(*(self._worker(pending) for _ in range(min(self.concurrency, self.total))))
+
+    async def _worker(self, pending):
+        # सारे वर्कर एक ही iterator से लेते हैं: हज़ारों यूज़र्स के लिए हज़ारों टास्क नहीं बनते
+        for target in pending:
+            try:
+                await self.limiter.call(self.action, target, retries=self.retries)
+                self.done += 1
+            except Exception as e:
+                self.failed[target] = str(e) if isinstance(e, PartialFailure) else type(e).__name__
+                logger.debug("Bulk action failed for %s: %s", target, e)
+            await self._maybe_report()
+
+    async def _maybe_report(self):
+        if self.on_progress is None or self.finished == self.total:
+            return
+        now = self.limiter.clock()
+        if now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        try:
+            await self.on_progress(self)
+        except Exception as e:
+            logger.warning(f"Bulk job progress update failed: {e}")
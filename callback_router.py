@@ -0,0 +1,129 @@
+# callback_router.py
+
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Telegram callback_data की अधिकतम लंबाई (bytes में)
+CALLBACK_DATA_MAX_BYTES = 64
+SEPARATOR = ":"
+
+
+class CallbackPayload(NamedTuple):
+    """A parsed button press: the route prefix and its typed arguments."""
+    prefix: str
+    args: tuple
+
+
+class _Route(NamedTuple):
+    handler: Callable[..., Awaitable]
+    arg_types: tuple
+
+
+def _encode_arg(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    text = str(value)
+    if SEPARATOR in text:
+        raise ValueError(f"Callback argument '{text}' must not contain '{SEPARATOR}'.")
+    return text
+
+
+def _decode_arg(arg_type: type, raw: str):
+    if arg_type is bool:
+        if raw not in ("0", "1"):
+            raise ValueError(f"Invalid bool callback argument '{raw}'.")
+        return raw == "1"
+    if arg_type is str:
+        if not raw:
+            raise ValueError("Empty string callback argument.")
+        return raw
+    return arg_type(raw)
+
+
+class CallbackRouter:
+    """
+    Prefix-based dispatcher for inline button callbacks.
+
+    Callback data has the compact form ``prefix:arg1:arg2``. Every prefix is
+    registered with the types of its arguments, so a button press is split
+    once, validated against that schema and dispatched with one dict lookup.
+    Parsed payloads are cached per (chat, message, data), so repeated presses
+    on the same menu skip parsing entirely.
+    """
+
+    def __init__(self, cache_size: int = 2048):
+        self._routes: dict[str, _Route] = {}
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def route(self, prefix: str, *arg_types: type):
+        """Registers a coroutine ``handler(client, callback_query, *args)`` for ``prefix``."""
+        if not prefix or SEPARATOR in prefix:
+            raise ValueError(f"Invalid callback prefix '{prefix}'.")
+        if prefix in self._routes:
+            raise ValueError(f"Callback prefix '{prefix}' is already registered.")
+
+        def decorator(func):
+            self._routes[prefix] = _Route(func, arg_types)
+            return func
+        return decorator
+
+    def build(self, prefix: str, *args) -> str:
+        """Builds callback data for ``prefix``, checking it against the registered schema."""
+        route = self._routes.get(prefix)
+        if route is not None and len(args) != len(route.arg_types):
+            raise ValueError(f"Callback '{prefix}' expects {len(route.arg_types)} arguments, got {len(args)}.")
+        data = SEPARATOR.join([prefix, *(_encode_arg(arg) for arg in args)])
+        if len(data.encode("utf-8")) > CALLBACK_DATA_MAX_BYTES:
+            raise ValueError(f"Callback data '{data}' exceeds {CALLBACK_DATA_MAX_BYTES} bytes.")
+        return data
+
+    def parse(self, data: str | None, cache_key: tuple | None = None) -> CallbackPayload | None:
+        """Parses and validates callback data. Returns None for unknown or malformed data."""
+        if not data:
+            return None
+
+        if cache_key is not None:
+            key = (*cache_key, data)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+
+        prefix, _, rest = data.partition(SEPARATOR)
+        route = self._routes.get(prefix)
+        if route is None:
+            return None
+
+        raw_args = rest.split(SEPARATOR) if rest else []
+        if len(raw_args) != len(route.arg_types):
+            return None
+        try:
+            args = tuple(_decode_arg(arg_type, raw) for arg_type, raw in zip(route.arg_types, raw_args))
+        except ValueError:
+            return None
+
+        payload = CallbackPayload(prefix, args)
+        if cache_key is not None:
+            self._cache[key] = payload
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return payload
+
+    async def dispatch(self, client, callback_query) -> bool:
+        """Routes a callback query to its handler. Returns False if the data was not recognised."""
+        message = callback_query.message
+        cache_key = (message.chat.id, message.id) if message else None
+        payload = self.parse(callback_query.data, cache_key)
+        if payload is None:
+            logger.warning(f"Unrecognised callback data '{callback_query.data}' from user {callback_query.from_user.id}.")
+            return False
+        await self._routes[payload.prefix].handler(client, callback_query, *payload.args)
+        return True
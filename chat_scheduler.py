@@ -0,0 +1,140 @@
+# chat_scheduler.py
+
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+
+from metrics import HANDLER_ERRORS, HANDLER_SECONDS, QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def update_chat_id(update) -> int:
+    """Returns the chat an update belongs to (Message, CallbackQuery, ChatMemberUpdated)."""
+    message = getattr(update, "message", None)
+    if message is not None and getattr(message, "chat", None) is not None:
+        return message.chat.id  # CallbackQuery
+    chat = getattr(update, "chat", None)
+    if chat is not None:
+        return chat.id
+    from_user = getattr(update, "from_user", None)
+    return from_user.id if from_user else 0
+
+
+class ChatScheduler:
+    """
+    Per-chat update scheduler on top of Pyrogram's dispatcher.
+
+    Wrapped handlers do not run on Pyrogram's worker that received the update;
+    the update is put on its chat's queue and a fixed pool of workers picks
+    chats round-robin. A chat never has more than ``per_chat_concurrency``
+    handlers in flight, so one raided group cannot occupy every worker while
+    the other groups wait.
+    """
+
+    def __init__(self, workers: int = 16, per_chat_concurrency: int = 2, max_queue_per_chat: int = 500):
+        self.workers = workers
+        self.per_chat_concurrency = per_chat_concurrency
+        self.max_queue_per_chat = max_queue_per_chat
+        self._queues: dict[int, deque] = {}
+        self._in_flight: dict[int, int] = {}
+        self._ready: deque[int] = deque()
+        self._ready_set: set[int] = set()
+        self._ready_count: asyncio.Semaphore | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.processed = 0
+        self.dropped = 0
+
+    def start(self):
+        """Starts the worker pool on the running event loop (idempotent)."""
+        if self._tasks:
+            return
+        self._ready_count = asyncio.Semaphore(0)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"chat-scheduler-{i}") for i in range(self.workers)]
+        logger.info(f"Chat scheduler started with {self.workers} workers, {self.per_chat_concurrency} in-flight per chat.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, chat_id: int, job, name: str = "job") -> bool:
+        """Queues ``job`` (a zero-argument coroutine function) for ``chat_id``. Returns False if dropped."""
+        if not self._tasks:
+            self.start()
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+        if len(queue) >= self.max_queue_per_chat:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"[{chat_id}] Update queue full ({len(queue)}); dropping updates. Total dropped: {self.dropped}.")
+            return False
+        queue.append((job, name, time.perf_counter()))
+        self._mark_ready(chat_id)
+        return True
+
+    def handler(self, func):
+        """Decorator for Pyrogram handlers: runs them through the per-chat queues."""
+        @functools.wraps(func)
+        async def wrapper(client, update):
+            chat_id = update_chat_id(update)
+            self.submit(chat_id, functools.partial(func, client, update), func.__name__)
+        return wrapper
+
+    def _mark_ready(self, chat_id: int):
+        if chat_id in self._ready_set or not self._queues.get(chat_id):
+            return
+        if self._in_flight.get(chat_id, 0) >= self.per_chat_concurrency:
+            return
+        self._ready.append(chat_id)
+        self._ready_set.add(chat_id)
+        self._ready_count.release()
+
+    async def _worker(self):
+        while True:
+            await self._ready_count.acquire()
+            chat_id = self._ready.popleft()
+            self._ready_set.discard(chat_id)
+            queue = self._queues.get(chat_id)
+            if not queue:
+                continue
+
+            job, name, enqueued_at = queue.popleft()
+            started_at = time.perf_counter()
+            QUEUE_WAIT_SECONDS.observe(started_at - enqueued_at)
+            self._in_flight[chat_id] = self._in_flight.get(chat_id, 0) + 1
+            # Back of the line: other chats get a turn before this chat's next update.
+            self._mark_ready(chat_id)
+            try:
+                await job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                HANDLER_ERRORS.inc(handler=name)
+                logger.error(f"[{chat_id}] Unhandled error in {name}: {e}", exc_info=True)
+            finally:
+                HANDLER_SECONDS.observe(time.perf_counter() - started_at, handler=name)
+                self.processed += 1
+                self._in_flight[chat_id] -= 1
+                if not self._in_flight[chat_id] and not queue:
+                    del self._in_flight[chat_id]
+                    self._queues.pop(chat_id, None)
+                else:
+                    self._mark_ready(chat_id)
+
+    # --- Reporting ---
+    def total_queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def queue_depths(self, top: int = 10) -> list[tuple[int, int]]:
+        """Returns the ``top`` deepest chat queues as (chat_id, depth) pairs."""
+        depths = [(chat_id, len(queue)) for chat_id, queue in self._queues.items() if queue]
+        depths.sort(key=lambda item: item[1], reverse=True)
+        return depths[:top]
+
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 import logging
 import sys
 
+from log_setup import setup_logging, parse_module_levels
+
 load_dotenv()
 
 # --- Core Bot Settings ---
@@ -26,19 +28,90 @@ WELCOME_MESSAGE_DEFAULT = "👋 नमस्ते {username}! {groupname} म
 BOT_PHOTO_URL = os.getenv("BOT_PHOTO_URL", "https://envs.sh/PX8.jpg")
 REPO_LINK = "https://github.com/your-github-username/your-repo-name"
 
+# --- Sharding ---
+# SHARD_COUNT > 1 हो तो `python sharding.py` चलाएँ: कोऑर्डिनेटर अपडेट को chat_id % SHARD_COUNT वाले
+# वर्कर प्रोसेस को भेजता है। SHARD_ID कोऑर्डिनेटर हर वर्कर के लिए खुद सेट करता है।
+SHARD_COUNT = max(1, int(os.getenv("SHARD_COUNT", 1)))
+SHARD_ID = int(os.getenv("SHARD_ID")) if os.getenv("SHARD_ID") else None
+
+# --- Health Server ---
+PORT = int(os.getenv("PORT", 8000))
+if SHARD_ID is not None:
+    PORT += 1 + SHARD_ID # कोऑर्डिनेटर PORT पर, वर्कर k अपने PORT+1+k पर (हर प्रोसेस के अपने /metrics)
+
+# --- Startup ---
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "false").lower() in ("1", "true", "yes") # हर स्टार्टअप चरण का समय लॉग करें
+
 # --- Cooldowns ---
 COMMAND_COOLDOWN_TIME = int(os.getenv("COMMAND_COOLDOWN_TIME", 5))
 
+# --- Update Scheduling ---
+# कुल कितने वर्कर अपडेट प्रोसेस करेंगे, और एक चैट के कितने हैंडलर एक साथ चल सकते हैं
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", 16))
+PER_CHAT_CONCURRENCY = int(os.getenv("PER_CHAT_CONCURRENCY", 2))
+PER_CHAT_QUEUE_LIMIT = int(os.getenv("PER_CHAT_QUEUE_LIMIT", 500))
+
+# --- Cross-Chat Spam Fingerprints ---
+# एक जैसा (या लगभग एक जैसा) मैसेज TTL के अंदर MIN_USERS यूज़र कम से कम MIN_CHATS ग्रुप्स में भेजें,
+# या एक ही यूज़र MIN_REPEATS बार भेजे, तो स्पैम माना जाएगा
+SPAM_FINGERPRINT_TTL = int(os.getenv("SPAM_FINGERPRINT_TTL", 600))
+SPAM_FINGERPRINT_MAX_CLUSTERS = int(os.getenv("SPAM_FINGERPRINT_MAX_CLUSTERS", 50_000))
+SPAM_DUPLICATE_MIN_USERS = int(os.getenv("SPAM_DUPLICATE_MIN_USERS", 3))
+SPAM_DUPLICATE_MIN_CHATS = int(os.getenv("SPAM_DUPLICATE_MIN_CHATS", 2))
+SPAM_DUPLICATE_MIN_REPEATS = int(os.getenv("SPAM_DUPLICATE_MIN_REPEATS", 5))
+SPAM_FINGERPRINT_MIN_LENGTH = int(os.getenv("SPAM_FINGERPRINT_MIN_LENGTH", 40)) # छोटे मैसेज ("good morning") पर लागू नहीं
+
+# --- Content Analysis Offload ---
+# ANALYSIS_PROCESSES > 0 हो तो इससे लंबे टेक्स्ट का विश्लेषण (normalize, SimHash, शब्द-सूची) प्रोसेस पूल में होता है
+ANALYSIS_PROCESSES = int(os.getenv("ANALYSIS_PROCESSES", 0)) # 0 = सब कुछ event loop पर ही
+ANALYSIS_INLINE_MAX_CHARS = int(os.getenv("ANALYSIS_INLINE_MAX_CHARS", 1000))
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", 32)) # एक बार में पूल को कितने टेक्स्ट
+ANALYSIS_BATCH_WINDOW_MS = float(os.getenv("ANALYSIS_BATCH_WINDOW_MS", 2)) # बैच भरने का अधिकतम इंतज़ार
+
+# --- Outbound Rate Limits & Bulk Moderation ---
+# Telegram की सीमा से थोड़ा नीचे: ब्रॉडकास्ट और बल्क कमांड इससे तेज़ API कॉल नहीं करेंगे
+# पूरे बॉट की सीमा: शार्डेड मोड में हर वर्कर इसका 1/SHARD_COUNT हिस्सा लेता है (सब एक ही बॉट टोकन से भेजते हैं)
+OUTBOUND_PER_SECOND = float(os.getenv("OUTBOUND_PER_SECOND", 25))
+OUTBOUND_GROUP_PER_MINUTE = float(os.getenv("OUTBOUND_GROUP_PER_MINUTE", 20)) # एक ग्रुप में भेजे/एडिट किए गए मैसेज
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 4)) # बल्क कमांड की एक साथ चलने वाली कॉल
+BULK_MAX_TARGETS = int(os.getenv("BULK_MAX_TARGETS", 2000)) # एक बल्क कमांड में अधिकतम यूज़र
+BULK_TRACKING_TTL = int(os.getenv("BULK_TRACKING_TTL", 86400)) # `joined`/`flagged` के लिए कितने सेकंड तक याद रखें
+
+# --- Federations ---
+FED_BANS_RELOAD_SECONDS = int(os.getenv("FED_BANS_RELOAD_SECONDS", 300)) # मेमोरी वाली फ़ेड-बैन सूची DB से कितनी देर में दोबारा लोड हो (दूसरे प्रोसेस के बैन के लिए)
+
+# --- Scheduled Jobs ---
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", 100)) # एक साथ ड्यू हुए कितने काम एक बार में उठाए जाएँ
+JOB_MAX_IDLE_SECONDS = float(os.getenv("JOB_MAX_IDLE_SECONDS", 60)) # दूसरे प्रोसेस के जोड़े काम देखने के लिए अधिकतम नींद
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 300)) # उठाया गया काम इतनी देर बाद (प्रोसेस बंद हो जाए तो) फिर ड्यू
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5)) # नाकाम काम कितनी बार तक चलाया जाए
+
+# --- Per-Group Word & Domain Lists ---
+GROUP_LIST_LIMIT = int(os.getenv("GROUP_LIST_LIMIT", 200)) # हर ग्रुप की ब्लॉकलिस्ट/अलाउलिस्ट/डोमेन सूची में अधिकतम मान
+GROUP_SETTINGS_CACHE_SIZE = int(os.getenv("GROUP_SETTINGS_CACHE_SIZE", 4096)) # कितने ग्रुप्स के कंपाइल किए गए मैचर/नीतियाँ मेमोरी में रहें
+MENTION_ALLOWLIST_TTL = int(os.getenv("MENTION_ALLOWLIST_TTL", 600)) # एडमिन/सदस्यता की जानकारी कितने सेकंड तक कैश रहे
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", 50_000)) # कितने मैसेज के नतीजे याद रहें (एडिट पर दोबारा स्कैन से बचने के लिए)
+
 # --- Logging Configuration ---
-logging.getLogger("pyrogram").setLevel(logging.INFO)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("bot_logs.log"),
-        logging.StreamHandler(sys.stdout)
-    ]
+# लॉगिंग QueueHandler के पीछे चलती है; फ़ाइल और stdout पर लिखना अलग थ्रेड में होता है
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "bot_logs.log")
+if SHARD_ID is not None:
+    LOG_FILE = "{0}.shard{2}{1}".format(*os.path.splitext(LOG_FILE), SHARD_ID) # हर वर्कर की अपनी फ़ाइल (रोटेशन एक ही फ़ाइल पर टकराए नहीं)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json") # "json" या "text"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "pyrogram=INFO") # प्रति-मॉड्यूल लेवल, जैसे "pyrogram=WARNING,database=DEBUG"
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", 100)) # प्रति-मैसेज लाइनों में से हर N-वीं लाइन ही लिखी जाएगी
+
+setup_logging(
+    level=LOG_LEVEL,
+    log_file=LOG_FILE,
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    json_format=LOG_FORMAT.lower() == "json",
+    module_levels=parse_module_levels(LOG_LEVELS),
+    sample_every=LOG_SAMPLE_EVERY
 )
 logger = logging.getLogger(__name__)
 
@@ -47,6 +120,6 @@ if not all([BOT_TOKEN, API_ID, API_HASH, CASE_LOG_CHANNEL_ID, NEW_USER_GROUP_LOG
     logger.critical("आवश्यक पर्यावरण चर (`BOT_TOKEN`, `API_ID`, `API_HASH`, `CASE_LOG_CHANNEL_ID`, `NEW_USER_GROUP_LOG_CHANNEL_ID`, `OWNER_ID`) सेट नहीं हैं। कृपया अपनी `.env` फ़ाइल जांचें और उन्हें प्रदान करें।")
     sys.exit(1)
 
-# MONGODB_URI को config.py में रखने की बजाय database.py में सीधे os.getenv से एक्सेस करना बेहतर है,
+# STORAGE_URI (या MONGODB_URI) को config.py में रखने की बजाय database.py में सीधे os.getenv से एक्सेस करना बेहतर है,
 # क्योंकि यह एक डेटाबेस-विशिष्ट सेटिंग है और सीधे env से आनी चाहिए।
 # database.py में सुनिश्चित करें कि यह मौजूद है।
@@ -0,0 +1,145 @@
+# content_analysis.py
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from itertools import product
+from typing import NamedTuple
+
+from filters import WordMatcher, _build_matcher, is_spam
+from normalizer import NormalizedText, normalize
+from spam_fingerprint import simhash
+
+logger = logging.getLogger(__name__)
+
+
+class Analysis(NamedTuple):
+    """Result of the CPU-bound text checks for one message; small enough to send between processes."""
+    normalized: NormalizedText
+    fingerprint: int | None          # folded टेक्स्ट का SimHash; बहुत छोटे टेक्स्ट पर None
+    word_match: tuple[str, str] | None
+    looks_spammy: bool               # is_spam() के नियम (लंबाई, दोहराव)
+
+
+def analyze(text: str, matcher: WordMatcher, fingerprint_min_length: int) -> Analysis:
+    normalized = normalize(text)
+    fingerprint = simhash(normalized.folded) if len(normalized.folded) >= fingerprint_min_length else None
+    return Analysis(normalized, fingerprint, matcher.search(normalized), is_spam(normalized))
+
+
+def _analyze_batch(jobs: list[tuple[str, tuple]], fingerprint_min_length: int) -> list[Analysis]:
+    # पूल वर्कर में: मैचर उसी वर्कर के lru_cache से, इसलिए पाइप पर सिर्फ़ उसके नियम (rules) जाते हैं
+    return [analyze(text, _build_matcher(*rules), fingerprint_min_length) for text, rules in jobs]
+
+
+def _init_worker():
+    # fork से पहले के लॉग हैंडलर (QueueHandler) पैरेंट के थ्रेड पर निर्भर हैं; वर्कर में उन्हें छोड़ दो
+    logging.getLogger().handlers.clear()
+    # ग्लोबल लिस्ट वाले मैचर पहले से बना लो, ताकि पहला असली मैसेज regex कंपाइल का इंतज़ार न करे
+    for abusive, porn in product((False, True), repeat=2):
+        _build_matcher(abusive, porn, (), ())
+    simhash("warm up the feature hash cache with a sentence")
+
+
+def _ready() -> bool:
+    return True
+
+
+class ContentAnalyzer:
+    """
+    Runs ``analyze`` inline or in a pool of worker processes.
+
+    Texts up to ``inline_max_chars`` are analyzed inline: for them the round
+    trip to another process costs more than the work. Longer texts are
+    collected for up to ``batch_window`` seconds (or ``batch_size`` texts)
+    and sent to the pool as one task, so the event loop never runs the
+    normalization, fingerprint and word-list regexes for them. With
+    ``processes=0`` everything stays inline.
+    """
+
+    def __init__(self, processes: int = 0, inline_max_chars: int = 1000, batch_size: int = 32,
+                 batch_window: float = 0.002, fingerprint_min_length: int = 40):
+        self.processes = processes
+        self.inline_max_chars = inline_max_chars
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.fingerprint_min_length = fingerprint_min_length
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending: list[tuple[str, WordMatcher, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self.inline = 0
+        self.offloaded = 0
+        self.batches = 0
+
+    def start(self):
+        """Starts and warms the worker processes (no-op with ``processes=0``)."""
+        if self.processes <= 0 or self._pool is not None:
+            return
+        # fork: वर्कर इम्पोर्ट किए गए मॉड्यूल साथ लेकर शुरू होते हैं; spawn server.py को दोबारा चलाता
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker
+        )
+        wait([self._pool.submit(_ready) for _ in range(self.processes)])
+        logger.info(f"Content analysis pool started with {self.processes} processes (inline up to {self.inline_max_chars} chars).")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def analyze(self, text: str, matcher: WordMatcher) -> Analysis:
+        if self._pool is None or len(text) <= self.inline_max_chars:
+            self.inline += 1
+            return analyze(text, matcher, self.fingerprint_min_length)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, matcher, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.offloaded += len(batch)
+        self.batches += 1
+        jobs = [(text, matcher.rules) for text, matcher, _ in batch]
+        try:
+            if self._pool is None:
+                raise RuntimeError("process pool is shut down")
+            result = asyncio.get_running_loop().run_in_executor(self._pool, _analyze_batch, jobs, self.fingerprint_min_length)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        result.add_done_callback(lambda done: self._deliver(batch, done))
+
+    def _deliver(self, batch: list, done: asyncio.Future):
+        try:
+            analyses = done.result()
+        except (Exception, asyncio.CancelledError) as e:
+            self._fail(batch, e)
+            return
+        for (_, _, future), analysis in zip(batch, analyses):
+            if not future.done():
+                future.set_result(analysis)
+
+    def _fail(self, batch: list, error: BaseException):
+        # टूटा पूल (जैसे वर्कर OOM से मरा) मैसेज न छोड़े: यह बैच यहीं जाँच लो और पूल नया शुरू करो
+        logger.error(f"Content analysis batch of {len(batch)} failed in the process pool: {error!r}")
+        for text, matcher, future in batch:
+            if not future.done():
+                future.set_result(analyze(text, matcher, self.fingerprint_min_length))
+        if self._pool is not None and getattr(self._pool, "_broken", False):
+            logger.warning("Content analysis pool is broken; restarting it.")
+            self.shutdown()
+            self.start()
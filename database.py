@@ -2,174 +2,278 @@
 
 import os
 from datetime import datetime, timedelta
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
 import logging
 
-# Setup a basic logger for the database module
-# If you are already importing 'logger' from config.py and want to use that,
-# you can remove these lines and uncomment 'from config import logger' below.
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+from metrics import track_db_call
+from storage import open_storage
 
-# If you want to use the logger from config.py, uncomment the line below
-# from config import logger
+# Handlers and levels come from the root logger set up in config.py (see log_setup.py).
+logger = logging.getLogger(__name__)
 
 
-# --- MongoDB URI Configuration ---
-# MONGODB_URI should be set as an environment variable in your deployment environment (e.g., Koyeb)
-MONGODB_URI = os.getenv("MONGODB_URI")
+# --- Storage URI Configuration ---
+# STORAGE_URI (या पुराना MONGODB_URI) should be set as an environment variable in your deployment environment (e.g., Koyeb).
+# mongodb://… / mongodb+srv://… रिमोट MongoDB, sqlite:///data/bot.db लोकल एम्बेडेड फ़ाइल (देखें storage/__init__.py)
+STORAGE_URI = os.getenv("STORAGE_URI") or os.getenv("MONGODB_URI")
 
-if not MONGODB_URI:
-    logger.critical("MONGODB_URI environment variable not set. Exiting.")
+if not STORAGE_URI:
+    logger.critical("STORAGE_URI (or MONGODB_URI) environment variable not set. Exiting.")
     exit(1)
 
-# --- MongoDB Connection ---
-client = None
-db = None
-users_collection = None
-groups_collection = None
-warns_collection = None
-cooldowns_collection = None
-
+# --- Storage Backend ---
+# बैकएंड यहाँ नेटवर्क का इंतज़ार नहीं करता; पहला पिंग connect() में होता है
 try:
-    client = MongoClient(MONGODB_URI)
-    db = client.get_database("group_police_bot") # Replace with your preferred database name
-    users_collection = db.users
-    groups_collection = db.groups
-    warns_collection = db.warns
-    cooldowns_collection = db.cooldowns
-    
-    # Ping to check connection
-    client.admin.command('ping')
-    logger.info("MongoDB connected successfully!")
-except ConnectionFailure as e:
-    logger.critical(f"MongoDB connection failed: {e}")
-    exit(1)
-except OperationFailure as e:
-    logger.critical(f"MongoDB operation failed (authentication/authorization issue?): {e}")
-    exit(1)
+    storage = open_storage(STORAGE_URI)
 except Exception as e:
-    logger.critical(f"An unexpected error occurred during MongoDB connection: {e}")
+    logger.critical(f"An unexpected error occurred during storage setup: {e}")
     exit(1)
 
 
+def connect():
+    """
+    Waits until the storage backend answers; exits the process if it is unreachable.
+
+    Kept out of the import so that server.py can run it in a thread while the
+    Telegram client logs in.
+    """
+    try:
+        storage.connect()
+        logger.info(f"Storage ({storage.name}) connected successfully!")
+    except Exception as e:
+        logger.critical(f"Storage ({storage.name}) connection failed: {e}")
+        exit(1)
+
+
+@track_db_call
+def ping() -> bool:
+    """Checks that the storage backend is reachable. Used by the readiness probe."""
+    return storage.ping()
+
+
 # --- User Management Functions ---
+@track_db_call
 def add_or_update_user(user_id: int, username: str | None, first_name: str, last_name: str | None, is_bot: bool):
     """Adds or updates a user's information in the database."""
-    users_collection.update_one(
-        {"_id": user_id}, # Use _id for MongoDB's primary key for efficient lookup
-        {
-            "$set": {
-                "username": username,
-                "first_name": first_name,
-                "last_name": last_name,
-                "is_bot": is_bot,
-                "last_seen": datetime.now() # Update last seen timestamp on every interaction
-            },
-            "$setOnInsert": {
-                "created_at": datetime.now() # Set creation timestamp only if it's a new document
-            }
-        },
-        upsert=True # Create a new document if _id does not exist
-    )
+    storage.add_or_update_user(user_id, username, first_name, last_name, is_bot)
     logger.debug(f"User {user_id} added/updated.")
 
-def get_user(user_id: int):
-    """Retrieves a user's information from the database."""
-    return users_collection.find_one({"_id": user_id})
+@track_db_call
+def get_user(user_id: int, stale_ok: bool = False):
+    """Retrieves a user's information from the database (from a secondary if ``stale_ok``)."""
+    return storage.get_user(user_id, stale_ok)
+
+@track_db_call
+def count_users(stale_ok: bool = True) -> int:
+    """Approximate number of tracked users (collection metadata, no scan)."""
+    return storage.count_users(stale_ok)
 
 
 # --- Group Management Functions ---
+@track_db_call
 def add_or_update_group(group_id: int, title: str, added_by_user_id: int):
     """Adds or updates a group's information in the database, setting default settings on insert."""
-    groups_collection.update_one(
-        {"_id": group_id},
-        {
-            "$set": {
-                "title": title,
-                "last_updated": datetime.now()
-            },
-            "$setOnInsert": {
-                "added_by": added_by_user_id,
-                "added_at": datetime.now(),
-                # Default settings for new groups:
-                "welcome_enabled": True, 
-                "welcome_message": "👋 नमस्ते {username}! {groupname} में आपका स्वागत है।",
-                "anti_link_enabled": False, 
-                "anti_flood_enabled": False,
-                "warn_limit": 3 # Default warn limit before a ban
-            }
-        },
-        upsert=True
-    )
+    storage.add_or_update_group(group_id, title, added_by_user_id)
     logger.info(f"Group {group_id} added/updated in database.")
 
-def get_group(group_id: int):
-    """Retrieves a group's information and settings from the database."""
-    return groups_collection.find_one({"_id": group_id})
+@track_db_call
+def get_group(group_id: int, stale_ok: bool = False):
+    """
+    Retrieves a group's information and settings from the database.
+
+    With ``stale_ok`` the read may go to a MongoDB secondary and lag by up to
+    MONGO_MAX_STALENESS_SECONDS; use it only where a just-changed setting
+    may apply a moment later (not right after writing it).
+    """
+    return storage.get_group(group_id, stale_ok)
+
+def _settings_audit(settings: dict, changed_by: int | None, source: str) -> dict | None:
+    # सिर्फ़ यूज़र के किए बदलाव इतिहास में; मान नहीं, सिर्फ़ कुंजियाँ, ताकि ग्रुप डॉक्युमेंट छोटा रहे
+    if changed_by is None:
+        return None
+    return {"at": datetime.now(), "by": changed_by, "src": source, "keys": sorted(settings)}
 
-def update_group_settings(group_id: int, settings: dict):
-    """Updates specific settings for a given group."""
-    groups_collection.update_one(
-        {"_id": group_id},
-        {"$set": settings}
-    )
+@track_db_call
+def update_group_settings(group_id: int, settings: dict, changed_by: int | None = None, source: str = "settings") -> dict | None:
+    """
+    Updates specific settings for a given group; returns the updated group document.
+    A change made by a user (``changed_by``) is recorded in the group's settings history.
+    """
+    group = storage.update_group_settings(group_id, settings, _settings_audit(settings, changed_by, source))
     logger.info(f"Settings updated for group {group_id}.")
+    return group
+
+@track_db_call
+def apply_group_settings(group_ids: list[int], settings: dict, changed_by: int | None = None, source: str = "profile") -> int:
+    """Sets the same settings on many groups in one write; returns how many groups were updated."""
+    updated = storage.apply_group_settings(group_ids, settings, _settings_audit(settings, changed_by, source))
+    logger.info(f"Settings {sorted(settings)} applied to {updated}/{len(group_ids)} groups.")
+    return updated
+
+@track_db_call
+def add_to_group_list(group_id: int, list_name: str, values: list[str]):
+    """Adds values to a list on the group document (blocklist, allowlist, allowed_domains, denied_domains)."""
+    storage.add_to_group_list(group_id, list_name, values)
+    logger.info(f"Added {len(values)} values to {list_name} of group {group_id}.")
 
-def get_all_groups():
+@track_db_call
+def remove_from_group_list(group_id: int, list_name: str, values: list[str] | None = None):
+    """Removes values from a list on the group document; clears the list if values is None."""
+    storage.remove_from_group_list(group_id, list_name, values)
+    logger.info(f"Removed values from {list_name} of group {group_id}.")
+
+@track_db_call
+def get_all_groups(stale_ok: bool = False):
     """Retrieves a list of all groups stored in the database."""
-    return list(groups_collection.find({}))
+    return storage.get_all_groups(stale_ok)
+
+@track_db_call
+def list_groups(after: int | None = None, limit: int = 50, stale_ok: bool = False) -> list[dict]:
+    """A page of ``{"_id", "title"}`` in id order, starting after the ``after`` cursor."""
+    return storage.list_groups(after, limit, stale_ok)
+
+@track_db_call
+def count_groups(stale_ok: bool = True) -> int:
+    """Approximate number of groups (collection metadata, no scan)."""
+    return storage.count_groups(stale_ok)
 
+@track_db_call
 def delete_group(group_id: int):
     """Deletes a group and its associated warns from the database."""
-    groups_collection.delete_one({"_id": group_id})
-    warns_collection.delete_many({"group_id": group_id}) # Also clean up associated warns
+    storage.delete_group(group_id)
     logger.info(f"Group {group_id} and its warns deleted from database.")
 
 
 # --- Warn System Functions ---
+@track_db_call
 def add_warn(group_id: int, user_id: int) -> int:
     """Adds a warn to a user in a specific group and returns the new warn count."""
-    result = warns_collection.find_one_and_update(
-        {"group_id": group_id, "user_id": user_id},
-        {"$inc": {"warns": 1}, "$set": {"last_warned": datetime.now()}},
-        upsert=True,
-        return_document=True # Returns the updated document
-    )
-    return result["warns"] # The updated warn count
+    return storage.add_warn(group_id, user_id)
 
+@track_db_call
+def escalate_warn(group_id: int, user_id: int, limit: int) -> int:
+    """
+    Adds a warn and returns the new count; at ``limit`` or more the stored
+    count is reset to 0 in the same atomic operation (see warn_ladder.py).
+    """
+    return storage.escalate_warn(group_id, user_id, limit)
+
+@track_db_call
 def get_warns(group_id: int, user_id: int) -> int:
     """Retrieves the current warn count for a user in a specific group."""
-    result = warns_collection.find_one({"group_id": group_id, "user_id": user_id})
-    return result["warns"] if result else 0
+    return storage.get_warns(group_id, user_id)
 
+@track_db_call
 def delete_warns(group_id: int, user_id: int):
     """Resets (deletes) all warns for a user in a specific group."""
-    warns_collection.delete_one({"group_id": group_id, "user_id": user_id})
+    storage.delete_warns(group_id, user_id)
     logger.info(f"Warns for user {user_id} in group {group_id} reset.")
 
 
 # --- Command Cooldown System Functions ---
+@track_db_call
 def add_command_cooldown(user_id: int, command_name: str, timestamp: datetime):
     """Records the last usage time for a command by a user."""
-    cooldowns_collection.update_one(
-        {"_id": user_id, "command": command_name},
-        {"$set": {"last_used": timestamp}},
-        upsert=True
-    )
+    storage.add_command_cooldown(user_id, command_name, timestamp)
     logger.debug(f"Cooldown updated for user {user_id} command {command_name}.")
 
+@track_db_call
 def get_command_cooldown(user_id: int, command_name: str) -> datetime | None:
     """Retrieves the last usage time for a command by a user."""
-    result = cooldowns_collection.find_one({"_id": user_id, "command": command_name})
-    return result["last_used"] if result else None
+    return storage.get_command_cooldown(user_id, command_name)
 
+@track_db_call
 def reset_command_cooldown(user_id: int, command_name: str):
     """Resets the cooldown for a specific command for a user."""
-    cooldowns_collection.delete_one({"_id": user_id, "command": command_name})
+    storage.reset_command_cooldown(user_id, command_name)
     logger.debug(f"Cooldown reset for user {user_id} command {command_name}.")
+
+
+# --- Pending Input Functions ---
+# "अगला मैसेज भेजें" वाली स्थिति DB में रहती है, ताकि बटन किसी भी शार्ड पर दबे और जवाब किसी और पर आए
+@track_db_call
+def set_pending_input(user_id: int, kind: str, group_id: int):
+    """Records that the user's next private message is input of the given kind for a group."""
+    storage.set_pending_input(user_id, kind, group_id)
+
+@track_db_call
+def get_pending_input(user_id: int):
+    """Returns the user's pending input ({"kind", "group_id", ...}) or None."""
+    return storage.get_pending_input(user_id)
+
+@track_db_call
+def clear_pending_input(user_id: int):
+    storage.clear_pending_input(user_id)
+
+
+# --- Federation Functions ---
+# साझा बैन-सूची वाले ग्रुप्स के समूह; मेमोरी वाला सेट federations.py में
+@track_db_call
+def create_federation(federation_id: str, name: str, owner_id: int):
+    """Creates a federation owned by ``owner_id``."""
+    storage.create_federation(federation_id, name, owner_id)
+    logger.info(f"Federation {federation_id} ({name}) created by {owner_id}.")
+
+@track_db_call
+def get_federation(federation_id: str):
+    """Returns the federation document ({"_id", "name", "owner_id", "admins", ...}) or None."""
+    return storage.get_federation(federation_id)
+
+@track_db_call
+def update_federation(federation_id: str, fields: dict):
+    storage.update_federation(federation_id, fields)
+
+@track_db_call
+def get_federation_groups(federation_id: str) -> list[int]:
+    """Ids of the groups that joined the federation."""
+    return storage.get_federation_groups(federation_id)
+
+@track_db_call
+def add_fed_ban(federation_id: str, user_id: int, reason: str | None, banned_by: int) -> bool:
+    """Bans a user in the federation; returns False if the user was already banned (the reason is updated)."""
+    return storage.add_fed_ban(federation_id, user_id, reason, banned_by)
+
+@track_db_call
+def remove_fed_ban(federation_id: str, user_id: int) -> bool:
+    """Lifts a federation ban; returns False if the user was not banned."""
+    return storage.remove_fed_ban(federation_id, user_id)
+
+@track_db_call
+def get_fed_ban(federation_id: str, user_id: int):
+    return storage.get_fed_ban(federation_id, user_id)
+
+@track_db_call
+def get_fed_ban_ids(federation_id: str) -> list[int]:
+    return storage.get_fed_ban_ids(federation_id)
+
+
+# --- Scheduled Job Functions ---
+# टाइम वाले काम (अनम्यूट, अनबैन, लॉकडाउन खत्म करना); चलाने वाला लूप jobs.py में
+@track_db_call
+def add_job(job_id: str, kind: str, due_at: datetime, chat_id: int, user_id: int | None = None, payload: dict | None = None):
+    storage.add_job(job_id, kind, due_at, chat_id, user_id, payload)
+    logger.debug(f"Job {job_id} ({kind}) for chat {chat_id} due at {due_at}.")
+
+@track_db_call
+def next_job_due() -> datetime | None:
+    """When the earliest pending job is due (an index lookup, not a scan)."""
+    return storage.next_job_due()
+
+@track_db_call
+def take_due_jobs(now: datetime, limit: int, lease_seconds: float = 300) -> list[dict]:
+    """Atomically leases and returns up to ``limit`` jobs due by ``now``; they come due again when the lease ends."""
+    return storage.take_due_jobs(now, limit, lease_seconds)
+
+@track_db_call
+def finish_jobs(job_ids: list[str]):
+    """Deletes leased jobs that are done."""
+    storage.finish_jobs(job_ids)
+
+@track_db_call
+def retry_job(job_id: str, due_at: datetime):
+    """Makes a leased job that failed due again at ``due_at``."""
+    storage.retry_job(job_id, due_at)
+
+@track_db_call
+def cancel_jobs(kind: str, chat_id: int, user_id: int | None = None) -> int:
+    """Deletes pending jobs of a kind for a chat (and user); returns how many were deleted."""
+    return storage.cancel_jobs(kind, chat_id, user_id)
@@ -0,0 +1,84 @@
+# federations.py
+#
+# फ़ेडरेशन: ग्रुप्स का समूह जिनकी बैन-सूची साझा है। एक ग्रुप में पकड़ा गया स्पैमर बाकी सब में
+# जुड़ते ही (या पहला मैसेज भेजते ही) बैन हो जाता है, फ़िल्टर और API का खर्च दोबारा किए बिना।
+
+import logging
+import secrets
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+FEDERATION_NAME_MAX = 64
+
+
+def new_federation_id() -> str:
+    """A short random id that group admins type into ``/joinfed``."""
+    return secrets.token_hex(6)
+
+
+def can_manage(federation: dict, user_id: int) -> bool:
+    """Whether the user may ban in the federation (its owner or one of its admins)."""
+    return user_id == federation["owner_id"] or user_id in federation.get("admins", ())
+
+
+class FederationBans:
+    """
+    In-memory set of banned user ids per federation, backed by storage.
+
+    ``load(federation_id)`` returns every banned id; a federation's set is
+    loaded on first use, so a check is one set lookup. Bans made by this
+    process go straight into the set (``apply``); sets are reloaded after
+    ``ttl`` seconds so that bans written by other processes show up even
+    when no shard relay is running.
+    """
+
+    def __init__(self, load, ttl: float = 300, max_federations: int = 1024):
+        self.load = load
+        self.ttl = ttl
+        self.max_federations = max_federations
+        self._bans: OrderedDict[str, tuple[set[int], float]] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _banned_ids(self, federation_id: str) -> set[int]:
+        entry = self._bans.get(federation_id)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            self.cache_hits += 1
+            self._bans.move_to_end(federation_id)
+            return entry[0]
+        self.cache_misses += 1
+        try:
+            banned = set(self.load(federation_id))
+        except Exception as e:
+            # DB न मिले तो पुराना सेट (अगर है) ही चलने दें, और थोड़ी देर बाद फिर कोशिश
+            logger.error(f"Could not load bans of federation {federation_id}: {e}")
+            banned = entry[0] if entry is not None else set()
+            self._bans[federation_id] = (banned, now + min(self.ttl, 30))
+            return banned
+        self._bans[federation_id] = (banned, now + self.ttl)
+        self._bans.move_to_end(federation_id)
+        if len(self._bans) > self.max_federations:
+            self._bans.popitem(last=False)
+        return banned
+
+    def is_banned(self, federation_id: str, user_id: int) -> bool:
+        return user_id in self._banned_ids(federation_id)
+
+    def count(self, federation_id: str) -> int:
+        return len(self._banned_ids(federation_id))
+
+    def apply(self, federation_id: str, user_id: int, banned: bool):
+        """Records a ban or unban that is already stored (here or on another shard)."""
+        entry = self._bans.get(federation_id)
+        if entry is None:
+            return  # अगली बार पूरा सेट लोड होगा
+        if banned:
+            entry[0].add(user_id)
+        else:
+            entry[0].discard(user_id)
+
+    def __len__(self) -> int:
+        return len(self._bans)
@@ -1,80 +1,182 @@
-import re
+import functools
+from collections import Counter, OrderedDict
 from pyrogram import Client
 from pyrogram.enums import ChatType
 from config import logger # logger को config से इम्पोर्ट करें
+from link_policy import extract_links
+from mentions import extract_mentions
+from normalizer import NormalizedText, as_normalized, compile_forms, compile_wordlist, word_forms
+
+# --- Word Lists ---
+# शब्द सादे रूप में लिखें; normalizer इन्हें उसी तरह सामान्य करता है जैसे मैसेज को
+ABUSIVE_WORDS = (
+    "chutiya", "madarchod", "behenchod", "kutta", "harami", "sale", "bhosdike", "lund",
+    "fuck", "asshole", "dick", "cock", "sht", "gaandu", "sala", "terimaaki", "penchod",
+    "chod", "jhant", "kutiya", "chinal", "saad", "haraamzaada",
+    "चूतिया", "चुतिया", "मादरचोद", "बहनचोद", "बहेनचोद", "भेनचोद", "कुत्ता", "हरामी", "भोसडीके",
+    "भोसड़ीके", "लंड", "लौड़ा", "गांडू", "गांड", "चोद", "झांट", "कुतिया", "छिनाल", "हरामज़ादा", "हरामजादा",
+)
+PORN_WORDS = (
+    "sex", "nude", "porn", "xxx", "bdsm", "hot", "boobs", "tits", "vagina", "penis",
+    "rape", "incest", "hijabporno", "femdom", "naked", "slut", "whore", "bitch",
+    "masterbation", "intercourse", "orgy", "gangbang", "threesome", "orgasm",
+    "सेक्स", "पोर्न", "नंगा", "नंगी", "चुदाई", "रंडी",
+)
+
+_ABUSIVE_PATTERN = compile_wordlist(ABUSIVE_WORDS)
+_PORN_PATTERN = compile_wordlist(PORN_WORDS)
 
 # --- Text Content Filters ---
+# सभी टेक्स्ट फ़िल्टर str या पहले से बना NormalizedText लेते हैं;
+# हैंडलर मैसेज को एक बार normalize करके वही सब फ़िल्टरों को देता है
 
-def is_abusive(text: str) -> bool:
+def is_abusive(text: "str | NormalizedText") -> bool:
     """गाली-गलौज वाले शब्दों का पता लगाता है।"""
-    abusive_words = [
-        r'\bchutiya\b', r'\bmadarchod\b', r'\bbehenchod\b', r'\bkutta\b',
-        r'\bharami\b', r'\bsale\b', r'\bbhosdike\b', r'\blund\b',
-        r'\bfuck\b', r'\basshole\b', r'\bdick\b', r'\bcock\b', r'\bsht\b',
-        r'\bgaandu\b', r'\bsala\b', r'\bterimaaki\b', r'\bpenchod\b',
-        r'\bchod\b', r'\bjhant\b', r'\bkutiya\b', r'\bchinal\b',
-        r'\bsaad\b', r'\bharaamzaada\b'
-    ]
-    for word in abusive_words:
-        if re.search(word, text, re.IGNORECASE):
-            logger.debug(f"Abusive word '{word}' detected in text.")
-            return True
+    match = _ABUSIVE_PATTERN.search(as_normalized(text).words)
+    if match:
+        logger.debug(f"Abusive word '{match.group()}' detected in text.")
+        return True
     return False
 
-def is_pornographic_text(text: str) -> bool:
+def is_pornographic_text(text: "str | NormalizedText") -> bool:
     """पॉर्नोग्राफिक सामग्री वाले शब्दों का पता लगाता है।"""
-    porn_words = [
-        r'\bsex\b', r'\bnude\b', r'\bporn\b', r'\bxxx\b', r'\bbdsm\b',
-        r'\bhot\b', r'\bboobs\b', r'\btits\b', r'\bvagina\b', r'\bpenis\b',
-        r'\brape\b', r'\bincest\b', r'\bhijabporno\b', r'\bfemdom\b',
-        r'\bnaked\b', r'\bslut\b', r'\bwhore\b', r'\bbitch\b',
-        r'\bmasterbation\b', r'\bintercourse\b', r'\borgy\b',
-        r'\bgangbang\b', r'\bthreesome\b', r'\borgasm\b'
-    ]
-    for word in porn_words:
-        if re.search(word, text, re.IGNORECASE):
-            logger.debug(f"Pornographic word '{word}' detected in text.")
-            return True
+    match = _PORN_PATTERN.search(as_normalized(text).words)
+    if match:
+        logger.debug(f"Pornographic word '{match.group()}' detected in text.")
+        return True
     return False
 
-def contains_links(text: str) -> bool:
-    """लिंक का पता लगाता है (http/https, t.me, Telegram, etc.)।"""
-    link_pattern = r"(?i)\b((?:https?://|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))"
-    telegram_link_pattern = r"(?i)\b(t\.me|telegram\.me|telegram\.dog)/[a-zA-Z0-9_]+"
-    
-    if re.search(link_pattern, text) or re.search(telegram_link_pattern, text):
-        logger.debug(f"Link detected in text: '{text}'")
+# --- Per-Group Word Lists ---
+# हर ग्रुप के लिए: चालू ग्लोबल लिस्ट + ग्रुप की ब्लॉकलिस्ट - ग्रुप की अलाउलिस्ट, सब एक ही regex में
+
+WORD_CATEGORY_ABUSIVE = "abusive"
+WORD_CATEGORY_PORN = "porn"
+WORD_CATEGORY_CUSTOM = "custom"
+
+
+class WordMatcher:
+    """
+    Compiled matcher for one combination of word lists; a message is scanned once whatever the list sizes.
+
+    ``rules`` are the ``_build_matcher`` arguments it was built from, so another
+    process can build (and cache) the same matcher instead of receiving it.
+    """
+
+    def __init__(self, categories: dict[str, tuple], allowlist: tuple = (), rules: tuple = ()):
+        self.rules = rules
+        allowed = word_forms(allowlist)
+        self._categories: dict[str, str] = {}
+        for category, words in categories.items():
+            for form in word_forms(words):
+                if form not in allowed:
+                    self._categories.setdefault(form, category)
+        self._pattern = compile_forms(self._categories) if self._categories else None
+
+    def search(self, text: "str | NormalizedText") -> tuple[str, str] | None:
+        """Returns ``(category, word)`` for the first listed word in the text, or None."""
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(as_normalized(text).words)
+        if not match:
+            return None
+        return self._categories[match.group()], match.group()
+
+
+@functools.lru_cache(maxsize=256)
+def _build_matcher(abusive: bool, porn: bool, blocklist: tuple, allowlist: tuple) -> WordMatcher:
+    # बिना कस्टम लिस्ट वाले ग्रुप एक ही मैचर साझा करते हैं
+    categories = {}
+    if blocklist:
+        categories[WORD_CATEGORY_CUSTOM] = blocklist
+    if abusive:
+        categories[WORD_CATEGORY_ABUSIVE] = ABUSIVE_WORDS
+    if porn:
+        categories[WORD_CATEGORY_PORN] = PORN_WORDS
+    return WordMatcher(categories, allowlist, rules=(abusive, porn, blocklist, allowlist))
+
+
+def build_word_matcher(group_data: dict) -> WordMatcher:
+    return _build_matcher(
+        bool(group_data.get("filter_abusive", False)),
+        bool(group_data.get("filter_pornographic_text", False)),
+        tuple(sorted(group_data.get("blocklist") or ())),
+        tuple(sorted(group_data.get("allowlist") or ())),
+    )
+
+
+class GroupSettingsCache:
+    """
+    Per-chat cache of objects built from a group document (matchers, policies).
+
+    An entry is reused while the document's ``settings_version`` is
+    unchanged; every settings or list write bumps it, so the object is
+    rebuilt lazily by ``build(group_data)`` on the next message after a change.
+    """
+
+    def __init__(self, build, max_groups: int = 4096):
+        self.build = build
+        self.max_groups = max_groups
+        self._entries: OrderedDict[int, tuple] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def get(self, group_id: int, group_data: dict):
+        version = group_data.get("settings_version", 0)
+        entry = self._entries.get(group_id)
+        if entry is not None and entry[0] == version:
+            self.cache_hits += 1
+            self._entries.move_to_end(group_id)
+            return entry[1]
+
+        self.cache_misses += 1
+        value = self.build(group_data)
+        self._entries[group_id] = (version, value)
+        self._entries.move_to_end(group_id)
+        if len(self._entries) > self.max_groups:
+            self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, group_id: int):
+        self._entries.pop(group_id, None)
+
+def contains_links(text: "str | NormalizedText", entities=None) -> bool:
+    """लिंक का पता लगाता है (http/https, t.me, Telegram, etc.)। entities मिलें तो उन्हीं से, वरना regex से।"""
+    if entities is None:
+        text = as_normalized(text).folded
+    elif isinstance(text, NormalizedText):
+        text = text.text
+    links = extract_links(text, entities)
+    if links:
+        logger.debug(f"{len(links)} link(s) detected in text.")
         return True
     return False
 
-def is_spam(text: str) -> bool:
+def is_spam(text: "str | NormalizedText") -> bool:
     """
     स्पैम (अत्यधिक लंबा, अत्यधिक दोहराव) का पता लगाता है।
     यह एक बुनियादी कार्यान्वयन है; इसे अधिक परिष्कृत किया जा सकता है।
     """
+    text = as_normalized(text).folded
     if len(text) > 500:
         logger.debug(f"Text is too long ({len(text)} chars), considered spam.")
         return True
     
-    words = text.lower().split()
+    words = text.split()
     if len(words) > 10:
-        word_counts = {}
-        for word in words:
-            word_counts[word] = word_counts.get(word, 0) + 1
-        
-        for word, count in word_counts.items():
-            if count / len(words) > 0.4:
-                logger.debug(f"Word '{word}' repeated excessively, considered spam.")
-                return True
+        word, count = Counter(words).most_common(1)[0]
+        if count / len(words) > 0.4:
+            logger.debug(f"Word '{word}' repeated excessively, considered spam.")
+            return True
     
     return False
 
-def contains_usernames(text: str) -> bool:
-    """अन्य चैनल या बॉट के यूज़रनेम का पता लगाता है (जैसे @username)."""
-    username_pattern = r"@[\w]+"
-    
-    if re.search(username_pattern, text):
-        logger.debug(f"Username detected in text: '{text}'")
+def contains_usernames(text: "str | NormalizedText", entities=None) -> bool:
+    """अन्य चैनल या बॉट के यूज़रनेम का पता लगाता है (जैसे @username)। entities मिलें तो उन्हीं से।"""
+    if isinstance(text, NormalizedText):
+        text = text.text
+    mentions = extract_mentions(text, entities)
+    if mentions:
+        logger.debug(f"{len(mentions)} mention(s) detected in text.")
         return True
     return False
 
@@ -0,0 +1,74 @@
+# health_server.py
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from metrics import CONTENT_TYPE, REGISTRY
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Mongo पिंग के लिए अधिकतम इंतज़ार (सेकंड)
+READINESS_PING_TIMEOUT = 2.0
+
+
+def create_health_app(bot_client, db_ping) -> "web.Application":
+    """
+    Builds the aiohttp app for health checks (Koyeb specific).
+
+    ``/healthz`` only says the event loop is alive. ``/readyz`` also requires
+    the bot to be logged in (``bot_client.me``) and ``db_ping()`` to succeed;
+    the ping is a blocking storage call, so it runs in a thread. ``/metrics``
+    serves the registry from metrics.py in Prometheus text format.
+    """
+    # aiohttp सिर्फ़ यहाँ चाहिए: `import server` (बेंचमार्क, टूल) इसका इम्पोर्ट समय नहीं भरता, और बॉट में
+    # यह इम्पोर्ट Telegram/Mongo कनेक्शन के इंतज़ार के साथ-साथ होता है
+    from aiohttp import web
+
+    async def root(request: web.Request) -> web.Response:
+        me = bot_client.me
+        return web.json_response({
+            "status": "running",
+            "bot_name": me.first_name if me else "N/A",
+            "bot_id": me.id if me else "N/A"
+        })
+
+    async def healthz(request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+    async def readyz(request: web.Request) -> web.Response:
+        try:
+            mongo_ok = await asyncio.wait_for(asyncio.to_thread(db_ping), READINESS_PING_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Readiness check: storage ping failed: {e}")
+            mongo_ok = False
+        bot_ok = bot_client.me is not None
+        ready = mongo_ok and bot_ok
+        return web.json_response(
+            {"status": "ready" if ready else "not_ready", "mongodb": mongo_ok, "telegram": bot_ok},
+            status=200 if ready else 503
+        )
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(body=REGISTRY.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/", root)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def start_health_server(bot_client, db_ping, host: str = "0.0.0.0", port: int = 8000) -> "web.AppRunner":
+    """Starts the health server on the running event loop. Call ``runner.cleanup()`` to stop it."""
+    from aiohttp import web
+
+    runner = web.AppRunner(create_health_app(bot_client, db_ping), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Health server listening on {host}:{port}.")
+    return runner
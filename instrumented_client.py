@@ -0,0 +1,33 @@
+# instrumented_client.py
+
+import time
+
+from pyrogram import Client
+from pyrogram.errors import FloodWait, RPCError
+
+from metrics import FLOODWAIT_SECONDS, FLOODWAITS, TELEGRAM_API_ERRORS, TELEGRAM_API_SECONDS
+
+
+class InstrumentedClient(Client):
+    """
+    Pyrogram Client that records latency and errors of every Telegram API call.
+
+    All high-level methods (send_message, get_chat_member, ...) end up in
+    ``invoke``, so timing it per raw function name (SendMessage,
+    GetParticipant, ...) covers the whole API surface.
+    """
+
+    async def invoke(self, query, *args, **kwargs):
+        method = type(query).__name__
+        start = time.perf_counter()
+        try:
+            return await super().invoke(query, *args, **kwargs)
+        except FloodWait as e:
+            FLOODWAITS.inc(method=method)
+            FLOODWAIT_SECONDS.inc(e.value or 0, method=method)
+            raise
+        except RPCError as e:
+            TELEGRAM_API_ERRORS.inc(method=method, error=type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_API_SECONDS.observe(time.perf_counter() - start, method=method)
@@ -0,0 +1,166 @@
+# jobs.py
+#
+# टाइम वाले काम (अस्थायी म्यूट/बैन हटाना, लॉकडाउन खत्म करना) DB में रहते हैं, ताकि रीस्टार्ट के बाद भी
+# चलें। एक ही लूप अगले काम के समय तक सोता है; एक साथ ड्यू हुए काम एक बैच में उठाए और चलाए जाते हैं।
+# काम सफल होने पर ही हटता है; नाकाम काम बढ़ते अंतराल पर दोबारा चलता है।
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownJobKind(LookupError):
+    """No handler is registered for the job's kind (dropped, not retried)."""
+
+
+class JobScheduler:
+    """
+    Runs persisted jobs when they come due.
+
+    ``store`` provides ``add_job``, ``next_job_due``, ``take_due_jobs`` and
+    ``cancel_jobs`` (the database module). The loop asks the store only for
+    the earliest due time (an index lookup) and sleeps until then, at most
+    ``max_idle`` seconds so jobs added by other processes are picked up;
+    ``schedule`` wakes it early.
+
+    Taking a job leases it for ``lease_seconds`` (one shard gets it, even with
+    several on one database); it is deleted only after its handler succeeds.
+    A failed job runs again after ``retry_delay`` seconds, doubling per attempt
+    up to an hour, and is dropped after ``max_attempts``. A job whose process
+    died mid-run comes due again when its lease ends.
+    """
+
+    def __init__(self, store, batch_size: int = 100, max_idle: float = 60,
+                 lease_seconds: float = 300, max_attempts: int = 5, retry_delay: float = 30):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_idle = max_idle
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._handlers = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.executed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def handler(self, kind: str, batch: bool = False):
+        """
+        Registers ``async func(job: dict)`` for jobs of that kind; with ``batch``
+        ``func(jobs: list[dict])`` gets every job of the kind that came due together.
+        """
+        def decorator(func):
+            self._handlers[kind] = (func, batch)
+            return func
+        return decorator
+
+    def schedule(self, kind: str, delay_seconds: float, chat_id: int, user_id: int | None = None,
+                 payload: dict | None = None, replace: bool = False) -> str:
+        """Stores a job due in ``delay_seconds``; with ``replace`` earlier jobs of that kind for the chat/user are cancelled."""
+        if replace:
+            self.store.cancel_jobs(kind, chat_id, user_id)
+        job_id = uuid.uuid4().hex
+        self.store.add_job(job_id, kind, datetime.now() + timedelta(seconds=delay_seconds), chat_id, user_id, payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    def cancel(self, kind: str, chat_id: int, user_id: int | None = None) -> int:
+        return self.store.cancel_jobs(kind, chat_id, user_id)
+
+    def start(self):
+        """Starts the loop on the running event loop (idempotent)."""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="job-scheduler")
+        logger.info(f"Job scheduler started ({len(self._handlers)} job kinds).")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_due()
+                due = self.store.next_job_due()
+                wait = self.max_idle if due is None else min(max((due - datetime.now()).total_seconds(), 0), self.max_idle)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # DB कुछ देर न मिले तो लूप बंद न हो; काम DB में सुरक्षित हैं
+                logger.error(f"Job scheduler could not read jobs: {e}")
+                wait = min(5, self.max_idle)
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+    async def run_due(self) -> int:
+        """Takes and runs every job due now, ``batch_size`` at a time; returns how many ran."""
+        ran = 0
+        while True:
+            jobs = self.store.take_due_jobs(datetime.now(), self.batch_size, self.lease_seconds)
+            if not jobs:
+                return ran
+            calls = self._calls(jobs)
+            results = await asyncio.gather(*(call for _, call in calls), return_exceptions=True)
+            finished = []
+            for (covered, _), result in zip(calls, results):
+                if isinstance(result, Exception):
+                    self.failed += len(covered)
+                    finished += self._retry_or_drop(covered, result)
+                else:
+                    self.executed += len(covered)
+                    finished += [job["_id"] for job in covered]
+            self.store.finish_jobs(finished)
+            ran += len(jobs)
+            if len(jobs) < self.batch_size:
+                return ran
+
+    def _retry_or_drop(self, jobs: list[dict], error: Exception) -> list[str]:
+        """Reschedules failed jobs with backoff; returns the ids of those given up."""
+        job = jobs[0]
+        logger.warning(f"Job {job['_id']} ({job['kind']}) in chat {job['chat_id']} failed"
+                       + (f" with {len(jobs) - 1} others" if len(jobs) > 1 else "")
+                       + f" (attempt {job.get('attempts', 1)}): {error}")
+        dropped = []
+        for job in jobs:
+            attempts = job.get("attempts", 1)
+            if isinstance(error, UnknownJobKind) or attempts >= self.max_attempts:
+                dropped.append(job["_id"])
+                continue
+            delay = min(self.retry_delay * 2 ** (attempts - 1), 3600)
+            self.store.retry_job(job["_id"], datetime.now() + timedelta(seconds=delay))
+        if dropped:
+            self.dropped += len(dropped)
+            logger.error(f"Gave up on {len(dropped)} {job['kind']} job(s) (max {self.max_attempts} attempts): {dropped[:5]}")
+        return dropped
+
+    def _calls(self, jobs: list[dict]) -> list[tuple]:
+        """Pairs each handler call with the jobs it covers; a batch handler is called once per kind."""
+        calls, batches = [], {}
+        for job in jobs:
+            if self._handlers.get(job["kind"], (None, False))[1]:
+                batches.setdefault(job["kind"], []).append(job)
+            else:
+                calls.append(([job], self._execute(job)))
+        for kind, kind_jobs in batches.items():
+            calls.append((kind_jobs, self._handlers[kind][0](kind_jobs)))
+        return calls
+
+    async def _execute(self, job: dict):
+        handler, _ = self._handlers.get(job["kind"], (None, False))
+        if handler is None:
+            raise UnknownJobKind(f"no handler for job kind {job['kind']!r}")
+        await handler(job)
@@ -0,0 +1,146 @@
+# link_policy.py
+
+import re
+
+from pyrogram.enums import MessageEntityType
+
+# सिर्फ़ फ़ॉलबैक के लिए (जब entities उपलब्ध न हों, जैसे यूज़र बायो)।
+# बिना scheme वाला डोमेन तभी लिंक है जब उसके बाद "/" हो या अंत आम TLD हो, ताकि "ok.bye", "config.py",
+# "Mr.Sharma" लिंक न गिने जाएँ। हर हिस्सा अलग कैरेक्टर-सेट से अलग होता है, इसलिए backtracking नहीं होती।
+_FALLBACK_TLDS = (
+    "com", "net", "org", "info", "biz", "io", "co", "me", "in", "ru", "xyz", "top", "site", "online",
+    "club", "shop", "store", "app", "dev", "ly", "gg", "tk", "ml", "cc", "link", "live", "pro", "vip",
+)
+_FALLBACK_URL = re.compile(
+    r"(?:https?://|www\.)[^\s<>\"']+"
+    r"|(?<![\w@.-])[a-z0-9][a-z0-9-]*(?:\.[a-z0-9-]+)*"
+    rf"(?:\.(?:{'|'.join(_FALLBACK_TLDS)})(?![\w-])(?:/[^\s<>\"']*)?|\.[a-z]{{2,24}}/[^\s<>\"']*)",
+    re.IGNORECASE
+)
+_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+_DOMAIN = re.compile(r"^[a-z0-9-]+(?:\.[a-z0-9-]+)+$")
+
+# Telegram के सभी लिंक-डोमेन एक ही नाम से गिने जाते हैं
+TELEGRAM_DOMAINS = {"telegram.me": "t.me", "telegram.dog": "t.me"}
+
+
+def utf16_slice(encoded: bytes, offset: int, length: int) -> str:
+    return encoded[offset * 2:(offset + length) * 2].decode("utf-16-le", errors="ignore")
+
+
+def extract_links(text: str | None, entities=None) -> list[str]:
+    """
+    Returns the links in a message.
+
+    Telegram already marks links in ``entities`` (URL and TEXT_LINK), so when
+    the entities are known they are used directly. Only when ``entities`` is
+    None (e.g. a user's bio) does a simple regex run over the text; it needs
+    a scheme, a path or a common TLD.
+    """
+    if entities is not None:
+        links = []
+        encoded = None
+        for entity in entities:
+            if entity.type == MessageEntityType.TEXT_LINK:
+                links.append(entity.url)
+            elif entity.type == MessageEntityType.URL and text:
+                # entity offsets UTF-16 code units में होते हैं
+                if encoded is None:
+                    encoded = text.encode("utf-16-le")
+                links.append(utf16_slice(encoded, entity.offset, entity.length))
+        return links
+    if not text or "." not in text:
+        return []
+    return _FALLBACK_URL.findall(text)
+
+
+def link_domain(link: str) -> str | None:
+    """The lower-case host of a link (without 'www.'), or None if it has no usable host."""
+    host = _SCHEME.sub("", link.strip(), count=1)
+    for separator in "/?#":
+        host = host.split(separator, 1)[0]
+    host = host.rsplit("@", 1)[-1].split(":", 1)[0].strip(".").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    host = TELEGRAM_DOMAINS.get(host, host)
+    return host if _DOMAIN.match(host) else None
+
+
+class DomainSuffixTrie:
+    """
+    Set of domains matched by suffix: "example.com" also matches "blog.example.com".
+
+    Labels are stored from the TLD down, so a lookup costs one dict step per
+    label of the queried domain regardless of how many domains are stored.
+    """
+    _END = ""
+
+    def __init__(self, domains=()):
+        self._root: dict = {}
+        self._size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, domain: str):
+        node = self._root
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        if self._END not in node:
+            node[self._END] = True
+            self._size += 1
+
+    def matches(self, domain: str) -> bool:
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+
+class LinkPolicy:
+    """
+    A group's link rules: denied domains are always removed; with anti-link on,
+    every other link is removed unless its domain is allowed.
+    """
+
+    def __init__(self, anti_link_enabled: bool, allowed_domains=(), denied_domains=()):
+        self.anti_link_enabled = anti_link_enabled
+        self.allowed = DomainSuffixTrie(allowed_domains)
+        self.denied = DomainSuffixTrie(denied_domains)
+
+    @classmethod
+    def from_group(cls, group_data: dict) -> "LinkPolicy":
+        return cls(
+            bool(group_data.get("anti_link_enabled", False)),
+            group_data.get("allowed_domains") or (),
+            group_data.get("denied_domains") or ()
+        )
+
+    @property
+    def enforced(self) -> bool:
+        return self.anti_link_enabled or len(self.denied) > 0
+
+    def first_blocked(self, text: str | None, entities=None, extra_links=()) -> str | None:
+        """
+        Returns the first link the group does not allow (its domain, or the raw
+        link if unparsable). ``extra_links`` are checked too, e.g. button URLs.
+        """
+        if not self.enforced:
+            return None
+        for link in (*extract_links(text, entities), *extra_links):
+            domain = link_domain(link)
+            if domain is None:
+                if self.anti_link_enabled:
+                    return link
+                continue
+            if self.denied.matches(domain):
+                return domain
+            if self.anti_link_enabled and not self.allowed.matches(domain):
+                return domain
+        return None
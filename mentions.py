@@ -0,0 +1,189 @@
+# mentions.py
+
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from pyrogram.enums import ChatMemberStatus, ChatMembersFilter, MessageEntityType
+from pyrogram.errors import RPCError
+
+from link_policy import utf16_slice
+
+logger = logging.getLogger(__name__)
+
+# सिर्फ़ फ़ॉलबैक के लिए (entities न हों तब)। '@' से पहले कोई अक्षर या '.' नहीं होना चाहिए,
+# इसलिए ईमेल (name@example.com) यूज़रनेम नहीं गिने जाते; Telegram यूज़रनेम 5-32 अक्षर के होते हैं
+_FALLBACK_MENTION = re.compile(r"(?<![\w.@])@([a-z0-9_]{5,32})(?!\w)", re.IGNORECASE)
+
+MEMBER_STATUSES = frozenset({
+    ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.MEMBER, ChatMemberStatus.RESTRICTED
+})
+
+
+class Mention(NamedTuple):
+    username: str | None  # MENTION: lower-case, without '@'
+    user_id: int | None   # TEXT_MENTION: the mentioned account
+
+
+def extract_mentions(text: str | None, entities=None) -> list[Mention]:
+    """
+    Returns the @mentions in a message from its MENTION / TEXT_MENTION entities.
+
+    Only when ``entities`` is None does a regex run over the text.
+    """
+    if entities is not None:
+        mentions = []
+        encoded = None
+        for entity in entities:
+            if entity.type == MessageEntityType.TEXT_MENTION and entity.user:
+                mentions.append(Mention(None, entity.user.id))
+            elif entity.type == MessageEntityType.MENTION and text:
+                if encoded is None:
+                    encoded = text.encode("utf-16-le")
+                mentions.append(Mention(utf16_slice(encoded, entity.offset, entity.length).lstrip("@").lower(), None))
+        return mentions
+    if not text or "@" not in text:
+        return []
+    return [Mention(username.lower(), None) for username in _FALLBACK_MENTION.findall(text)]
+
+
+class _ChatAllowlist:
+    __slots__ = ("usernames", "user_ids", "expires_at")
+
+    def __init__(self, usernames: set, user_ids: set, expires_at: float):
+        self.usernames = usernames
+        self.user_ids = user_ids
+        self.expires_at = expires_at
+
+
+class MentionAllowlist:
+    """
+    Decides which @mentions in a group are fine: the bot, the group's admins,
+    the group itself and its linked channel, recent senders, and anyone who
+    is a member of the group.
+
+    Admins and the chat's own usernames are fetched only when a message
+    actually contains a mention and are kept for ``ttl`` seconds. Recent
+    senders are recorded from every message at no API cost. A mention that
+    is none of these is checked once with ``get_chat_member`` and the answer
+    is cached, so repeated promos of the same @channel cost no further calls.
+    """
+
+    def __init__(self, ttl: float = 600, recent_senders: int = 256, max_chats: int = 4096, membership_cache_size: int = 20_000):
+        self.ttl = ttl
+        self.recent_senders = recent_senders
+        self.max_chats = max_chats
+        self.membership_cache_size = membership_cache_size
+        self._chats: OrderedDict[int, _ChatAllowlist] = OrderedDict()
+        self._recent: OrderedDict[int, OrderedDict] = OrderedDict()
+        self._membership: OrderedDict[tuple, tuple[bool, float]] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def note_sender(self, chat_id: int, user):
+        """Remembers a user who just spoke in (or joined) the chat."""
+        recent = self._recent.get(chat_id)
+        if recent is None:
+            recent = self._recent[chat_id] = OrderedDict()
+            if len(self._recent) > self.max_chats:
+                self._recent.popitem(last=False)
+        for key in (user.id, user.username.lower() if user.username else None):
+            if key is not None:
+                recent[key] = None
+                recent.move_to_end(key)
+        while len(recent) > self.recent_senders * 2:
+            recent.popitem(last=False)
+
+    def invalidate(self, chat_id: int):
+        self._chats.pop(chat_id, None)
+
+    async def first_unknown(self, client, chat_id: int, text: str | None, entities=None) -> str | None:
+        """Returns the first mention (as '@username' or a user id) that is not allowed in the chat, or None."""
+        mentions = extract_mentions(text, entities)
+        if not mentions:
+            return None
+
+        allowlist = await self._chat_allowlist(client, chat_id)
+        recent = self._recent.get(chat_id, {})
+        bot_username = (client.me.username or "").lower()
+        for username, user_id in mentions:
+            key = username if username is not None else user_id
+            if key in recent or key in allowlist.usernames or key in allowlist.user_ids or key == bot_username or key == client.me.id:
+                self.cache_hits += 1
+                continue
+            if not await self._is_member(client, chat_id, key):
+                return f"@{username}" if username is not None else str(user_id)
+        return None
+
+    async def forward_not_allowed(self, client, chat_id: int, forward_chat) -> str | None:
+        """
+        For a message forwarded from another channel or group: returns that
+        chat ('@username' or its id) unless it is this group, its linked
+        channel, or a chat whose username is on the allowlist.
+        """
+        if forward_chat is None or forward_chat.id == chat_id:
+            return None
+        allowlist = await self._chat_allowlist(client, chat_id)
+        username = forward_chat.username.lower() if forward_chat.username else None
+        if forward_chat.id in allowlist.user_ids or (username is not None and username in allowlist.usernames):
+            self.cache_hits += 1
+            return None
+        return f"@{username}" if username is not None else str(forward_chat.id)
+
+    async def _chat_allowlist(self, client, chat_id: int) -> _ChatAllowlist:
+        now = time.monotonic()
+        allowlist = self._chats.get(chat_id)
+        if allowlist is not None and allowlist.expires_at > now:
+            self._chats.move_to_end(chat_id)
+            return allowlist
+
+        usernames, user_ids = set(), set()
+        ttl = self.ttl
+        try:
+            async for member in client.get_chat_members(chat_id, filter=ChatMembersFilter.ADMINISTRATORS):
+                user_ids.add(member.user.id)
+                if member.user.username:
+                    usernames.add(member.user.username.lower())
+            chat = await client.get_chat(chat_id)
+            for related in (chat, getattr(chat, "linked_chat", None)):
+                if related is not None:
+                    user_ids.add(related.id)
+                    if related.username:
+                        usernames.add(related.username.lower())
+        except Exception as e:
+            # अगली बार जल्दी दोबारा कोशिश करें
+            logger.warning(f"Could not load mention allowlist for chat {chat_id}: {e}")
+            ttl = min(ttl, 60)
+
+        allowlist = self._chats[chat_id] = _ChatAllowlist(usernames, user_ids, now + ttl)
+        self._chats.move_to_end(chat_id)
+        if len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+        return allowlist
+
+    async def _is_member(self, client, chat_id: int, user: "str | int") -> bool:
+        now = time.monotonic()
+        cache_key = (chat_id, user)
+        cached = self._membership.get(cache_key)
+        if cached is not None and cached[1] > now:
+            self.cache_hits += 1
+            return cached[0]
+
+        self.cache_misses += 1
+        try:
+            member = await client.get_chat_member(chat_id, user)
+            is_member = member.status in MEMBER_STATUSES
+        except RPCError:
+            # UserNotParticipant, या यूज़रनेम किसी चैनल/बॉट का है जो ग्रुप में नहीं
+            is_member = False
+        except Exception as e:
+            logger.warning(f"Could not check membership of {user} in chat {chat_id}: {e}")
+            return True
+
+        self._membership[cache_key] = (is_member, now + self.ttl)
+        self._membership.move_to_end(cache_key)
+        if len(self._membership) > self.membership_cache_size:
+            self._membership.popitem(last=False)
+        return is_member
@@ -0,0 +1,48 @@
+# menus.py
+#
+# इनलाइन मेनू वाले मैसेज। जो मेनू मैसेज पर पहले से दिख रहा है, वही दोबारा एडिट करने पर Telegram
+# MESSAGE_NOT_MODIFIED लौटाता है; उस बेकार राउंड-ट्रिप से बचने के लिए हर मैसेज का आखिरी मेनू याद रखा जाता है।
+
+from collections import OrderedDict
+
+
+def keyboard_signature(reply_markup) -> tuple:
+    rows = reply_markup.inline_keyboard if reply_markup is not None else ()
+    return tuple(tuple((button.text, button.callback_data, button.url) for button in row) for row in rows)
+
+
+class ShownMenus:
+    """
+    The last menu (text and keyboard) this process put on each message.
+
+    An entry only counts while the message still carries that keyboard
+    (a callback query brings the message as it is now), so a message
+    edited by some other handler or process is edited again.
+    """
+
+    def __init__(self, max_messages: int = 4096):
+        self.max_messages = max_messages
+        self._menus: OrderedDict[tuple, tuple] = OrderedDict()
+        self.cache_hits = 0 # छोड़े गए एडिट
+        self.cache_misses = 0
+
+    def is_shown(self, message, text: str, reply_markup) -> bool:
+        key = (message.chat.id, message.id)
+        shown = self._menus.get(key)
+        keyboard = keyboard_signature(reply_markup)
+        if shown is not None and shown == (text, keyboard) and keyboard_signature(message.reply_markup) == keyboard:
+            self.cache_hits += 1
+            self._menus.move_to_end(key)
+            return True
+        self.cache_misses += 1
+        return False
+
+    def record(self, message, text: str, reply_markup):
+        key = (message.chat.id, message.id)
+        self._menus[key] = (text, keyboard_signature(reply_markup))
+        self._menus.move_to_end(key)
+        if len(self._menus) > self.max_messages:
+            self._menus.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._menus)
@@ -0,0 +1,90 @@
+# message_content.py
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+from pyrogram.types import InlineKeyboardMarkup
+
+
+class MessageContent(NamedTuple):
+    """Everything in a group message that the moderation pipeline checks."""
+    text: str                      # text या caption
+    entities: list | None          # entities या caption_entities (None = Telegram ने कुछ नहीं भेजा)
+    button_urls: tuple[str, ...]   # इनलाइन बटन के URL (जैसे चैनल पोस्ट फ़ॉरवर्ड करने पर)
+    forward_chat: object | None    # चैनल/ग्रुप जहाँ से मैसेज फ़ॉरवर्ड हुआ
+    sticker_set: str | None
+
+    @property
+    def scan_text(self) -> str:
+        """Text for the word and spam filters: the text/caption plus the sticker set name."""
+        if not self.sticker_set:
+            return self.text
+        sticker_words = self.sticker_set.replace("_", " ")
+        return f"{self.text}\n{sticker_words}" if self.text else sticker_words
+
+    @property
+    def digest(self) -> int:
+        """Changes whenever anything the filters look at changes."""
+        forward_id = self.forward_chat.id if self.forward_chat is not None else None
+        # entities भी: एडिट में टेक्स्ट वही रखकर उसके पीछे TEXT_LINK छिपाया जा सकता है
+        entities = tuple(
+            (str(entity.type), entity.offset, entity.length, getattr(entity, "url", None)) for entity in self.entities or ()
+        )
+        return hash((self.text, entities, self.button_urls, forward_id, self.sticker_set))
+
+    def __bool__(self) -> bool:
+        return bool(self.text or self.button_urls or self.forward_chat is not None or self.sticker_set)
+
+
+def message_content(message) -> MessageContent:
+    if message.text:
+        text, entities = str(message.text), message.entities
+    else:
+        text, entities = str(message.caption or ""), message.caption_entities
+
+    button_urls = ()
+    markup = message.reply_markup
+    if isinstance(markup, InlineKeyboardMarkup):
+        button_urls = tuple(button.url for row in markup.inline_keyboard for button in row if button.url)
+
+    sticker = message.sticker
+    return MessageContent(
+        text,
+        entities,
+        button_urls,
+        message.forward_from_chat,
+        sticker.set_name if sticker is not None and sticker.set_name else None
+    )
+
+
+class VerdictCache:
+    """
+    LRU of ``(chat_id, message_id) -> (content digest, verdict)``.
+
+    Lets the handler skip a message it has already judged: a redelivered
+    update, or an edit that did not change anything the filters look at
+    (Telegram also sends edits for link previews and similar).
+    """
+    MISSING = object()
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, int], tuple[int, str | None]] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def lookup(self, chat_id: int, message_id: int, digest: int):
+        """The cached verdict (a violation type or None), or ``VerdictCache.MISSING``."""
+        entry = self._entries.get((chat_id, message_id))
+        if entry is not None and entry[0] == digest:
+            self.cache_hits += 1
+            return entry[1]
+        self.cache_misses += 1
+        return self.MISSING
+
+    def store(self, chat_id: int, message_id: int, digest: int, verdict: str | None):
+        key = (chat_id, message_id)
+        self._entries[key] = (digest, verdict)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,235 @@
+# metrics.py
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus के डिफ़ॉल्ट बकेट (सेकंड में)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _with_callback(values: dict, callback) -> dict:
+    """Merges what ``callback()`` returns (a number, or a dict of label-value tuples to numbers) into ``values``."""
+    if callback is not None:
+        result = callback()
+        if isinstance(result, dict):
+            values.update(result)
+        else:
+            values[()] = result
+    return values
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally labelled; either incremented or read from a callback at scrape time."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._callback = None
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, callback):
+        """Like ``Gauge.set_function``; the callback's values must only grow (running totals since start)."""
+        self._callback = callback
+
+    def _samples(self) -> list[str]:
+        values = _with_callback(dict(self._values), self._callback)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Gauge(_Metric):
+    """Gauge whose value is either set directly or read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, callback):
+        """``callback()`` returns a number, or a dict of label-value tuples to numbers."""
+        self._callback = callback
+
+    def _samples(self) -> list[str]:
+        values = _with_callback(dict(self._values), self._callback)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Latency histogram with cumulative buckets, as Prometheus expects."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def total_count(self) -> int:
+        """Observations across all label values."""
+        return sum(sum(counts) for counts in list(self._counts.values()))
+
+    def _samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            snapshot = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds all metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Bot Metrics ---
+HANDLER_SECONDS = REGISTRY.register(Histogram("grouppolice_handler_seconds", "Handler run time.", ("handler",)))
+HANDLER_ERRORS = REGISTRY.register(Counter("grouppolice_handler_errors_total", "Handlers that raised.", ("handler",)))
+QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram("grouppolice_queue_wait_seconds", "Time an update waited in its chat queue."))
+FILTER_SECONDS = REGISTRY.register(Histogram("grouppolice_filter_seconds", "Content filter time in handle_group_messages.", ("stage",)))
+VIOLATIONS = REGISTRY.register(Counter("grouppolice_violations_total", "Detected violations.", ("type",)))
+DB_CALL_SECONDS = REGISTRY.register(Histogram("grouppolice_db_call_seconds", "database.py call latency.", ("function",)))
+DB_CALL_ERRORS = REGISTRY.register(Counter("grouppolice_db_call_errors_total", "database.py calls that raised.", ("function",)))
+DB_POOL_WAIT_SECONDS = REGISTRY.register(Histogram("grouppolice_db_pool_wait_seconds", "Time spent waiting for a MongoDB connection from the pool."))
+DB_POOL_CHECKOUT_FAILURES = REGISTRY.register(Counter("grouppolice_db_pool_checkout_failures_total", "MongoDB pool checkouts that failed (e.g. wait queue timeout).", ("reason",)))
+TELEGRAM_API_SECONDS = REGISTRY.register(Histogram("grouppolice_telegram_api_seconds", "Telegram API call latency.", ("method",)))
+TELEGRAM_API_ERRORS = REGISTRY.register(Counter("grouppolice_telegram_api_errors_total", "Telegram API calls that failed.", ("method", "error")))
+FLOODWAITS = REGISTRY.register(Counter("grouppolice_floodwait_total", "FloodWait errors raised by Telegram.", ("method",)))
+FLOODWAIT_SECONDS = REGISTRY.register(Counter("grouppolice_floodwait_seconds_total", "Seconds Telegram asked us to wait.", ("method",)))
+CACHE_HITS = REGISTRY.register(Counter("grouppolice_cache_hits_total", "Cache hits since start.", ("cache",)))
+CACHE_MISSES = REGISTRY.register(Counter("grouppolice_cache_misses_total", "Cache misses since start.", ("cache",)))
+QUEUE_DEPTH = REGISTRY.register(Gauge("grouppolice_update_queue_depth", "Updates waiting in chat queues."))
+QUEUE_MAX_DEPTH = REGISTRY.register(Gauge("grouppolice_update_queue_max_depth", "Depth of the longest chat queue."))
+IN_FLIGHT = REGISTRY.register(Gauge("grouppolice_handlers_in_flight", "Handlers currently running."))
+UPDATES_DROPPED = REGISTRY.register(Counter("grouppolice_updates_dropped_total", "Updates dropped because a chat queue was full."))
+SPAM_CLUSTERS = REGISTRY.register(Gauge("grouppolice_spam_fingerprint_clusters", "Near-duplicate message clusters held in memory."))
+CONTENT_ANALYSES = REGISTRY.register(Counter("grouppolice_content_analyses_total", "Messages analyzed inline or in the process pool since start.", ("mode",)))
+OUTBOUND_THROTTLE_SECONDS = REGISTRY.register(Counter("grouppolice_outbound_throttle_seconds_total", "Seconds outbound calls waited in the client-side rate limiter since start."))
+SCHEDULED_JOBS = REGISTRY.register(Counter("grouppolice_scheduled_jobs_total", "Scheduled job runs (unmute, unban, lockdown) since start: executed, failed (retried or dropped), dropped.", ("outcome",)))
+SHARD_UPDATES = REGISTRY.register(Counter("grouppolice_shard_updates_routed_total", "Updates the coordinator sent to each shard.", ("shard",)))
+
+_cache_sources: dict[str, object] = {}
+
+
+def register_cache(name: str, cache):
+    """Exposes ``cache.cache_hits`` / ``cache.cache_misses`` under the ``cache`` label ``name``."""
+    _cache_sources[name] = cache
+
+
+CACHE_HITS.set_function(lambda: {(name,): cache.cache_hits for name, cache in _cache_sources.items()})
+CACHE_MISSES.set_function(lambda: {(name,): cache.cache_misses for name, cache in _cache_sources.items()})
+
+
+def track_db_call(func):
+    """Decorator for database.py functions: records latency and errors per function."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            DB_CALL_ERRORS.inc(function=name)
+            raise
+        finally:
+            DB_CALL_SECONDS.observe(time.perf_counter() - start, function=name)
+    return wrapper
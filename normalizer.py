@@ -0,0 +1,118 @@
+# normalizer.py
+
+import re
+import unicodedata
+from typing import NamedTuple
+
+# --- Translation Tables ---
+# ये टेबल इम्पोर्ट के समय एक बार बनती हैं; हर मैसेज पर सिर्फ़ str.translate चलता है
+
+# दिखाई न देने वाले कैरेक्टर (zero-width, bidi कंट्रोल, variation selectors आदि)
+_INVISIBLE = [
+    0x00AD, 0x061C, 0x115F, 0x1160, 0x17B4, 0x17B5, 0x180E, 0x3164, 0xFEFF, 0xFFA0,
+    *range(0x180B, 0x180E), *range(0x200B, 0x2010), *range(0x202A, 0x202F),
+    *range(0x2060, 0x2065), *range(0x2066, 0x2070), *range(0xFE00, 0xFE10),
+]
+# Latin के accent (NFKD के बाद अलग हुए combining marks): "fück" -> "fuck"
+_COMBINING_MARKS = range(0x0300, 0x0370)
+
+# Cyrillic/Greek/IPA के अक्षर जो Latin जैसे दिखते हैं (casefold के बाद वाले रूप)
+_HOMOGLYPHS = {
+    "a": "аα", "b": "βь", "c": "сϲ", "d": "ԁ", "e": "еёεє", "g": "ɡ", "h": "һн", "i": "іїιı",
+    "j": "ј", "k": "кκ", "m": "м", "n": "ηп", "o": "оοσ", "p": "рρ", "q": "ԛ", "s": "ѕ",
+    "t": "тτ", "u": "υ", "v": "ν", "w": "ԝω", "x": "хχ", "y": "уγ",
+}
+
+# देवनागरी: नुक़्ता हटाओ (ज़ -> ज), चंद्रबिंदु को अनुस्वार मानो (गाँड -> गांड)
+_DEVANAGARI = {0x093C: None, 0x0901: "ं"}
+
+_LEET = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+
+FOLD_TABLE = str.maketrans({
+    **{code: None for code in (*_INVISIBLE, *_COMBINING_MARKS)},
+    **{char: latin for latin, chars in _HOMOGLYPHS.items() for char in chars},
+    **_DEVANAGARI,
+})
+LEET_TABLE = str.maketrans(_LEET)
+
+# गैर-ASCII टेक्स्ट पर str.translate हर कैरेक्टर के लिए dict देखता है; ज़्यादातर मैसेज में
+# बदलने लायक कुछ होता ही नहीं, इसलिए पहले एक regex कैरेक्टर-क्लास से जाँच लेते हैं
+def _char_class(codes) -> re.Pattern:
+    return re.compile("[" + "".join(re.escape(chr(code)) for code in sorted(codes)) + "]")
+
+
+_NEEDS_FOLD = _char_class(FOLD_TABLE)
+_NEEDS_LEET = _char_class(LEET_TABLE)
+
+# "f.u.c.k", "chu-tiya", "f_u_c_k" -> शब्द के अंदर के विभाजक हटाओ
+_INNER_SEPARATORS = re.compile(r"(?<=\w)[.\-_*'’`~,|]+(?=\w)")
+# "f u c k" -> अलग-अलग लिखे कम से कम 3 अकेले अक्षर जोड़ दो
+_SPACED_LETTERS = re.compile(r"(?<!\w)\w(?: \w){2,}(?!\w)")
+# "fuuuuck" -> "fuuck"; तीन या ज़्यादा की लड़ी दो तक छोटी, वर्डलिस्ट में भी। पूरा एक कर देने से
+# "saad"/"sad", "chhod"/"chod", "boobs"/"bobs", "hoot"/"hot" एक हो जाते थे
+_REPEATS = re.compile(r"(.)\1{2,}")
+
+
+class NormalizedText(NamedTuple):
+    """
+    Forms of one message text, computed once and shared by all filters.
+
+    ``folded`` keeps the text readable (links and usernames still work): it is
+    compatibility-decomposed, casefolded, stripped of invisible characters and
+    accents, with homoglyphs mapped to Latin. ``words`` is ``folded`` with
+    leetspeak undone, separators between letters removed and runs of a
+    repeated character cut to two; word lists are matched against it.
+    """
+    text: str
+    folded: str
+    words: str
+
+
+def fold(text: str) -> str:
+    """NFKD + casefold + invisible/accent removal + homoglyph folding."""
+    if text.isascii():
+        # ASCII में न homoglyph हैं न अदृश्य कैरेक्टर
+        return text.casefold()
+    text = unicodedata.normalize("NFKD", text).casefold()
+    return text.translate(FOLD_TABLE) if _NEEDS_FOLD.search(text) else text
+
+
+def word_form(folded: str) -> str:
+    """The ``words`` form of already folded text."""
+    text = folded.translate(LEET_TABLE) if _NEEDS_LEET.search(folded) else folded
+    text = _INNER_SEPARATORS.sub("", text)
+    text = _SPACED_LETTERS.sub(lambda match: match.group().replace(" ", ""), text)
+    return _REPEATS.sub(r"\1\1", text)
+
+
+def normalize(text: str) -> NormalizedText:
+    folded = fold(text)
+    return NormalizedText(text, folded, word_form(folded))
+
+
+def as_normalized(text: "str | NormalizedText") -> NormalizedText:
+    return text if isinstance(text, NormalizedText) else normalize(text)
+
+
+# देवनागरी मात्राएँ \w में नहीं आतीं, इसलिए \b की जगह अपनी सीमा
+_WORD_CHARS = r"\wऀ-ॿ"
+
+
+def word_forms(words) -> set[str]:
+    """Normalized forms of a word list, as they appear in ``NormalizedText.words``."""
+    return {form for form in (word_form(fold(word.strip())) for word in words) if form}
+
+
+def compile_forms(forms) -> re.Pattern:
+    """
+    One alternation regex for a whole set of word forms, so a filter scans the text once.
+
+    Longer forms are tried first so that e.g. "behenchod" wins over "chod" in the match.
+    """
+    alternation = "|".join(re.escape(form) for form in sorted(forms, key=len, reverse=True))
+    return re.compile(rf"(?<![{_WORD_CHARS}])(?:{alternation})(?![{_WORD_CHARS}])")
+
+
+def compile_wordlist(words) -> re.Pattern:
+    """Normalizes a word list the same way as messages and compiles it with ``compile_forms``."""
+    return compile_forms(word_forms(words))
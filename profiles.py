@@ -0,0 +1,149 @@
+# profiles.py
+#
+# सेटिंग्स प्रोफ़ाइल: किसी ग्रुप की सेटिंग्स JSON में, ताकि वही सेटिंग्स दूसरे ग्रुप (या पूरे फ़ेडरेशन) पर एक बार में
+# लगाई जा सकें। ग्रुप-विशेष चीज़ें (टाइटल, फ़ेडरेशन, लॉकडाउन, bot_enabled) प्रोफ़ाइल में नहीं जातीं।
+
+import json
+from datetime import datetime
+
+from link_policy import link_domain
+from service_messages import SERVICE_CLASSES, SERVICE_TTL_MAX, SERVICE_TTL_MIN
+from warn_ladder import LADDER_ACTIONS, parse_ladder
+
+PROFILE_FORMAT = 1 # प्रोफ़ाइल JSON का फ़ॉर्मेट; बदलने पर पुरानी फ़ाइलें पहचानकर मना की जाती हैं
+PROFILE_MAX_BYTES = 64 * 1024
+
+PROFILE_BOOL_FIELDS = (
+    "welcome_enabled", "anti_link_enabled", "anti_flood_enabled", "filter_abusive",
+    "filter_pornographic_text", "filter_spam", "filter_bio_links", "usernamedel_enabled",
+)
+PROFILE_LIST_FIELDS = ("blocklist", "allowlist", "allowed_domains", "denied_domains")
+PROFILE_FIELDS = PROFILE_BOOL_FIELDS + PROFILE_LIST_FIELDS + ("welcome_message", "warn_limit", "warn_ladder", "service_ttl")
+WELCOME_MESSAGE_MAX = 4096
+
+
+def export_profile(group: dict) -> dict:
+    """The group's profile fields, with the format and the ``settings_version`` they were taken at."""
+    return {
+        "format": PROFILE_FORMAT,
+        "source_group": group["_id"],
+        "settings_version": group.get("settings_version", 0),
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "settings": {field: group[field] for field in PROFILE_FIELDS if field in group},
+    }
+
+
+def dump_profile(group: dict) -> bytes:
+    return json.dumps(export_profile(group), ensure_ascii=False, indent=2).encode()
+
+
+def parse_profile(raw: "str | bytes", list_limit: int) -> dict:
+    """
+    The settings of a profile file, validated and normalized like the
+    commands that set them. Raises ValueError with a message for the user.
+    """
+    if len(raw) > PROFILE_MAX_BYTES:
+        raise ValueError(f"प्रोफ़ाइल {PROFILE_MAX_BYTES // 1024} KB से बड़ी नहीं हो सकती।")
+    try:
+        profile = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("यह मान्य JSON नहीं है।")
+    if not isinstance(profile, dict) or not isinstance(profile.get("settings"), dict):
+        raise ValueError("यह सेटिंग्स प्रोफ़ाइल नहीं है (`/exportsettings` से बनी फ़ाइल दें)।")
+    if profile.get("format") != PROFILE_FORMAT:
+        raise ValueError(f"प्रोफ़ाइल का फ़ॉर्मेट `{profile.get('format')}` समर्थित नहीं है।")
+
+    settings = profile["settings"]
+    unknown = sorted(set(settings) - set(PROFILE_FIELDS))
+    if unknown:
+        raise ValueError(f"अज्ञात सेटिंग: `{'`, `'.join(unknown)}`")
+    if not settings:
+        raise ValueError("प्रोफ़ाइल में कोई सेटिंग नहीं है।")
+
+    parsed = {}
+    for field, value in settings.items():
+        if field in PROFILE_BOOL_FIELDS:
+            if not isinstance(value, bool):
+                raise ValueError(f"`{field}` true या false होना चाहिए।")
+            parsed[field] = value
+        elif field in PROFILE_LIST_FIELDS:
+            parsed[field] = _parse_list(field, value, list_limit)
+        elif field == "welcome_message":
+            if not isinstance(value, str) or not value.strip() or len(value) > WELCOME_MESSAGE_MAX:
+                raise ValueError(f"`welcome_message` खाली नहीं और {WELCOME_MESSAGE_MAX} अक्षरों तक होना चाहिए।")
+            parsed[field] = value
+        elif field == "warn_limit":
+            if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= 100:
+                raise ValueError("`warn_limit` 1 से 100 के बीच की संख्या होनी चाहिए।")
+            parsed[field] = value
+        elif field == "warn_ladder":
+            parsed[field] = _parse_ladder(value)
+        elif field == "service_ttl":
+            parsed[field] = _parse_service_ttl(value)
+
+    # /setwarnladder की तरह: सीढ़ी हो तो warn_limit उसका आखिरी पायदान
+    if parsed.get("warn_ladder"):
+        parsed["warn_limit"] = parsed["warn_ladder"][-1]["at"]
+    return parsed
+
+
+def _parse_list(field: str, value, limit: int) -> list[str]:
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"`{field}` शब्दों की सूची होनी चाहिए।")
+    values = []
+    for raw in value:
+        if field in ("allowed_domains", "denied_domains"):
+            item = link_domain(raw)
+            if item is None:
+                raise ValueError(f"`{field}` में अमान्य डोमेन: `{raw}`")
+        else:
+            item = raw.strip().lower()
+            if len(item) > 64:
+                raise ValueError("कोई भी शब्द 64 अक्षरों से लंबा नहीं हो सकता।")
+        if item and item not in values:
+            values.append(item)
+    if len(values) > limit:
+        raise ValueError(f"`{field}` में अधिकतम {limit} मान हो सकते हैं।")
+    return values
+
+
+def _parse_ladder(value) -> list[dict] | None:
+    if value is None:
+        return None
+    if not isinstance(value, list):
+        raise ValueError("`warn_ladder` पायदानों की सूची होनी चाहिए।")
+    # हर पायदान को /setwarnladder के रूप में लिखकर उसी पार्सर से जाँचते हैं
+    args = []
+    for step in value:
+        if not isinstance(step, dict) or not isinstance(step.get("at"), int) or step.get("action") not in LADDER_ACTIONS:
+            raise ValueError("`warn_ladder` का हर पायदान {\"at\", \"action\"} होना चाहिए।")
+        arg = f"{step['at']}:{step['action']}"
+        if "duration" in step:
+            if not isinstance(step["duration"], int) or step["duration"] <= 0 or step["duration"] % 60:
+                raise ValueError("पायदान की `duration` मिनटों में पूरी सेकंड संख्या होनी चाहिए।")
+            arg += f":{step['duration'] // 60}m"
+        args.append(arg)
+    return parse_ladder(args)
+
+
+def _parse_service_ttl(value) -> dict:
+    if not isinstance(value, dict) or set(value) - set(SERVICE_CLASSES):
+        raise ValueError(f"`service_ttl` की कुंजियाँ {', '.join(SERVICE_CLASSES)} में से होनी चाहिए।")
+    ttls = {}
+    for kind, seconds in value.items():
+        if seconds is None:
+            continue
+        if not isinstance(seconds, int) or isinstance(seconds, bool) or not SERVICE_TTL_MIN <= seconds <= SERVICE_TTL_MAX:
+            raise ValueError(f"`service_ttl.{kind}` {SERVICE_TTL_MIN} से {SERVICE_TTL_MAX} सेकंड के बीच होना चाहिए।")
+        ttls[kind] = seconds
+    return ttls
+
+
+def format_history(group: dict, limit: int = 10) -> str:
+    """The latest ``settings_history`` entries, newest first."""
+    lines = []
+    for entry in reversed((group.get("settings_history") or [])[-limit:]):
+        at = entry["at"].strftime("%Y-%m-%d %H:%M") if isinstance(entry.get("at"), datetime) else "?"
+        keys = ", ".join(entry.get("keys") or []) or "—"
+        lines.append(f"• `{at}` — `{entry.get('by') or 'बॉट'}` ({entry.get('src', '?')}): {keys}")
+    return "\n".join(lines)
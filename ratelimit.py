@@ -0,0 +1,116 @@
+# ratelimit.py
+#
+# Telegram की सीमाओं (लगभग 30 मैसेज/सेकंड कुल, 20 मैसेज/मिनट एक ग्रुप में) से पहले ही खुद को
+# धीमा करना, ताकि बड़े काम (ब्रॉडकास्ट, बल्क बैन) FloodWait में न फँसें।
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from pyrogram.errors import FloodWait
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``capacity`` saved up."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def reserve(self, now: float) -> float:
+        """Takes one token and returns how long to wait before using it (0 if it is available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        # टोकन उधार: एक साथ आए कॉलर अपने-अपने बारी के समय तक सोते हैं, लाइन में लगने की ज़रूरत नहीं
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class OutboundLimiter:
+    """
+    Paces outgoing Telegram API calls on the client side.
+
+    Every call takes a token from a global bucket (``per_second``). Calls
+    that post into a group (``chat_id`` given) also take one from that
+    group's bucket (``per_chat_per_minute``). After a FloodWait all callers
+    pause for the time Telegram asked for, and ``on_flood_wait(seconds)`` is
+    called so other processes sending with the same bot can ``hold`` too.
+    ``clock`` is injectable so the load simulator can run on virtual time.
+    """
+
+    def __init__(self, per_second: float = 25, per_chat_per_minute: float = 20, max_chats: int = 4096, clock=time.monotonic):
+        self.per_second = per_second
+        self.per_chat_per_minute = per_chat_per_minute
+        self.max_chats = max_chats
+        self.clock = clock
+        # किसी भी खिड़की में अधिकतम capacity + rate × खिड़की कॉल: 25/s पर 5 का बर्स्ट, यानी 1 सेकंड में 30 तक
+        self._global = TokenBucket(per_second, max(1.0, per_second / 5), clock())
+        self._chats: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._paused_until = 0.0
+        self.on_flood_wait = None
+        self.calls = 0
+        self.flood_waits = 0
+        self.waited_seconds = 0.0
+
+    async def acquire(self, chat_id: int | None = None):
+        while True:
+            now = self.clock()
+            if self._paused_until > now:
+                await self._sleep(self._paused_until - now)
+                continue
+            wait = self._global.reserve(now)
+            if chat_id is not None:
+                wait = max(wait, self._chat_bucket(chat_id, now).reserve(now))
+            if wait > 0:
+                await self._sleep(wait)
+                # सोते समय FloodWait आया हो तो उसका भी इंतज़ार (टोकन पहले ही ले लिया गया है)
+                if self._paused_until > self.clock():
+                    await self._sleep(self._paused_until - self.clock())
+            self.calls += 1
+            return
+
+    def pause(self, seconds: float):
+        """Stops all callers for ``seconds`` (a FloodWait from Telegram)."""
+        self.flood_waits += 1
+        self.hold(seconds)
+        if self.on_flood_wait is not None:
+            self.on_flood_wait(seconds)
+
+    def hold(self, seconds: float):
+        """Stops all callers for ``seconds`` without counting a FloodWait (one another process got)."""
+        self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+    async def call(self, func, *args, chat_id: int | None = None, retries: int = 2, **kwargs):
+        """
+        Awaits ``func(*args, **kwargs)`` after ``acquire``; on FloodWait pauses
+        and retries up to ``retries`` times. Only pass ``retries > 0`` for
+        calls that are safe to repeat.
+        """
+        for attempt in range(retries + 1):
+            await self.acquire(chat_id)
+            try:
+                return await func(*args, **kwargs)
+            except FloodWait as e:
+                self.pause(e.value or 1)
+                if attempt == retries:
+                    raise
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # बर्स्ट + एक मिनट की दर मिलाकर भी per_chat_per_minute से ज़्यादा नहीं
+            burst = max(1.0, self.per_chat_per_minute / 5)
+            bucket = self._chats[chat_id] = TokenBucket(max(self.per_chat_per_minute - burst, 1.0) / 60, burst, now)
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def _sleep(self, seconds: float):
+        self.waited_seconds += seconds
+        await asyncio.sleep(seconds)
@@ -1,21 +1,24 @@
 # server.py
 
-import os
+import startup_profile # सबसे पहले, ताकि इम्पोर्ट का समय भी गिना जाए
+
 import asyncio
+import functools
+import io
 import re
 import html
 import time
-import requests
 import logging
-import threading
 
-from pyrogram import Client, filters, enums
+from pyrogram import Client, filters, enums, idle
 from pyrogram.types import (
     Message, InlineKeyboardMarkup, InlineKeyboardButton,
-    ChatMemberUpdated, CallbackQuery
+    ChatMemberUpdated, CallbackQuery, ChatPermissions
 )
 from pyrogram.enums import ChatMemberStatus, ChatType, ParseMode
+from pyrogram.errors import MessageNotModified
 from datetime import timedelta, datetime
+startup_profile.mark("import pyrogram")
 
 # Assuming config and database are in the same directory or accessible
 try:
@@ -23,71 +26,171 @@ try:
         BOT_TOKEN, API_ID, API_HASH, CASE_LOG_CHANNEL_ID, NEW_USER_GROUP_LOG_CHANNEL_ID,
         OWNER_ID, UPDATE_CHANNEL_USERNAME, ASBHAI_USERNAME,
         WELCOME_MESSAGE_DEFAULT, BOT_PHOTO_URL, REPO_LINK,
-        COMMAND_COOLDOWN_TIME, logger # Import logger from config
+        PORT, COMMAND_COOLDOWN_TIME, UPDATE_WORKERS, PER_CHAT_CONCURRENCY, PER_CHAT_QUEUE_LIMIT,
+        SPAM_FINGERPRINT_TTL, SPAM_FINGERPRINT_MAX_CLUSTERS, SPAM_DUPLICATE_MIN_USERS,
+        SPAM_DUPLICATE_MIN_CHATS, SPAM_DUPLICATE_MIN_REPEATS, SPAM_FINGERPRINT_MIN_LENGTH,
+        GROUP_LIST_LIMIT, GROUP_SETTINGS_CACHE_SIZE, MENTION_ALLOWLIST_TTL, VERDICT_CACHE_SIZE,
+        SHARD_ID, SHARD_COUNT, STARTUP_PROFILE, ANALYSIS_PROCESSES, ANALYSIS_INLINE_MAX_CHARS, ANALYSIS_BATCH_SIZE, ANALYSIS_BATCH_WINDOW_MS,
+        OUTBOUND_PER_SECOND, OUTBOUND_GROUP_PER_MINUTE, BULK_CONCURRENCY, BULK_MAX_TARGETS, BULK_TRACKING_TTL,
+        FED_BANS_RELOAD_SECONDS, JOB_BATCH_SIZE, JOB_MAX_IDLE_SECONDS, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS,
+        logger # Import logger from config
     )
 except ImportError as e:
     print(f"Error importing from config.py: {e}")
     print("Please ensure config.py exists and contains all required variables.")
     exit(1) # यदि कॉन्फ़िग फ़ाइल लोड नहीं हो पाती है तो एग्जिट करें
+startup_profile.mark("config")
 
 try:
     from database import (
         add_or_update_user, get_user, add_or_update_group, get_group,
-        update_group_settings, get_all_groups, delete_group,
-        add_warn, get_warns, delete_warns,
-        add_command_cooldown, get_command_cooldown, reset_command_cooldown
+        update_group_settings, apply_group_settings, get_all_groups, list_groups, delete_group, count_groups, count_users,
+        escalate_warn, get_warns, delete_warns,
+        add_command_cooldown, get_command_cooldown, reset_command_cooldown,
+        add_to_group_list, remove_from_group_list,
+        set_pending_input, get_pending_input, clear_pending_input,
+        create_federation, get_federation, update_federation, get_federation_groups,
+        add_fed_ban, remove_fed_ban, get_fed_ban, get_fed_ban_ids,
+        connect as connect_database, ping as ping_database
     )
+    import database
 except ImportError as e:
     print(f"Error importing from database.py: {e}")
     print("Please ensure database.py exists and contains all required functions.")
     exit(1)
+startup_profile.mark("database")
 
 try:
     from filters import (
-        is_abusive, is_pornographic_text, contains_links, is_spam, has_bio_link, contains_usernames
+        has_bio_link,
+        GroupSettingsCache, build_word_matcher, WORD_CATEGORY_ABUSIVE, WORD_CATEGORY_PORN
     )
 except ImportError as e:
     print(f"Error importing from filters.py: {e}")
     print("Please ensure filters.py exists and contains all required functions.")
     exit(1)
 
-from flask import Flask, jsonify
+from bulk_actions import BulkJob, PartialFailure, RecentUsers, parse_bulk_args
+from callback_router import CallbackRouter
+from chat_scheduler import ChatScheduler
+from content_analysis import ContentAnalyzer
+from federations import FEDERATION_NAME_MAX, FederationBans, can_manage, new_federation_id
+from health_server import start_health_server
+from instrumented_client import InstrumentedClient
+from jobs import JobScheduler
+from link_policy import LinkPolicy, link_domain
+from log_setup import SAMPLED
+from message_content import VerdictCache, message_content
+from menus import ShownMenus
+from mentions import MentionAllowlist
+from profiles import PROFILE_MAX_BYTES, dump_profile, format_history, parse_profile
+from ratelimit import OutboundLimiter
+from service_messages import (
+    DELETE_BATCH_MAX, SERVICE_CLASSES, LastMessages, delete_delay, format_service_ttls, parse_service_ttl, service_ttl
+)
+from sharding import ShardWorkerClient
+from warn_ladder import ACTION_LABELS, format_duration, format_ladder, ladder_for, parse_duration, parse_ladder, step_for
+from spam_fingerprint import NOT_FINGERPRINTED, FingerprintStore
+import metrics
+startup_profile.mark("bot modules")
 
-# --- Flask Server for Health Checks (Koyeb specific) ---
-app = Flask(__name__)
 
-@app.route('/')
-def health_check():
-    return jsonify(
-        status="running",
-        bot_name=pyrogram_app.me.first_name if pyrogram_app.me else "N/A",
-        bot_id=pyrogram_app.me.id if pyrogram_app.me else "N/A"
-    )
+# --- Pyrogram Client Initialization ---
+# शार्डेड मोड (sharding.py) में हर वर्कर का अपना सेशन होता है और अपडेट कोऑर्डिनेटर से आते हैं
+pyrogram_app = (InstrumentedClient if SHARD_ID is None else ShardWorkerClient)(
+    "GroupPoliceBot" if SHARD_ID is None else f"GroupPoliceBot-shard-{SHARD_ID}",
+    api_id=API_ID,
+    api_hash=API_HASH,
+    bot_token=BOT_TOKEN
+)
+
+# शार्डेड मोड में कोऑर्डिनेटर से जुड़ाव (main() सेट करता है); single-process मोड में None
+shard_link = None
 
-def run_flask_app():
-    # Use 0.0.0.0 for Koyeb deployment
-    app.run(host='0.0.0.0', port=os.getenv("PORT", 8000), debug=False)
+# इनलाइन बटन कॉलबैक के लिए राउटर
+callback_router = CallbackRouter()
 
-# Start Flask app in a separate thread
-flask_thread = threading.Thread(target=run_flask_app)
-flask_thread.daemon = True # Daemonize thread so it exits when main program exits
-logger.info("Flask app starting on port 8000")
-flask_thread.start()
-logger.info("Flask server started in a separate thread.")
+# हर चैट के अपडेट अलग कतार में, ताकि एक बड़ा ग्रुप सारे वर्कर न घेर ले
+chat_scheduler = ChatScheduler(
+    workers=UPDATE_WORKERS,
+    per_chat_concurrency=PER_CHAT_CONCURRENCY,
+    max_queue_per_chat=PER_CHAT_QUEUE_LIMIT
+)
 
-# Give Flask server a few seconds to warm up for health checks
-time.sleep(5)
-logger.info("Giving Flask server 5 seconds to warm up for health checks.")
+# सभी ग्रुप्स में दोहराए गए मैसेज पकड़ने के लिए (मेमोरी में, DB हिट के बिना)
+fingerprint_store = FingerprintStore(
+    ttl=SPAM_FINGERPRINT_TTL,
+    max_clusters=SPAM_FINGERPRINT_MAX_CLUSTERS,
+    min_users=SPAM_DUPLICATE_MIN_USERS,
+    min_chats=SPAM_DUPLICATE_MIN_CHATS,
+    min_repeats=SPAM_DUPLICATE_MIN_REPEATS,
+    min_length=SPAM_FINGERPRINT_MIN_LENGTH
+)
 
+# हर ग्रुप की शब्द-सूचियों का कंपाइल किया गया मैचर और डोमेन नीति (settings_version बदलने पर दोबारा बनते हैं)
+wordlist_cache = GroupSettingsCache(build_word_matcher, max_groups=GROUP_SETTINGS_CACHE_SIZE)
+link_policy_cache = GroupSettingsCache(LinkPolicy.from_group, max_groups=GROUP_SETTINGS_CACHE_SIZE)
 
-# --- Pyrogram Client Initialization ---
-pyrogram_app = Client(
-    "GroupPoliceBot",
-    api_id=API_ID,
-    api_hash=API_HASH,
-    bot_token=BOT_TOKEN,
-    plugins=dict(root="plugins") # This assumes you have a 'plugins' folder
+# किन @मेंशन की अनुमति है: बॉट, एडमिन, ग्रुप/लिंक्ड चैनल, हाल के सदस्य (API कॉल सिर्फ़ मेंशन मिलने पर)
+mention_allowlist = MentionAllowlist(ttl=MENTION_ALLOWLIST_TTL, max_chats=GROUP_SETTINGS_CACHE_SIZE)
+
+# लंबे टेक्स्ट का CPU वाला विश्लेषण प्रोसेस पूल में, ताकि event loop बाकी चैट्स के लिए खाली रहे
+content_analyzer = ContentAnalyzer(
+    processes=ANALYSIS_PROCESSES,
+    inline_max_chars=ANALYSIS_INLINE_MAX_CHARS,
+    batch_size=ANALYSIS_BATCH_SIZE,
+    batch_window=ANALYSIS_BATCH_WINDOW_MS / 1000,
+    fingerprint_min_length=SPAM_FINGERPRINT_MIN_LENGTH
+)
+
+# (chat, message) -> कंटेंट हैश और नतीजा; एडिट तभी दोबारा जाँचा जाता है जब कंटेंट बदला हो
+verdict_cache = VerdictCache(max_entries=VERDICT_CACHE_SIZE)
+
+# बाहर जाने वाली API कॉल की रफ़्तार (ब्रॉडकास्ट, बल्क कमांड); रेड के बाद `joined`/`flagged` के लिए हाल के यूज़र
+# शार्डेड मोड में सब वर्कर एक ही बॉट हैं: कुल रफ़्तार उनमें बँटती है (एक चैट हमेशा एक ही वर्कर पर, इसलिए ग्रुप वाली सीमा नहीं)
+outbound_limiter = OutboundLimiter(
+    per_second=OUTBOUND_PER_SECOND / SHARD_COUNT if SHARD_ID is not None else OUTBOUND_PER_SECOND,
+    per_chat_per_minute=OUTBOUND_GROUP_PER_MINUTE
+)
+recent_joins = RecentUsers(ttl=BULK_TRACKING_TTL, max_chats=GROUP_SETTINGS_CACHE_SIZE)
+flagged_users = RecentUsers(ttl=BULK_TRACKING_TTL, max_chats=GROUP_SETTINGS_CACHE_SIZE)
+# हर चैट में एक समय पर एक ही बल्क काम (chat_id -> asyncio.Task)
+bulk_jobs: dict[int, asyncio.Task] = {}
+
+# फ़ेडरेशन की बैन-सूचियाँ मेमोरी में: जुड़ने और मैसेज पर जाँच एक सेट लुकअप
+federation_bans = FederationBans(get_fed_ban_ids, ttl=FED_BANS_RELOAD_SECONDS)
+# फ़ेड-बैन को सदस्य ग्रुप्स तक पहुँचाने वाले टास्क (रेफ़रेंस रखना ज़रूरी, वरना GC)
+federation_tasks: set[asyncio.Task] = set()
+
+# टाइम वाले काम (अस्थायी म्यूट/बैन हटाना, लॉकडाउन खत्म करना) DB में; रीस्टार्ट के बाद भी अपने समय पर चलते हैं
+job_scheduler = JobScheduler(
+    database, batch_size=JOB_BATCH_SIZE, max_idle=JOB_MAX_IDLE_SECONDS,
+    lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS
 )
+# हर ग्रुप का आखिरी वेलकम, जिसे अगला वेलकम बदल देता है
+last_welcomes = LastMessages(max_chats=GROUP_SETTINGS_CACHE_SIZE)
+
+# हर मेनू मैसेज पर आखिरी दिखाया गया मेनू, ताकि बिना बदलाव वाला एडिट न भेजा जाए
+shown_menus = ShownMenus()
+
+# /metrics के लिए कैश और कतार के आंकड़े
+metrics.register_cache("callback_payloads", callback_router)
+metrics.register_cache("group_wordlists", wordlist_cache)
+metrics.register_cache("group_link_policies", link_policy_cache)
+metrics.register_cache("mention_allowlist", mention_allowlist)
+metrics.register_cache("message_verdicts", verdict_cache)
+metrics.register_cache("federation_bans", federation_bans)
+metrics.register_cache("shown_menus", shown_menus)
+metrics.QUEUE_DEPTH.set_function(chat_scheduler.total_queued)
+metrics.QUEUE_MAX_DEPTH.set_function(lambda: max((depth for _, depth in chat_scheduler.queue_depths(1)), default=0))
+metrics.IN_FLIGHT.set_function(chat_scheduler.in_flight)
+metrics.UPDATES_DROPPED.set_function(lambda: chat_scheduler.dropped)
+metrics.SPAM_CLUSTERS.set_function(lambda: len(fingerprint_store))
+metrics.CONTENT_ANALYSES.set_function(lambda: {("inline",): content_analyzer.inline, ("offloaded",): content_analyzer.offloaded})
+metrics.OUTBOUND_THROTTLE_SECONDS.set_function(lambda: outbound_limiter.waited_seconds)
+metrics.SCHEDULED_JOBS.set_function(lambda: {
+    ("executed",): job_scheduler.executed, ("failed",): job_scheduler.failed, ("dropped",): job_scheduler.dropped
+})
 
 # --- Helper Functions ---
 async def is_user_admin_in_chat(client: Client, chat_id: int, user_id: int) -> bool:
@@ -113,17 +216,64 @@ def check_cooldown(user_id: int, command_name: str) -> bool:
         if elapsed_time < COMMAND_COOLDOWN_TIME:
             return False
     add_command_cooldown(user_id, command_name, datetime.now())
-    logger.info(f"User {user_id} cooldown updated for command.")
+    logger.debug("User %s cooldown updated for command.", user_id)
+    return True
+
+def expire_service_message(sent: Message | None, ttl: int | None):
+    """Schedules the deletion of a bot message ``ttl`` seconds from now (nothing without a TTL)."""
+    if not ttl or sent is None:
+        return
+    try:
+        job_scheduler.schedule("delete_messages", delete_delay(ttl), sent.chat.id, payload={"message_ids": [sent.id]})
+    except Exception as e:
+        logger.warning(f"Could not schedule deletion of message {sent.id} in chat {sent.chat.id}: {e}")
+
+def expiring_replies(handler):
+    """
+    Group commands: the replies are deleted after the group's ``command`` TTL
+    (see service_messages.py). Not for commands that keep editing their reply.
+    """
+    @functools.wraps(handler)
+    async def wrapper(client: Client, message: Message):
+        ttl = service_ttl(get_group(message.chat.id, stale_ok=True) or {}, "command")
+        if ttl:
+            reply_text = message.reply_text
+
+            async def expiring_reply_text(*args, **kwargs):
+                sent = await reply_text(*args, **kwargs)
+                expire_service_message(sent, ttl)
+                return sent
+            message.reply_text = expiring_reply_text
+        return await handler(client, message)
+    return wrapper
+
+async def edit_menu(message: Message, text: str, reply_markup: InlineKeyboardMarkup | None, parse_mode=ParseMode.MARKDOWN) -> bool:
+    """
+    Puts a menu on a bot message: the caption of a photo (the /start menu),
+    the text otherwise. Returns False, without an API call, if the message
+    already shows exactly this menu.
+    """
+    if shown_menus.is_shown(message, text, reply_markup):
+        return False
+    try:
+        if message.photo:
+            await message.edit_caption(text, reply_markup=reply_markup, parse_mode=parse_mode)
+        else:
+            await message.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+    except MessageNotModified:
+        pass # जैसे रीस्टार्ट के बाद पहला एडिट: मैसेज पर यही मेनू पहले से था
+    shown_menus.record(message, text, reply_markup)
     return True
 
 # --- Custom Filters ---
-# New function for the 'not edited' filter
-def is_not_edited_message(_, m: Message):
-    return not m.edit_date
+# pyrogram कस्टम फ़िल्टर को (filter, client, update) देता है; async होने से यह executor थ्रेड में नहीं जाता
+async def has_moderatable_content(_, __, m: Message):
+    return bool(m.text or m.caption or m.sticker or m.forward_from_chat or m.reply_markup)
 
 # --- Message Handlers ---
 
 @pyrogram_app.on_message(filters.command("start") & filters.private)
+@chat_scheduler.handler
 async def start_command(client: Client, message: Message):
     logger.info(f"[{message.chat.id}] Received /start command from user {message.from_user.id} ({message.from_user.first_name}).")
     if not check_cooldown(message.from_user.id, "command"):
@@ -135,14 +285,14 @@ async def start_command(client: Client, message: Message):
     
     keyboard = [
         [InlineKeyboardButton("➕ ग्रुप में ऐड करें", url=f"https://t.me/{client.me.username}?startgroup=true")],
-        [InlineKeyboardButton("❓ सहायता", callback_data="help_menu")],
+        [InlineKeyboardButton("❓ सहायता", callback_data=callback_router.build("help"))],
         [InlineKeyboardButton("📢 अपडेट चैनल", url=f"https://t.me/{UPDATE_CHANNEL_USERNAME}")],
         [InlineKeyboardButton("🔗 सोर्स कोड", url=REPO_LINK)],
         [InlineKeyboardButton("📞 मुझसे संपर्क करें", url=f"https://t.me/{ASBHAI_USERNAME}")]
     ]
 
     is_connected_group_admin = False
-    all_current_groups = get_all_groups()
+    all_current_groups = get_all_groups(stale_ok=True)
     for group_data in all_current_groups:
         try:
             bot_member = await client.get_chat_member(group_data["_id"], client.me.id) # Use _id from database
@@ -154,7 +304,7 @@ async def start_command(client: Client, message: Message):
             logger.warning(f"Error checking admin status for group {group_data.get('title', group_data['_id'])}: {e}")
 
     if is_connected_group_admin:
-        keyboard.append([InlineKeyboardButton("⚙️ सेटिंग्स", callback_data="settings_menu")])
+        keyboard.append([InlineKeyboardButton("⚙️ सेटिंग्स", callback_data=callback_router.build("settings"))])
         logger.info(f"Settings button added for user {user.id}.")
 
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -184,6 +334,7 @@ async def start_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("help") & filters.private)
+@chat_scheduler.handler
 async def help_command(client: Client, message: Message):
     logger.info(f"[{message.chat.id}] Received /help command from user {message.from_user.id}.")
     if not check_cooldown(message.from_user.id, "command"):
@@ -195,332 +346,405 @@ async def help_command(client: Client, message: Message):
         "  • `/start` - बॉट शुरू करें और मुख्य मेनू देखें।\n"
         "  • `/help` - यह सहायता मैसेज देखें।\n"
         "  • `/settings` - अपने ग्रुप्स की सेटिंग्स प्रबंधित करें। (केवल उन ग्रुप्स के लिए जहाँ आप एडमिन हैं और बॉट है)\n"
-        "  • `/connectgroup <group_id>` - एक ग्रुप को मैन्युअल रूप से कनेक्ट करें।\n\n"
+        "  • `/connectgroup <group_id>` - एक ग्रुप को मैन्युअल रूप से कनेक्ट करें।\n"
+        "  • `/newfed <नाम>` - नया फ़ेडरेशन बनाएँ (ग्रुप्स के बीच साझा बैन-सूची)।\n\n"
         "**ग्रुप में:**\n"
-        "  • `/ban <reply_to_user>` - यूज़र को ग्रुप से बैन करें।\n"
+        "  • `/ban <reply_to_user> [1d]` - यूज़र को ग्रुप से बैन करें (अवधि दें तो उसके बाद अपने आप अनबैन)।\n"
         "  • `/unban <reply_to_user>` - यूज़र को ग्रुप से अनबैन करें।\n"
         "  • `/kick <reply_to_user>` - यूज़र को ग्रुप से किक करें।\n"
-        "  • `/mute <reply_to_user>` - यूज़र को ग्रुप में मैसेज भेजने से म्यूट करें।\n"
+        "  • `/mute <reply_to_user> [30m]` - यूज़र को ग्रुप में मैसेज भेजने से म्यूट करें (अवधि दें तो उसके बाद अपने आप अनम्यूट)।\n"
         "  • `/unmute <reply_to_user>` - यूज़र को ग्रुप में मैसेज भेजने से अनम्यूट करें।\n"
-        "  • `/warn <reply_to_user>` - यूज़र को चेतावनी दें। 3 चेतावनियों के बाद बैन।\n"
+        "  • `/lockdown [10m]` - सदस्यों के लिए ग्रुप बंद करें (अवधि के बाद अपने आप खुलेगा); `/unlock` से तुरंत खोलें।\n"
+        "  • `/warn <reply_to_user>` - यूज़र को चेतावनी दें। चेतावनी सीढ़ी के अनुसार म्यूट/किक/बैन (डिफ़ॉल्ट: 3 पर बैन)।\n"
         "  • `/warnings <reply_to_user>` - यूज़र की चेतावनियाँ देखें।\n"
         "  • `/resetwarns <reply_to_user>` - यूज़र की चेतावनियाँ रीसेट करें।\n"
+        "  • `/setwarnladder 3:mute:1h 5:mute:1d 7:ban` - चेतावनी सीढ़ी सेट करें (`reset` से डिफ़ॉल्ट)।\n"
+        "  • `/servicettl [warning|welcome|botkick|command|all] [10m|off]` - बॉट के अपने मैसेज कितनी देर बाद अपने आप हटें।\n"
+        "  • `/exportsettings`, `/importsettings [fed]` - सेटिंग्स प्रोफ़ाइल (JSON) निकालें/लगाएँ, `fed` से फ़ेडरेशन के सभी ग्रुप्स पर; `/settingshistory` बदलाव देखें।\n"
+        "  • `/bulkban`, `/bulkkick`, `/bulkmute`, `/bulkwarn` `<IDs | joined 30m | flagged>` - बहुत से यूज़र्स पर एक साथ कार्रवाई (`/bulkstop` से रोकें)।\n"
+        "  • `/joinfed <ID>`, `/leavefed` - फ़ेडरेशन (साझा बैन-सूची) में जुड़ें/अलग हों; `/fedinfo` जानकारी।\n"
+        "  • `/fban`, `/unfban <reply_to_user | user_id> [कारण]` - फ़ेडरेशन के सभी ग्रुप्स से बैन/अनबैन (फ़ेड मालिक/एडमिन)।\n"
         "  • `/info <reply_to_user>` - यूज़र की जानकारी देखें।\n"
         "  • `/setwelcome [message]` - ग्रुप के लिए कस्टम वेलकम मैसेज सेट करें। (`{username}`, `{groupname}` का उपयोग करें)\n"
         "  • `/welcomesettings` - वेलकम मैसेज सेटिंग्स प्रबंधित करें।\n"
         "  • `/clean [count]` - पिछली 'count' संख्या में मैसेज डिलीट करें।\n"
+        "  • `/blocklist add|remove|clear [शब्द...]` - ग्रुप के लिए अतिरिक्त ब्लॉक किए गए शब्द।\n"
+        "  • `/allowlist add|remove|clear [शब्द...]` - ऐसे शब्द जिन्हें फ़िल्टर नहीं पकड़ेगा।\n"
+        "  • `/allowdomain add|remove|clear [डोमेन...]` - एंटी-लिंक चालू होने पर भी अनुमत डोमेन।\n"
+        "  • `/denydomain add|remove|clear [डोमेन...]` - हमेशा हटाए जाने वाले डोमेन।\n"
         "  • `/settings` - ग्रुप की सेटिंग्स प्रबंधित करें।\n\n"
         "**⚙️ सेटिंग्स को एक्सेस करने के लिए, आपको ग्रुप में एडमिन होना चाहिए और बॉट भी ग्रुप में एडमिन होना चाहिए।**"
     )
     await message.reply_text(help_text, parse_mode=ParseMode.MARKDOWN)
 
 
-@pyrogram_app.on_callback_query()
-async def callback_query_handler(client: Client, callback_query: CallbackQuery):
-    data = callback_query.data
-    user_id = callback_query.from_user.id
-    chat_id = callback_query.message.chat.id
-    message_id = callback_query.message.id
-
-    logger.info(f"[{chat_id}] Callback query received: {data} from user {user_id}.")
-
-    if data == "help_menu":
-        help_text = (
-            "🤖 **बॉट कमांड्स:**\n\n"
-            "**प्राइवेट में:**\n"
-            "  • `/start` - बॉट शुरू करें और मुख्य मेनू देखें।\n"
-            "  • `/help` - यह सहायता मैसेज देखें।\n"
-            "  • `/settings` - अपने ग्रुप्स की सेटिंग्स प्रबंधित करें। (केवल उन ग्रुप्स के लिए जहाँ आप एडमिन हैं और बॉट है)\n"
-            "  • `/connectgroup <group_id>` - एक ग्रुप को मैन्युअल रूप से कनेक्ट करें।\n\n"
-            "**ग्रुप में:**\n"
-            "  • `/ban <reply_to_user>` - यूज़र को ग्रुप से बैन करें।\n"
-            "  • `/unban <reply_to_user>` - यूज़र को ग्रुप से अनबैन करें।\n"
-            "  • `/kick <reply_to_user>` - यूज़र को ग्रुप से किक करें।\n"
-            "  • `/mute <reply_to_user>` - यूज़र को ग्रुप में मैसेज भेजने से म्यूट करें।\n"
-            "  • `/unmute <reply_to_user>` - यूज़र को ग्रुप में मैसेज भेजने से अनम्यूट करें।\n"
-            "  • `/warn <reply_to_user>` - यूज़र को चेतावनी दें। 3 चेतावनियों के बाद बैन।\n"
-            "  • `/warnings <reply_to_user>` - यूज़र की चेतावनियाँ देखें।\n"
-            "  • `/resetwarns <reply_to_user>` - यूज़र की चेतावनियाँ रीसेट करें।\n"
-            "  • `/info <reply_to_user>` - यूज़र की जानकारी देखें।\n"
-            "  • `/setwelcome [message]` - ग्रुप के लिए कस्टम वेलकम मैसेज सेट करें। (`{username}`, `{groupname}` का उपयोग करें)\n"
-            "  • `/welcomesettings` - वेलकम मैसेज सेटिंग्स प्रबंधित करें।\n"
-            "  • `/clean [count]` - पिछली 'count' संख्या में मैसेज डिलीट करें।\n"
-            "  • `/settings` - ग्रुप की सेटिंग्स प्रबंधित करें।\n\n"
-            "**⚙️ सेटिंग्स को एक्सेस करने के लिए, आपको ग्रुप में एडमिन होना चाहिए और बॉट भी ग्रुप में एडमिन होना चाहिए।**"
-        )
-        keyboard = [[InlineKeyboardButton("🔙 वापस", callback_data="start_menu")]]
-        await callback_query.message.edit_caption(help_text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode=ParseMode.MARKDOWN)
-        await callback_query.answer()
+# --- Callback Query Routes ---
+# कॉलबैक डेटा का फ़ॉर्मेट: "prefix:arg1:arg2" (देखें callback_router.py)
 
-    elif data == "start_menu":
-        user = callback_query.from_user
-        keyboard = [
-            [InlineKeyboardButton("➕ ग्रुप में ऐड करें", url=f"https://t.me/{client.me.username}?startgroup=true")],
-            [InlineKeyboardButton("❓ सहायता", callback_data="help_menu")],
-            [InlineKeyboardButton("📢 अपडेट चैनल", url=f"https://t.me/{UPDATE_CHANNEL_USERNAME}")],
-            [InlineKeyboardButton("🔗 सोर्स कोड", url=REPO_LINK)],
-            [InlineKeyboardButton("📞 मुझसे संपर्क करें", url=f"https://t.me/{ASBHAI_USERNAME}")]
-        ]
+# सेटिंग्स जिन्हें 'tgl' बटन से बदला जा सकता है
+TOGGLEABLE_SETTINGS = frozenset({
+    "welcome_enabled", "anti_link_enabled", "anti_flood_enabled", "filter_abusive",
+    "filter_pornographic_text", "filter_spam", "filter_bio_links", "usernamedel_enabled",
+    "bot_enabled"
+})
+MODERATION_ACTIONS = frozenset({"mute", "kick", "ban", "warn"})
 
-        is_connected_group_admin = False
-        all_current_groups = get_all_groups()
-        for group_data in all_current_groups:
-            try:
-                bot_member = await client.get_chat_member(group_data["_id"], client.me.id)
-                if bot_member.status != ChatMemberStatus.LEFT:
-                    if await is_user_admin_in_chat(client, group_data["_id"], user_id):
-                        is_connected_group_admin = True
-                        break
-            except Exception as e:
-                logger.warning(f"Error checking admin status for group {group_data.get('title', group_data['_id'])} during start menu for user {user_id}: {e}")
 
-        if is_connected_group_admin:
-            keyboard.append([InlineKeyboardButton("⚙️ सेटिंग्स", callback_data="settings_menu")])
-            logger.info(f"Settings button added for user {user_id} via callback.")
+async def ensure_callback_admins(client: Client, callback_query: CallbackQuery, group_id: int, not_admin_text: str) -> bool:
+    """Answers the callback with an alert and returns False unless both the user and the bot are admins."""
+    if not await is_user_admin_in_chat(client, group_id, callback_query.from_user.id):
+        await callback_query.answer(not_admin_text, show_alert=True)
+        return False
+    if not await is_bot_admin_in_chat(client, group_id):
+        await callback_query.answer("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।", show_alert=True)
+        return False
+    return True
 
-        reply_markup = InlineKeyboardMarkup(keyboard)
 
-        start_message_text = (
-            f"👋 नमस्ते {user.first_name}! मैं आपका ग्रुप पुलिस बॉट हूँ, {client.me.first_name}.\n\n"
-            "मैं ग्रुप चैट को मॉडरेट करने, स्पैम, अनुचित सामग्री और अवांछित लिंक को फ़िल्टर करने में मदद करता हूँ।\n"
-            "आपकी मदद कैसे कर सकता हूँ?"
-        )
-        await callback_query.message.edit_caption(start_message_text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
-        await callback_query.answer()
-
-    elif data == "settings_menu":
-        if chat_id < 0: # If accessed from a group
-            group_id = chat_id
-            if not await is_user_admin_in_chat(client, group_id, user_id):
-                await callback_query.answer("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए!", show_alert=True)
-                return
-            if not await is_bot_admin_in_chat(client, group_id):
-                await callback_query.answer("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।", show_alert=True)
-                return
-            await show_group_settings(client, callback_query.message, group_id)
-        else: # If accessed from private chat
-            await show_private_settings_menu(client, callback_query.message, user_id)
-        await callback_query.answer()
-
-    elif data.startswith("select_group_"):
-        group_id = int(data.split("_")[2])
-        if not await is_user_admin_in_chat(client, group_id, user_id):
-            await callback_query.answer("आपको इस ग्रुप में एडमिन होना चाहिए।", show_alert=True)
-            return
-        if not await is_bot_admin_in_chat(client, group_id):
-            await callback_query.answer("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।", show_alert=True)
-            return
-        await show_group_settings(client, callback_query.message, group_id)
-        await callback_query.answer()
+@callback_router.route("help")
+async def help_menu_callback(client: Client, callback_query: CallbackQuery):
+    help_text = (
+        "🤖 **बॉट कमांड्स:**\n\n"
+        "**प्राइवेट में:**\n"
+        "  • `/start` - बॉट शुरू करें और मुख्य मेनू देखें।\n"
+        "  • `/help` - यह सहायता मैसेज देखें।\n"
+        "  • `/settings` - अपने ग्रुप्स की सेटिंग्स प्रबंधित करें। (केवल उन ग्रुप्स के लिए जहाँ आप एडमिन हैं और बॉट है)\n"
+        "  • `/connectgroup <group_id>` - एक ग्रुप को मैन्युअल रूप से कनेक्ट करें।\n"
+        "  • `/newfed <नाम>` - नया फ़ेडरेशन बनाएँ (ग्रुप्स के बीच साझा बैन-सूची)।\n\n"
+        "**ग्रुप में:**\n"
+        "  • `/ban <reply_to_user> [1d]` - यूज़र को ग्रुप से बैन करें (अवधि दें तो उसके बाद अपने आप अनबैन)।\n"
+        "  • `/unban <reply_to_user>` - यूज़र को ग्रुप से अनबैन करें।\n"
+        "  • `/kick <reply_to_user>` - यूज़र को ग्रुप से किक करें।\n"
+        "  • `/mute <reply_to_user> [30m]` - यूज़र को ग्रुप में मैसेज भेजने से म्यूट करें (अवधि दें तो उसके बाद अपने आप अनम्यूट)।\n"
+        "  • `/unmute <reply_to_user>` - यूज़र को ग्रुप में मैसेज भेजने से अनम्यूट करें।\n"
+        "  • `/lockdown [10m]` - सदस्यों के लिए ग्रुप बंद करें (अवधि के बाद अपने आप खुलेगा); `/unlock` से तुरंत खोलें।\n"
+        "  • `/warn <reply_to_user>` - यूज़र को चेतावनी दें। चेतावनी सीढ़ी के अनुसार म्यूट/किक/बैन (डिफ़ॉल्ट: 3 पर बैन)।\n"
+        "  • `/warnings <reply_to_user>` - यूज़र की चेतावनियाँ देखें।\n"
+        "  • `/resetwarns <reply_to_user>` - यूज़र की चेतावनियाँ रीसेट करें।\n"
+        "  • `/setwarnladder 3:mute:1h 5:mute:1d 7:ban` - चेतावनी सीढ़ी सेट करें (`reset` से डिफ़ॉल्ट)।\n"
+        "  • `/servicettl [warning|welcome|botkick|command|all] [10m|off]` - बॉट के अपने मैसेज कितनी देर बाद अपने आप हटें।\n"
+        "  • `/exportsettings`, `/importsettings [fed]` - सेटिंग्स प्रोफ़ाइल (JSON) निकालें/लगाएँ, `fed` से फ़ेडरेशन के सभी ग्रुप्स पर; `/settingshistory` बदलाव देखें।\n"
+        "  • `/bulkban`, `/bulkkick`, `/bulkmute`, `/bulkwarn` `<IDs | joined 30m | flagged>` - बहुत से यूज़र्स पर एक साथ कार्रवाई (`/bulkstop` से रोकें)।\n"
+        "  • `/joinfed <ID>`, `/leavefed` - फ़ेडरेशन (साझा बैन-सूची) में जुड़ें/अलग हों; `/fedinfo` जानकारी।\n"
+        "  • `/fban`, `/unfban <reply_to_user | user_id> [कारण]` - फ़ेडरेशन के सभी ग्रुप्स से बैन/अनबैन (फ़ेड मालिक/एडमिन)।\n"
+        "  • `/info <reply_to_user>` - यूज़र की जानकारी देखें।\n"
+        "  • `/setwelcome [message]` - ग्रुप के लिए कस्टम वेलकम मैसेज सेट करें। (`{username}`, `{groupname}` का उपयोग करें)\n"
+        "  • `/welcomesettings` - वेलकम मैसेज सेटिंग्स प्रबंधित करें।\n"
+        "  • `/clean [count]` - पिछली 'count' संख्या में मैसेज डिलीट करें।\n"
+        "  • `/blocklist add|remove|clear [शब्द...]` - ग्रुप के लिए अतिरिक्त ब्लॉक किए गए शब्द।\n"
+        "  • `/allowlist add|remove|clear [शब्द...]` - ऐसे शब्द जिन्हें फ़िल्टर नहीं पकड़ेगा।\n"
+        "  • `/allowdomain add|remove|clear [डोमेन...]` - एंटी-लिंक चालू होने पर भी अनुमत डोमेन।\n"
+        "  • `/denydomain add|remove|clear [डोमेन...]` - हमेशा हटाए जाने वाले डोमेन।\n"
+        "  • `/settings` - ग्रुप की सेटिंग्स प्रबंधित करें।\n\n"
+        "**⚙️ सेटिंग्स को एक्सेस करने के लिए, आपको ग्रुप में एडमिन होना चाहिए और बॉट भी ग्रुप में एडमिन होना चाहिए।**"
+    )
+    keyboard = [[InlineKeyboardButton("🔙 वापस", callback_data=callback_router.build("start"))]]
+    await callback_query.message.edit_caption(help_text, reply_markup=InlineKeyboardMarkup(keyboard), parse_mode=ParseMode.MARKDOWN)
+    await callback_query.answer()
 
-    elif data.startswith("toggle_"):
-        parts = data.split("_")
-        setting_name = "_".join(parts[1:-1]) # Handles names like 'anti_link_enabled'
-        group_id = int(parts[-1])
 
-        if not await is_user_admin_in_chat(client, group_id, user_id):
-            await callback_query.answer("आपको यह सेटिंग बदलने के लिए एडमिन होना चाहिए!", show_alert=True)
-            return
-        if not await is_bot_admin_in_chat(client, group_id):
-            await callback_query.answer("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।", show_alert=True)
-            return
+@callback_router.route("start")
+async def start_menu_callback(client: Client, callback_query: CallbackQuery):
+    user = callback_query.from_user
+    user_id = user.id
+    keyboard = [
+        [InlineKeyboardButton("➕ ग्रुप में ऐड करें", url=f"https://t.me/{client.me.username}?startgroup=true")],
+        [InlineKeyboardButton("❓ सहायता", callback_data=callback_router.build("help"))],
+        [InlineKeyboardButton("📢 अपडेट चैनल", url=f"https://t.me/{UPDATE_CHANNEL_USERNAME}")],
+        [InlineKeyboardButton("🔗 सोर्स कोड", url=REPO_LINK)],
+        [InlineKeyboardButton("📞 मुझसे संपर्क करें", url=f"https://t.me/{ASBHAI_USERNAME}")]
+    ]
 
-        group_data = get_group(group_id)
-        if group_data:
-            current_value = group_data.get(setting_name, False)
-            new_value = not current_value
-            update_group_settings(group_id, {setting_name: new_value})
-            logger.info(f"Group {group_id}: Setting '{setting_name}' toggled to {new_value} by user {user_id}.")
-            await show_group_settings(client, callback_query.message, group_id)
-        else:
-            await callback_query.answer("ग्रुप की सेटिंग्स नहीं मिलीं।", show_alert=True)
-        await callback_query.answer()
+    is_connected_group_admin = False
+    all_current_groups = get_all_groups(stale_ok=True)
+    for group_data in all_current_groups:
+        try:
+            bot_member = await client.get_chat_member(group_data["_id"], client.me.id)
+            if bot_member.status != ChatMemberStatus.LEFT:
+                if await is_user_admin_in_chat(client, group_data["_id"], user_id):
+                    is_connected_group_admin = True
+                    break
+        except Exception as e:
+            logger.warning(f"Error checking admin status for group {group_data.get('title', group_data['_id'])} during start menu for user {user_id}: {e}")
+
+    if is_connected_group_admin:
+        keyboard.append([InlineKeyboardButton("⚙️ सेटिंग्स", callback_data=callback_router.build("settings"))])
+        logger.info(f"Settings button added for user {user_id} via callback.")
+
+    reply_markup = InlineKeyboardMarkup(keyboard)
+
+    start_message_text = (
+        f"👋 नमस्ते {user.first_name}! मैं आपका ग्रुप पुलिस बॉट हूँ, {client.me.first_name}.\n\n"
+        "मैं ग्रुप चैट को मॉडरेट करने, स्पैम, अनुचित सामग्री और अवांछित लिंक को फ़िल्टर करने में मदद करता हूँ।\n"
+        "आपकी मदद कैसे कर सकता हूँ?"
+    )
+    await edit_menu(callback_query.message, start_message_text, reply_markup, parse_mode=ParseMode.HTML)
+    await callback_query.answer()
 
-    elif data.startswith("welcome_"):
-        parts = data.split("_")
-        action = parts[1]
-        group_id = int(parts[2])
 
-        if not await is_user_admin_in_chat(client, group_id, user_id):
-            await callback_query.answer("आपको यह सेटिंग बदलने के लिए एडमिन होना चाहिए!", show_alert=True)
+@callback_router.route("settings")
+async def settings_menu_callback(client: Client, callback_query: CallbackQuery):
+    chat_id = callback_query.message.chat.id
+    if chat_id < 0: # If accessed from a group
+        if not await ensure_callback_admins(client, callback_query, chat_id, "आपको यह कमांड चलाने के लिए एडमिन होना चाहिए!"):
             return
-        if not await is_bot_admin_in_chat(client, group_id):
-            await callback_query.answer("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।", show_alert=True)
+        await show_group_settings(client, callback_query.message, chat_id)
+    else: # If accessed from private chat
+        await show_private_settings_menu(client, callback_query.message, callback_query.from_user.id)
+    await callback_query.answer()
+
+
+@callback_router.route("setp", int)
+async def settings_page_callback(client: Client, callback_query: CallbackQuery, after: int):
+    await show_private_settings_menu(client, callback_query.message, callback_query.from_user.id, after)
+    await callback_query.answer()
+
+
+@callback_router.route("sel", int)
+async def select_group_callback(client: Client, callback_query: CallbackQuery, group_id: int):
+    if not await ensure_callback_admins(client, callback_query, group_id, "आपको इस ग्रुप में एडमिन होना चाहिए।"):
+        return
+    await show_group_settings(client, callback_query.message, group_id)
+    await callback_query.answer()
+
+
+@callback_router.route("tgl", str, int, bool)
+async def toggle_setting_callback(client: Client, callback_query: CallbackQuery, setting_name: str, group_id: int, new_value: bool):
+    user_id = callback_query.from_user.id
+    if setting_name not in TOGGLEABLE_SETTINGS:
+        await callback_query.answer("अमान्य सेटिंग।", show_alert=True)
+        return
+    if not await ensure_callback_admins(client, callback_query, group_id, "आपको यह सेटिंग बदलने के लिए एडमिन होना चाहिए!"):
+        return
+
+    # बटन में नया मान है: पढ़ने की ज़रूरत नहीं, एक DB लिखाई (जो अपडेट हुआ डॉक्युमेंट लौटाती है) और एक एडिट
+    group_data = update_group_settings(group_id, {setting_name: new_value}, changed_by=user_id, source="toggle")
+    if group_data:
+        logger.info(f"Group {group_id}: Setting '{setting_name}' toggled to {new_value} by user {user_id}.")
+        await show_group_settings(client, callback_query.message, group_id, group_data)
+    else:
+        await callback_query.answer("ग्रुप की सेटिंग्स नहीं मिलीं।", show_alert=True)
+    await callback_query.answer()
+
+
+@callback_router.route("wel", str, int)
+async def welcome_settings_callback(client: Client, callback_query: CallbackQuery, action: str, group_id: int):
+    user_id = callback_query.from_user.id
+    if not await ensure_callback_admins(client, callback_query, group_id, "आपको यह सेटिंग बदलने के लिए एडमिन होना चाहिए!"):
+        return
+
+    # वेलकम चालू/बंद अब 'tgl' बटन से होता है
+    if action == "custom":
+        if not get_group(group_id):
+            await callback_query.answer("ग्रुप की सेटिंग्स नहीं मिलीं।", show_alert=True)
             return
-        
-        group_data = get_group(group_id)
+        await callback_query.message.edit_text("कृपया नया वेलकम मैसेज भेजें। आप `{username}` और `{groupname}` का उपयोग कर सकते हैं।",
+                                              reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 वापस", callback_data=callback_router.build("sel", group_id))]])
+                                             )
+        # Set a temporary state for the user to wait for the next message
+        set_pending_input(user_id, "welcome_message", group_id)
+    elif action == "reset":
+        group_data = update_group_settings(group_id, {"welcome_message": WELCOME_MESSAGE_DEFAULT}, changed_by=user_id, source="welcome")
         if not group_data:
             await callback_query.answer("ग्रुप की सेटिंग्स नहीं मिलीं।", show_alert=True)
             return
+        logger.info(f"Group {group_id}: Welcome message reset to default by user {user_id}.")
+        await show_group_settings(client, callback_query.message, group_id, group_data)
+    else:
+        await callback_query.answer("अमान्य विकल्प।", show_alert=True)
+        return
 
-        if action == "toggle":
-            current_value = group_data.get("welcome_enabled", False)
-            new_value = not current_value
-            update_group_settings(group_id, {"welcome_enabled": new_value})
-            logger.info(f"Group {group_id}: Welcome enabled toggled to {new_value} by user {user_id}.")
-            await show_group_settings(client, callback_query.message, group_id)
-        elif action == "set_custom":
-            await callback_query.message.edit_text("कृपया नया वेलकम मैसेज भेजें। आप `{username}` और `{groupname}` का उपयोग कर सकते हैं।",
-                                                  reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 वापस", callback_data=f"back_to_settings_{group_id}")]])
-                                                 )
-            # Set a temporary state for the user to wait for the next message
-            client.waiting_for_welcome_message = user_id 
-            client.waiting_for_welcome_group = group_id
-        elif action == "reset_default":
-            update_group_settings(group_id, {"welcome_message": WELCOME_MESSAGE_DEFAULT})
-            logger.info(f"Group {group_id}: Welcome message reset to default by user {user_id}.")
-            await show_group_settings(client, callback_query.message, group_id)
-        
-        await callback_query.answer()
+    await callback_query.answer()
 
-    elif data.startswith("back_to_settings_"):
-        group_id = int(data.split("_")[3])
-        if not await is_user_admin_in_chat(client, group_id, user_id):
-            await callback_query.answer("आपको इस ग्रुप में एडमिन होना चाहिए।", show_alert=True)
-            return
-        if not await is_bot_admin_in_chat(client, group_id):
-            await callback_query.answer("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।", show_alert=True)
-            return
-        await show_group_settings(client, callback_query.message, group_id)
-        await callback_query.answer()
-
-    elif data.startswith("take_action_"):
-        user_id_to_act = int(parts[2])
-        group_id = int(parts[3])
-        logger.info(f"User {callback_query.from_user.id} attempting to take action on user {user_id_to_act} in group {group_id}.")
-        if not await is_user_admin_in_chat(client, group_id, callback_query.from_user.id):
-            await callback_query.answer("आपको इस यूज़र पर कार्रवाई करने की अनुमति नहीं है।", show_alert=True)
-            return
-            
-        action_keyboard = [
-            [InlineKeyboardButton("🔇 म्यूट करें (1 घंटा)", callback_data=f"mute_user_{user_id_to_act}_{group_id}_3600")],
-            [InlineKeyboardButton("👢 किक करें", callback_data=f"kick_user_{user_id_to_act}_{group_id}")],
-            [InlineKeyboardButton("🚫 बैन करें", callback_data=f"ban_user_{user_id_to_act}_{group_id}")],
-            [InlineKeyboardButton("⚠️ चेतावनी दें", callback_data=f"warn_user_{user_id_to_act}_{group_id}")],
-            [InlineKeyboardButton("❌ रद्द करें", callback_data=f"cancel_action_{user_id_to_act}_{group_id}")]
-        ]
-        await callback_query.message.edit_text(
-            f"[{user_id_to_act}](tg://user?id={user_id_to_act}) पर क्या कार्रवाई करनी है?",
-            reply_markup=InlineKeyboardMarkup(action_keyboard),
-            parse_mode=ParseMode.MARKDOWN
-        )
-        logger.info(f"Action menu sent for user {user_id_to_act} in group {group_id}.")
-
-    elif data.startswith("manage_permission_"):
-        user_id_to_manage = int(parts[2])
-        group_id = int(parts[3]) # Assuming group_id is always passed for admin check
-        logger.info(f"User {callback_query.from_user.id} attempting to manage bio link permission for user {user_id_to_manage} in group {group_id}.")
-        if not await is_user_admin_in_chat(client, group_id, callback_query.from_user.id):
-            await callback_query.answer("आपको इस यूज़र की अनुमति प्रबंधित करने की अनुमति नहीं है।", show_alert=True)
-            return
 
-        # get_user_biolink_exception is not in database.py. Assuming it's a user setting.
-        # For now, let's assume it's part of user_data or a separate collection.
-        # If it's not in database.py, you'll need to add it.
-        # For demonstration, I'll use a placeholder for get_user_biolink_exception.
-        # You need to implement get_user_biolink_exception and set_user_biolink_exception in database.py
-        # or remove this feature if not needed.
-        # current_permission = get_user_biolink_exception(user_id_to_manage) # This function is missing
-        current_permission = False # Placeholder
-        permission_status_text = "अनुमति मिली है" if current_permission else "अनुमति नहीं मिली है"
-        logger.info(f"Current bio link permission for user {user_id_to_manage}: {permission_status_text}")
-
-        permission_keyboard = [
-            [InlineKeyboardButton("✅ अनुमति दें", callback_data=f"set_bio_permission_{user_id_to_manage}_true")],
-            [InlineKeyboardButton("❌ अनुमति न दें", callback_data=f"set_bio_permission_{user_id_to_manage}_false")]
-        ]
-        await callback_query.message.edit_text(
-            f"[{user_id_to_manage}](tg://user?id={user_id_to_manage}) को बायो लिंक की अनुमति वर्तमान में: **{permission_status_text}**\n\n"
-            f"अनुमति दें या नहीं दें?",
-            reply_markup=InlineKeyboardMarkup(permission_keyboard),
-            parse_mode=ParseMode.MARKDOWN
-        )
-        logger.info(f"Bio link permission menu sent for user {user_id_to_manage}.")
+@callback_router.route("act", int, int)
+async def take_action_callback(client: Client, callback_query: CallbackQuery, user_id_to_act: int, group_id: int):
+    logger.info(f"User {callback_query.from_user.id} attempting to take action on user {user_id_to_act} in group {group_id}.")
+    if not await is_user_admin_in_chat(client, group_id, callback_query.from_user.id):
+        await callback_query.answer("आपको इस यूज़र पर कार्रवाई करने की अनुमति नहीं है।", show_alert=True)
+        return
 
-    elif data.startswith("set_bio_permission_"):
-        user_id = int(parts[2])
-        permission_status = parts[3] == 'true'
-        # set_user_biolink_exception(user_id, permission_status) # This function is missing
-        await callback_query.message.edit_text(f"[{user_id}](tg://user?id={user_id}) को बायो लिंक की अनुमति {'मिल गई है' if permission_status else 'नहीं मिली है'}।", parse_mode=ParseMode.MARKDOWN)
-        logger.info(f"Bio link permission for user {user_id} set to {permission_status}.")
+    action_keyboard = [
+        [InlineKeyboardButton("🔇 म्यूट करें (1 घंटा)", callback_data=callback_router.build("mod", "mute", user_id_to_act, group_id, 3600))],
+        [InlineKeyboardButton("👢 किक करें", callback_data=callback_router.build("mod", "kick", user_id_to_act, group_id, 0))],
+        [InlineKeyboardButton("🚫 बैन करें", callback_data=callback_router.build("mod", "ban", user_id_to_act, group_id, 0))],
+        [InlineKeyboardButton("⚠️ चेतावनी दें", callback_data=callback_router.build("mod", "warn", user_id_to_act, group_id, 0))],
+        [InlineKeyboardButton("❌ रद्द करें", callback_data=callback_router.build("cancel", user_id_to_act, group_id))]
+    ]
+    await callback_query.message.edit_text(
+        f"[{user_id_to_act}](tg://user?id={user_id_to_act}) पर क्या कार्रवाई करनी है?",
+        reply_markup=InlineKeyboardMarkup(action_keyboard),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    logger.info(f"Action menu sent for user {user_id_to_act} in group {group_id}.")
 
 
-    elif data.startswith("mute_user_") or data.startswith("kick_user_") or data.startswith("ban_user_") or data.startswith("warn_user_"):
-        action_type = parts[0]
-        user_id_target = int(parts[1])
-        group_id = int(parts[2])
-        duration = int(parts[3]) if len(parts) > 3 else None # For mute action
+@callback_router.route("perm", int, int)
+async def manage_permission_callback(client: Client, callback_query: CallbackQuery, user_id_to_manage: int, group_id: int):
+    logger.info(f"User {callback_query.from_user.id} attempting to manage bio link permission for user {user_id_to_manage} in group {group_id}.")
+    if not await is_user_admin_in_chat(client, group_id, callback_query.from_user.id):
+        await callback_query.answer("आपको इस यूज़र की अनुमति प्रबंधित करने की अनुमति नहीं है।", show_alert=True)
+        return
 
-        if not await is_user_admin_in_chat(client, group_id, user_id):
-            await callback_query.answer("आपको यह कार्रवाई करने की अनुमति नहीं है।", show_alert=True)
-            return
-        if not await is_bot_admin_in_chat(client, group_id):
-            await callback_query.answer("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।", show_alert=True)
-            return
+    # get_user_biolink_exception is not in database.py yet, so the current permission is a placeholder.
+    current_permission = False # Placeholder
+    permission_status_text = "अनुमति मिली है" if current_permission else "अनुमति नहीं मिली है"
+    logger.info(f"Current bio link permission for user {user_id_to_manage}: {permission_status_text}")
 
-        try:
-            target_user_info = await client.get_users(user_id_target)
-            
-            if action_type == "mute_user":
-                await client.restrict_chat_member(
-                    chat_id=group_id,
-                    user_id=user_id_target,
-                    permissions=ChatPermissions(can_send_messages=False),
-                    until_date=datetime.now() + timedelta(seconds=duration)
-                )
-                await callback_query.message.edit_text(f"✅ {target_user_info.mention} को {duration/60} मिनट के लिए म्यूट कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
-                logger.info(f"User {user_id_target} muted for {duration/60} mins in group {group_id}.")
-            elif action_type == "kick_user":
-                await client.ban_chat_member(chat_id=group_id, user_id=user_id_target)
-                await client.unban_chat_member(chat_id=group_id, user_id=user_id_target)
-                await callback_query.message.edit_text(f"✅ {target_user_info.mention} को ग्रुप से किक कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
-                logger.info(f"User {user_id_target} kicked from group {group_id}.")
-            elif action_type == "ban_user":
-                await client.ban_chat_member(chat_id=group_id, user_id=user_id_target)
-                await callback_query.message.edit_text(f"✅ {target_user_info.mention} को ग्रुप से बैन कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
-                logger.info(f"User {user_id_target} banned from group {group_id}.")
-            elif action_type == "warn_user":
-                current_warns = add_warn(group_id, user_id_target)
-                group_data = get_group(group_id)
-                warn_limit = group_data.get("warn_limit", 3)
-                warn_message = f"⚠️ {target_user_info.mention} को {current_warns}/{warn_limit} चेतावनी मिली है।"
-                if current_warns >= warn_limit:
-                    await client.ban_chat_member(group_id, user_id_target)
-                    warn_message += f"\n{target_user_info.mention} को {warn_limit} चेतावनियों के बाद ग्रुप से बैन कर दिया गया है।"
-                    delete_warns(group_id, user_id_target)
-                await callback_query.message.edit_text(warn_message, parse_mode=ParseMode.MARKDOWN)
-                logger.info(f"User {user_id_target} warned in group {group_id}. Total warns: {current_warns}.")
-
-            # Log to case log channel
-            if CASE_LOG_CHANNEL_ID:
-                await client.send_message(
-                    CASE_LOG_CHANNEL_ID,
-                    f"🚨 **कार्रवाई:** `{action_type.replace('_user', '').capitalize()}`\n"
-                    f"ग्रुप: `{callback_query.message.chat.title}` (ID: `{group_id}`)\n"
-                    f"यूज़र: [{target_user_info.first_name}](tg://user?id={user_id_target}) (ID: `{user_id_target}`)\n"
-                    f"एडमिन: [{callback_query.from_user.first_name}](tg://user?id={user_id}) (ID: `{user_id}`)"
-                )
-        except Exception as e:
-            logger.error(f"Error performing action {action_type} for user {user_id_target} in group {group_id}: {e}", exc_info=True)
-            await callback_query.message.edit_text(f"कार्रवाई करने में त्रुटि आई: `{e}`")
+    permission_keyboard = [
+        [InlineKeyboardButton("✅ अनुमति दें", callback_data=callback_router.build("bioperm", user_id_to_manage, True))],
+        [InlineKeyboardButton("❌ अनुमति न दें", callback_data=callback_router.build("bioperm", user_id_to_manage, False))]
+    ]
+    await callback_query.message.edit_text(
+        f"[{user_id_to_manage}](tg://user?id={user_id_to_manage}) को बायो लिंक की अनुमति वर्तमान में: **{permission_status_text}**\n\n"
+        f"अनुमति दें या नहीं दें?",
+        reply_markup=InlineKeyboardMarkup(permission_keyboard),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    logger.info(f"Bio link permission menu sent for user {user_id_to_manage}.")
+
+
+@callback_router.route("bioperm", int, bool)
+async def set_bio_permission_callback(client: Client, callback_query: CallbackQuery, target_user_id: int, permission_status: bool):
+    # set_user_biolink_exception(target_user_id, permission_status) # This function is missing
+    await callback_query.message.edit_text(f"[{target_user_id}](tg://user?id={target_user_id}) को बायो लिंक की अनुमति {'मिल गई है' if permission_status else 'नहीं मिली है'}।", parse_mode=ParseMode.MARKDOWN)
+    logger.info(f"Bio link permission for user {target_user_id} set to {permission_status}.")
+
+
+@callback_router.route("mod", str, int, int, int)
+async def moderation_action_callback(client: Client, callback_query: CallbackQuery, action_type: str, user_id_target: int, group_id: int, duration: int):
+    user_id = callback_query.from_user.id
+    if action_type not in MODERATION_ACTIONS:
+        await callback_query.answer("अमान्य कार्रवाई।", show_alert=True)
+        return
+    if not await ensure_callback_admins(client, callback_query, group_id, "आपको यह कार्रवाई करने की अनुमति नहीं है।"):
+        return
+
+    try:
+        target_user_info = await client.get_users(user_id_target)
+
+        if action_type == "mute":
+            await client.restrict_chat_member(
+                chat_id=group_id,
+                user_id=user_id_target,
+                permissions=ChatPermissions(can_send_messages=False),
+                until_date=datetime.now() + timedelta(seconds=duration)
+            )
+            job_scheduler.schedule("unmute", duration, group_id, user_id_target, replace=True)
+            await callback_query.message.edit_text(f"✅ {target_user_info.mention} को {duration/60} मिनट के लिए म्यूट कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
+            logger.info(f"User {user_id_target} muted for {duration/60} mins in group {group_id}.")
+        elif action_type == "kick":
+            await client.ban_chat_member(chat_id=group_id, user_id=user_id_target)
+            await client.unban_chat_member(chat_id=group_id, user_id=user_id_target)
+            await callback_query.message.edit_text(f"✅ {target_user_info.mention} को ग्रुप से किक कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
+            logger.info(f"User {user_id_target} kicked from group {group_id}.")
+        elif action_type == "ban":
+            await client.ban_chat_member(chat_id=group_id, user_id=user_id_target)
+            await callback_query.message.edit_text(f"✅ {target_user_info.mention} को ग्रुप से बैन कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
+            logger.info(f"User {user_id_target} banned from group {group_id}.")
+        elif action_type == "warn":
+            warn_message = await warn_user(client, group_id, callback_query.message.chat.title, target_user_info, callback_query.from_user)
+            await callback_query.message.edit_text(warn_message, parse_mode=ParseMode.MARKDOWN)
+
+        # Log to case log channel
+        if CASE_LOG_CHANNEL_ID:
+            await client.send_message(
+                CASE_LOG_CHANNEL_ID,
+                f"🚨 **कार्रवाई:** `{action_type.capitalize()}`\n"
+                f"ग्रुप: `{callback_query.message.chat.title}` (ID: `{group_id}`)\n"
+                f"यूज़र: [{target_user_info.first_name}](tg://user?id={user_id_target}) (ID: `{user_id_target}`)\n"
+                f"एडमिन: [{callback_query.from_user.first_name}](tg://user?id={user_id}) (ID: `{user_id}`)"
+            )
+    except Exception as e:
+        logger.error(f"Error performing action {action_type} for user {user_id_target} in group {group_id}: {e}", exc_info=True)
+        await callback_query.message.edit_text(f"कार्रवाई करने में त्रुटि आई: `{e}`")
 
-    elif data.startswith("cancel_action_"):
-        user_id_target = int(parts[2])
-        group_id = int(parts[3])
-        await callback_query.message.edit_text(f"[{user_id_target}](tg://user?id={user_id_target}) पर कार्रवाई रद्द कर दी गई।", parse_mode=ParseMode.MARKDOWN)
-        logger.info(f"Action cancelled for user {user_id_target} in group {group_id} by {user_id}.")
 
-    elif data == "close_settings":
-        await callback_query.message.edit_text("सेटिंग्स बंद कर दी गईं।")
-        logger.info(f"Settings closed by user {user_id}.")
+@callback_router.route("cancel", int, int)
+async def cancel_action_callback(client: Client, callback_query: CallbackQuery, user_id_target: int, group_id: int):
+    await callback_query.message.edit_text(f"[{user_id_target}](tg://user?id={user_id_target}) पर कार्रवाई रद्द कर दी गई।", parse_mode=ParseMode.MARKDOWN)
+    logger.info(f"Action cancelled for user {user_id_target} in group {group_id} by {callback_query.from_user.id}.")
 
 
-async def show_group_settings(client: Client, message: Message, group_id: int):
+@callback_router.route("close")
+async def close_settings_callback(client: Client, callback_query: CallbackQuery):
+    await callback_query.message.edit_text("सेटिंग्स बंद कर दी गईं।")
+    logger.info(f"Settings closed by user {callback_query.from_user.id}.")
+
+
+# ग्रुप डॉक्यूमेंट पर रखी सूचियाँ: कमांड -> (फ़ील्ड, नाम)
+GROUP_LISTS = {
+    "blocklist": ("blocklist", "ब्लॉकलिस्ट"),
+    "allowlist": ("allowlist", "अलाउलिस्ट"),
+    "allowdomain": ("allowed_domains", "अनुमत डोमेन"),
+    "denydomain": ("denied_domains", "प्रतिबंधित डोमेन"),
+}
+DOMAIN_LIST_FIELDS = frozenset({"allowed_domains", "denied_domains"})
+GROUP_LIST_TITLES = {field: title for field, title in GROUP_LISTS.values()}
+
+
+def format_group_lists(group_data: dict) -> str:
+    lines = []
+    for field, title in GROUP_LIST_TITLES.items():
+        values = group_data.get(field) or []
+        shown = ", ".join(f"`{value}`" for value in values[:50]) or "—"
+        more = f" (+{len(values) - 50})" if len(values) > 50 else ""
+        lines.append(f"**{title} ({len(values)}):** {shown}{more}")
+    return "\n".join(lines)
+
+
+@callback_router.route("wl", int)
+async def group_lists_callback(client: Client, callback_query: CallbackQuery, group_id: int):
+    if not await ensure_callback_admins(client, callback_query, group_id, "आपको यह सेटिंग बदलने के लिए एडमिन होना चाहिए!"):
+        return
     group_data = get_group(group_id)
     if not group_data:
-        await message.edit_text("इस ग्रुप की सेटिंग्स नहीं मिलीं। शायद यह बॉट से कनेक्टेड नहीं है।")
+        await callback_query.answer("ग्रुप की सेटिंग्स नहीं मिलीं।", show_alert=True)
+        return
+
+    text = (
+        f"🚫 **{group_data.get('title', group_id)}** की शब्द और डोमेन सूचियाँ:\n\n"
+        f"{format_group_lists(group_data)}\n\n"
+        "ग्रुप में बदलें: `/blocklist add शब्द1 शब्द2`, `/allowlist add शब्द`, "
+        "`/allowdomain add example.com`, `/denydomain add spam.xyz` (`remove` / `clear` भी)।\n"
+        "अलाउलिस्ट के शब्द ग्लोबल लिस्ट में होने पर भी नहीं पकड़े जाएँगे; अनुमत डोमेन (और उनके सब-डोमेन) एंटी-लिंक से बचे रहेंगे, "
+        "और प्रतिबंधित डोमेन एंटी-लिंक बंद होने पर भी हटाए जाएँगे।"
+    )
+    fields = list(GROUP_LIST_TITLES.items())
+    keyboard = [
+        [InlineKeyboardButton(f"🗑 {title} खाली करें", callback_data=callback_router.build("wlc", field, group_id)) for field, title in fields[i:i + 2]]
+        for i in range(0, len(fields), 2)
+    ]
+    keyboard.append([InlineKeyboardButton("🔙 वापस सेटिंग्स", callback_data=callback_router.build("sel", group_id))])
+    await edit_menu(callback_query.message, text, InlineKeyboardMarkup(keyboard))
+    await callback_query.answer()
+
+
+@callback_router.route("wlc", str, int)
+async def clear_group_list_callback(client: Client, callback_query: CallbackQuery, field: str, group_id: int):
+    if field not in GROUP_LIST_TITLES:
+        await callback_query.answer("अमान्य सूची।", show_alert=True)
         return
+    if not await ensure_callback_admins(client, callback_query, group_id, "आपको यह सेटिंग बदलने के लिए एडमिन होना चाहिए!"):
+        return
+    remove_from_group_list(group_id, field)
+    logger.info(f"Group {group_id}: {field} cleared by user {callback_query.from_user.id}.")
+    await group_lists_callback(client, callback_query, group_id)
+
 
+@pyrogram_app.on_callback_query()
+@chat_scheduler.handler
+async def callback_query_handler(client: Client, callback_query: CallbackQuery):
+    chat_id = callback_query.message.chat.id if callback_query.message else None
+    logger.info("[%s] Callback query received: %s from user %s.", chat_id, callback_query.data, callback_query.from_user.id)
+
+    if not await callback_router.dispatch(client, callback_query):
+        await callback_query.answer("यह बटन अब मान्य नहीं है। कृपया मेनू दोबारा खोलें।", show_alert=True)
+
+
+def render_group_settings(group_data: dict) -> tuple[str, InlineKeyboardMarkup]:
+    """The settings text and keyboard of a group; memoized per settings_version by settings_view_cache."""
+    group_id = group_data["_id"]
     group_title = group_data.get("title", f"Group ID: {group_id}")
 
     # Default values if settings not explicitly found
@@ -537,51 +761,115 @@ async def show_group_settings(client: Client, message: Message, group_id: int):
         f"\n**वर्तमान वेलकम मैसेज:**\n`{html.escape(welcome_message)}`"
     )
 
+    # हर 'tgl' बटन में वह मान है जो दबाने पर सेट होगा
     keyboard = [
         [
-            InlineKeyboardButton(f"वेलकम मैसेज: {'❌ बंद' if welcome_enabled else '✅ चालू'}", callback_data=f"welcome_toggle_{group_id}"),
-            InlineKeyboardButton("वेलकम सेटिंग्स", callback_data=f"welcome_set_custom_{group_id}") # Changed to set_custom directly
+            InlineKeyboardButton(f"वेलकम मैसेज: {'❌ बंद' if welcome_enabled else '✅ चालू'}", callback_data=callback_router.build("tgl", "welcome_enabled", group_id, not welcome_enabled)),
+            InlineKeyboardButton("वेलकम सेटिंग्स", callback_data=callback_router.build("wel", "custom", group_id))
         ],
-        [InlineKeyboardButton(f"एंटी-लिंक: {'❌ बंद' if anti_link_enabled else '✅ चालू'}", callback_data=f"toggle_anti_link_enabled_{group_id}")],
-        [InlineKeyboardButton(f"एंटी-फ्लड: {'❌ बंद' if anti_flood_enabled else '✅ चालू'}", callback_data=f"toggle_anti_flood_enabled_{group_id}")],
-        [InlineKeyboardButton("🔙 सभी ग्रुप्स पर वापस", callback_data="settings_menu")]
+        [InlineKeyboardButton(f"एंटी-लिंक: {'❌ बंद' if anti_link_enabled else '✅ चालू'}", callback_data=callback_router.build("tgl", "anti_link_enabled", group_id, not anti_link_enabled))],
+        [InlineKeyboardButton(f"एंटी-फ्लड: {'❌ बंद' if anti_flood_enabled else '✅ चालू'}", callback_data=callback_router.build("tgl", "anti_flood_enabled", group_id, not anti_flood_enabled))],
+        [InlineKeyboardButton("🚫 ब्लॉकलिस्ट / अलाउलिस्ट", callback_data=callback_router.build("wl", group_id))],
+        [InlineKeyboardButton("🔙 सभी ग्रुप्स पर वापस", callback_data=callback_router.build("settings"))]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return settings_text, InlineKeyboardMarkup(keyboard)
 
-    await message.edit_caption(settings_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
 
+# ग्रुप की सेटिंग्स का टेक्स्ट और कीबोर्ड, settings_version बदलने तक वही
+settings_view_cache = GroupSettingsCache(render_group_settings, max_groups=GROUP_SETTINGS_CACHE_SIZE)
+metrics.register_cache("settings_views", settings_view_cache)
 
-async def show_private_settings_menu(client: Client, message: Message, user_id: int):
-    user_admin_groups = []
-    all_known_groups = get_all_groups()
 
-    for group_data in all_known_groups:
-        try:
-            bot_member = await client.get_chat_member(group_data["_id"], client.me.id)
-            if bot_member.status != ChatMemberStatus.LEFT:
-                if await is_user_admin_in_chat(client, group_data["_id"], user_id):
-                    user_admin_groups.append(group_data)
-        except Exception as e:
-            logger.warning(f"Could not verify bot/user admin status for group {group_data.get('title', group_data['_id'])}: {e}")
+async def show_group_settings(client: Client, message: Message, group_id: int, group_data: dict | None = None, reply: bool = False):
+    """
+    Shows the settings of a group by editing the menu ``message`` (or replying
+    to it with ``reply``). ``group_data`` is the document a caller just wrote,
+    which saves reading it again.
+    """
+    if group_data is None:
+        group_data = get_group(group_id)
+    if not group_data:
+        not_found = "इस ग्रुप की सेटिंग्स नहीं मिलीं। शायद यह बॉट से कनेक्टेड नहीं है।"
+        await (message.reply_text(not_found) if reply else edit_menu(message, not_found, None))
+        return
+
+    settings_text, reply_markup = settings_view_cache.get(group_id, group_data)
+    if reply:
+        await message.reply_text(settings_text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+    else:
+        await edit_menu(message, settings_text, reply_markup)
 
-    if not user_admin_groups:
-        await message.edit_text(
+
+# प्राइवेट सेटिंग्स मेनू की ग्रुप सूची: id क्रम में कर्सर वाले पेज
+SETTINGS_PAGE_SIZE = 8
+SETTINGS_SCAN_LIMIT = 100 # एक पेज के लिए अधिकतम कितने ग्रुप्स में एडमिन होने की जाँच
+
+
+async def can_manage_group_settings(client: Client, group_id: int, user_id: int) -> bool:
+    try:
+        bot_member = await client.get_chat_member(group_id, client.me.id)
+        return bot_member.status != ChatMemberStatus.LEFT and await is_user_admin_in_chat(client, group_id, user_id)
+    except Exception as e:
+        logger.warning(f"Could not verify bot/user admin status for group {group_id}: {e}")
+        return False
+
+
+async def admin_groups_page(client: Client, user_id: int, after: int | None) -> tuple[list[dict], int | None]:
+    """
+    Up to SETTINGS_PAGE_SIZE groups after the ``after`` cursor whose settings
+    the user may manage, and the cursor of the next page (None on the last).
+    At most SETTINGS_SCAN_LIMIT groups are checked for one page.
+    """
+    page, cursor, scanned = [], after, 0
+    while scanned < SETTINGS_SCAN_LIMIT:
+        limit = min(SETTINGS_PAGE_SIZE * 2, SETTINGS_SCAN_LIMIT - scanned)
+        candidates = list_groups(cursor, limit, stale_ok=True)
+        allowed = await asyncio.gather(*(can_manage_group_settings(client, group["_id"], user_id) for group in candidates))
+        for group, ok in zip(candidates, allowed):
+            if ok:
+                if len(page) == SETTINGS_PAGE_SIZE:
+                    return page, page[-1]["_id"]
+                page.append(group)
+        scanned += len(candidates)
+        if len(candidates) < limit:
+            return page, None
+        cursor = candidates[-1]["_id"]
+    return page, cursor
+
+
+async def show_private_settings_menu(client: Client, message: Message, user_id: int, after: int | None = None, reply: bool = False):
+    """Lists one page of the user's groups; edits the menu ``message`` or, with ``reply``, replies to it."""
+    groups, next_cursor = await admin_groups_page(client, user_id, after)
+    if not groups and after is None and next_cursor is None:
+        text = (
             "आप किसी भी ऐसे ग्रुप में एडमिन नहीं हैं जहाँ मैं मौजूद हूँ। "
             "कृपया मुझे अपने ग्रुप में एडमिन के रूप में ऐड करें।"
         )
-        return
-
-    keyboard = []
-    for group in user_admin_groups:
-        keyboard.append([InlineKeyboardButton(group["title"], callback_data=f"select_group_{group['_id']}")])
-    
-    keyboard.append([InlineKeyboardButton("🔙 वापस", callback_data="start_menu")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = None
+    else:
+        keyboard = [
+            [InlineKeyboardButton(group.get("title") or str(group["_id"]), callback_data=callback_router.build("sel", group["_id"]))]
+            for group in groups
+        ]
+        navigation = []
+        if after is not None:
+            navigation.append(InlineKeyboardButton("⏮ पहला पेज", callback_data=callback_router.build("settings")))
+        if next_cursor is not None:
+            navigation.append(InlineKeyboardButton("आगे ➡️", callback_data=callback_router.build("setp", next_cursor)))
+        if navigation:
+            keyboard.append(navigation)
+        keyboard.append([InlineKeyboardButton("🔙 वापस", callback_data=callback_router.build("start"))])
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        text = "कृपया उस ग्रुप का चयन करें जिसकी आप सेटिंग्स प्रबंधित करना चाहते हैं:" if groups else "इस पेज पर आपका कोई और ग्रुप नहीं मिला।"
 
-    await message.edit_text("कृपया उस ग्रुप का चयन करें जिसकी आप सेटिंग्स प्रबंधित करना चाहते हैं:", reply_markup=reply_markup)
+    if reply:
+        await message.reply_text(text, reply_markup=reply_markup)
+    else:
+        await edit_menu(message, text, reply_markup)
 
 
 @pyrogram_app.on_message(filters.command("connectgroup") & filters.private)
+@chat_scheduler.handler
 async def connect_group_command(client: Client, message: Message):
     logger.info(f"[{message.chat.id}] Received /connectgroup command from user {message.from_user.id} ({message.from_user.first_name}).")
     if not check_cooldown(message.from_user.id, "command"):
@@ -656,61 +944,83 @@ async def connect_group_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("settings") & filters.private)
+@chat_scheduler.handler
 async def settings_menu_command(client: Client, message: Message):
     logger.info(f"[{message.chat.id}] Received /settings command from user {message.from_user.id} ({message.from_user.first_name}).")
     if not check_cooldown(message.from_user.id, "command"):
         return
 
     user_id = message.from_user.id
-    await show_private_settings_menu(client, message, user_id)
+    await show_private_settings_menu(client, message, user_id, reply=True)
 
 
 # Custom filter for awaiting input
-def awaiting_welcome_message_input_filter(_, message: Message):
-    return hasattr(pyrogram_app, 'waiting_for_welcome_message') and \
-           pyrogram_app.waiting_for_welcome_message == message.from_user.id and \
-           not message.text.startswith('/') and not message.text.startswith('!')
+# स्थिति DB में है: वेलकम बटन ग्रुप में (एक शार्ड पर) दबता है और मैसेज प्राइवेट चैट में (दूसरे पर) आता है
+async def awaiting_welcome_message_input_filter(_, __, message: Message):
+    if message.text.startswith(('/', '!')) and message.text != "/cancel":
+        return False
+    pending = get_pending_input(message.from_user.id)
+    return bool(pending) and pending.get("kind") == "welcome_message"
 
-@pyrogram_app.on_message(filters.private & filters.create(awaiting_welcome_message_input_filter))
+@pyrogram_app.on_message(filters.private & filters.text & filters.create(awaiting_welcome_message_input_filter))
+@chat_scheduler.handler
 async def handle_welcome_message_input(client: Client, message: Message):
     logger.info(f"Received potential welcome message input from user {message.from_user.id}. Message: '{message.text}'")
 
+    pending = get_pending_input(message.from_user.id)
+    if not pending or pending.get("kind") != "welcome_message":
+        logger.warning(f"User {message.from_user.id} sent message while not in awaiting input state for welcome message. Ignoring.")
+        return
+
     if message.text == "/cancel":
-        if hasattr(pyrogram_app, 'waiting_for_welcome_message') and pyrogram_app.waiting_for_welcome_message == message.from_user.id:
-            del pyrogram_app.waiting_for_welcome_message
-            if hasattr(pyrogram_app, 'waiting_for_welcome_group'):
-                del pyrogram_app.waiting_for_welcome_group
-            await message.reply_text("वेलकम मैसेज सेट करना रद्द कर दिया गया है।")
-            logger.info(f"Welcome message input cancelled by user {message.from_user.id}.")
+        clear_pending_input(message.from_user.id)
+        await message.reply_text("वेलकम मैसेज सेट करना रद्द कर दिया गया है।")
+        logger.info(f"Welcome message input cancelled by user {message.from_user.id}.")
         return
 
-    if hasattr(pyrogram_app, 'waiting_for_welcome_message') and pyrogram_app.waiting_for_welcome_message == message.from_user.id:
-        group_id = pyrogram_app.waiting_for_welcome_group
-        
-        if not await is_user_admin_in_chat(client, group_id, message.from_user.id):
-            await message.reply_text("आपको इस ग्रुप का वेलकम मैसेज सेट करने की अनुमति नहीं है।")
-            logger.warning(f"Unauthorized user {message.from_user.id} tried to set welcome message for group {group_id}.")
-            return
+    group_id = pending["group_id"]
+    if not await is_user_admin_in_chat(client, group_id, message.from_user.id):
+        await message.reply_text("आपको इस ग्रुप का वेलकम मैसेज सेट करने की अनुमति नहीं है।")
+        logger.warning(f"Unauthorized user {message.from_user.id} tried to set welcome message for group {group_id}.")
+        return
 
-        new_welcome_message = message.text
-        update_group_settings(group_id, {"welcome_message": new_welcome_message})
-        logger.info(f"Welcome message updated for group {group_id} by user {message.from_user.id}.")
-        
-        await message.reply_text(
-            f"✅ वेलकम मैसेज सफलतापूर्वक अपडेट किया गया है।\nनया मैसेज: `{html.escape(new_welcome_message)}`",
-            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 वापस सेटिंग्स", callback_data=f"select_group_{group_id}")]])
-        )
-        del pyrogram_app.waiting_for_welcome_message
-        del pyrogram_app.waiting_for_welcome_group
-    else:
-        logger.warning(f"User {message.from_user.id} sent message while not in awaiting input state for welcome message. Ignoring.")
+    new_welcome_message = message.text
+    update_group_settings(group_id, {"welcome_message": new_welcome_message}, changed_by=message.from_user.id, source="welcome")
+    logger.info(f"Welcome message updated for group {group_id} by user {message.from_user.id}.")
+
+    await message.reply_text(
+        f"✅ वेलकम मैसेज सफलतापूर्वक अपडेट किया गया है।\nनया मैसेज: `{html.escape(new_welcome_message)}`",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 वापस सेटिंग्स", callback_data=callback_router.build("sel", group_id))]])
+    )
+    clear_pending_input(message.from_user.id)
 
 
 # --- मुख्य मैसेज हैंडलर (ग्रुप में) ---
-@pyrogram_app.on_message(filters.text & filters.group & filters.create(is_not_edited_message) & ~filters.via_bot)
+# टेक्स्ट, कैप्शन, स्टिकर, फ़ॉरवर्ड और बटन वाले मैसेज, और उनके एडिट भी। group=1 ताकि
+# ग्रुप कमांड (group 0) भी चलें और हर मैसेज मॉडरेशन से भी गुज़रे।
+GROUP_CONTENT = filters.group & ~filters.via_bot & filters.create(has_moderatable_content)
+# इन उल्लंघनों वाले यूज़र `/bulkban flagged` के लिए याद रखे जाते हैं
+SPAM_VIOLATION_TYPES = frozenset({"स्पैम", "लिंक", "बायो_लिंक_उल्लंघन", "यूज़रनेम", "फ़ॉरवर्ड प्रचार"})
+
+
+@pyrogram_app.on_message(GROUP_CONTENT, group=1)
+@pyrogram_app.on_edited_message(GROUP_CONTENT, group=1)
+@chat_scheduler.handler
 async def handle_group_messages(client: Client, message: Message):
     group_id = message.chat.id
-    group_data = get_group(group_id)
+    if not message.from_user:
+        # गुमनाम एडमिन या चैनल की ओर से भेजे गए मैसेज
+        return
+
+    # यही मैसेज (या बिना बदलाव वाला एडिट) पहले जाँचा जा चुका है तो दोबारा काम नहीं
+    content = message_content(message)
+    is_edit = bool(message.edit_date)
+    if verdict_cache.lookup(group_id, message.id, content.digest) is not VerdictCache.MISSING:
+        logger.debug("[%s] Message %s already checked and unchanged. Skipping.", group_id, message.id)
+        return
+
+    # हर मैसेज पर पढ़ा जाता है: secondary से (कुछ सेकंड पुरानी सेटिंग चल जाती है)
+    group_data = get_group(group_id, stale_ok=True)
 
     if not group_data:
         add_or_update_group(group_id, message.chat.title, OWNER_ID) # Owner_ID as placeholder
@@ -718,41 +1028,79 @@ async def handle_group_messages(client: Client, message: Message):
         logger.info(f"Group {message.chat.title} ({group_id}) auto-added to database on first message.")
 
     if not group_data.get('bot_enabled', True):
-        logger.info(f"[{group_id}] Bot is disabled for this group. Ignoring message from {message.from_user.id}.")
+        logger.info("[%s] Bot is disabled for this group. Ignoring message from %s.", group_id, message.from_user.id, extra=SAMPLED)
         return
 
     if message.from_user.is_bot and message.from_user.id != client.me.id:
-        logger.info(f"[{group_id}] Ignoring message from other bot {message.from_user.id}.")
+        logger.info("[%s] Ignoring message from other bot %s.", group_id, message.from_user.id, extra=SAMPLED)
         return
     
     if message.from_user.id == client.me.id:
-        logger.debug(f"[{group_id}] Ignoring message from self bot {message.from_user.id}.")
+        logger.debug("[%s] Ignoring message from self bot %s.", group_id, message.from_user.id)
+        return
+
+    # फ़ेडरेशन में बैन यूज़र: फ़िल्टर और DB लिखने से पहले ही हटाएँ
+    federation_id = group_data.get("federation_id")
+    if federation_id and federation_bans.is_banned(federation_id, message.from_user.id):
+        verdict_cache.store(group_id, message.id, content.digest, "फ़ेडरेशन बैन")
+        await enforce_fed_ban(client, group_id, message.from_user.id, federation_id, message)
         return
 
-    add_or_update_user(message.from_user.id, message.from_user.username, message.from_user.first_name, message.from_user.last_name, message.from_user.is_bot)
-    logger.info(f"[{group_id}] User {message.from_user.id} data updated in DB.")
+    if not is_edit:
+        add_or_update_user(message.from_user.id, message.from_user.username, message.from_user.first_name, message.from_user.last_name, message.from_user.is_bot)
+        logger.info("[%s] User %s data updated in DB.", group_id, message.from_user.id, extra=SAMPLED)
+    mention_allowlist.note_sender(group_id, message.from_user)
 
     violation_detected = False
     violation_type = None
-    original_content = message.text
+    original_content = content.scan_text or " ".join(content.button_urls) or "[फ़ॉरवर्ड किया गया मैसेज]"
     case_name = None
 
-    if group_data.get('filter_abusive', False) and is_abusive(message.text):
-        violation_detected = True
-        violation_type = "गाली-गलौज"
-        case_name = "आपत्तिजनक भाषा का प्रयोग"
-    elif group_data.get('filter_pornographic_text', False) and is_pornographic_text(message.text):
+    # टेक्स्ट एक बार normalize होता है (यूनिकोड, homoglyph, leetspeak) और उसी पर SimHash, शब्द-सूची और
+    # स्पैम नियम चलते हैं; लंबे टेक्स्ट पर (ANALYSIS_PROCESSES > 0) यह सब अलग प्रोसेस में
+    filter_started_at = time.perf_counter()
+    analysis = await content_analyzer.analyze(content.scan_text, wordlist_cache.get(group_id, group_data))
+    metrics.FILTER_SECONDS.observe(time.perf_counter() - filter_started_at, stage="analysis")
+
+    # हर मैसेज दर्ज होता है (फ़िल्टर बंद हो तब भी), ताकि दूसरे ग्रुप्स में चल रहा कैंपेन दिखे
+    filter_started_at = time.perf_counter()
+    duplicate = NOT_FINGERPRINTED
+    if analysis.fingerprint is not None:
+        duplicate = fingerprint_store.observe_fingerprint(analysis.fingerprint, group_id, message.from_user.id)
+    if shard_link is not None and duplicate.fingerprint:
+        # बाकी शार्ड्स के ग्रुप में वही कैंपेन पकड़ने के लिए
+        shard_link.publish("fingerprint", duplicate.fingerprint, group_id, message.from_user.id)
+    metrics.FILTER_SECONDS.observe(time.perf_counter() - filter_started_at, stage="fingerprint")
+
+    # ग्लोबल गाली/पॉर्न लिस्ट (जो चालू हों) + ग्रुप की ब्लॉकलिस्ट - अलाउलिस्ट: एक ही स्कैन
+    filter_started_at = time.perf_counter()
+    word_match = analysis.word_match
+    if word_match:
         violation_detected = True
-        violation_type = "पॉर्नोग्राफिक टेक्स्ट"
-        case_name = "पॉर्नोग्राफिक सामग्री"
-    elif group_data.get('filter_spam', False) and is_spam(message.text):
+        category, matched_word = word_match
+        if category == WORD_CATEGORY_ABUSIVE:
+            violation_type = "गाली-गलौज"
+            case_name = "आपत्तिजनक भाषा का प्रयोग"
+        elif category == WORD_CATEGORY_PORN:
+            violation_type = "पॉर्नोग्राफिक टेक्स्ट"
+            case_name = "पॉर्नोग्राफिक सामग्री"
+        else:
+            violation_type = "ब्लॉक किया गया शब्द"
+            case_name = "ग्रुप की ब्लॉकलिस्ट का शब्द"
+        logger.debug("[%s] Listed word '%s' (%s) matched.", group_id, matched_word, category)
+    elif group_data.get('filter_spam', False) and (duplicate.is_spam or analysis.looks_spammy):
         violation_detected = True
         violation_type = "स्पैम"
-        case_name = "संदिग्ध स्पैम"
-    elif group_data.get('anti_link_enabled', False) and contains_links(message.text):
+        case_name = "दोहराया गया स्पैम" if duplicate.is_spam else "संदिग्ध स्पैम"
+        if duplicate.is_spam:
+            logger.info(f"[{group_id}] Duplicate message cluster hit: {duplicate.users} users, {duplicate.chats} chats, {duplicate.repeats} from this user.")
+    elif blocked_link := link_policy_cache.get(group_id, group_data).first_blocked(content.text, content.entities or [], content.button_urls):
+        # मैसेज में लिंक Telegram के entities से ही: बिना entities वाला मैसेज (pyrogram में None) लिंक-रहित है,
+        # वरना फ़ॉलबैक regex "config.py" जैसे शब्द भी पकड़ता। इनलाइन बटन के URL भी उसी नीति से जाँचे जाते हैं
         violation_detected = True
         violation_type = "लिंक"
         case_name = "अनधिकृत लिंक"
+        logger.debug("[%s] Blocked link domain '%s'.", group_id, blocked_link)
     elif group_data.get('filter_bio_links', False):
         # This filter needs to be async and call database.py functions
         # For now, assuming has_bio_link is in filters.py and uses database.py
@@ -766,17 +1114,29 @@ async def handle_group_messages(client: Client, message: Message):
             violation_type = "बायो_लिंक_उल्लंघन"
             case_name = "बायो में अनधिकृत लिंक"
 
-    elif group_data.get('usernamedel_enabled', False) and contains_usernames(message.text):
-        bot_username = client.me.username
-        if bot_username and f"@{bot_username.lower()}" in message.text.lower():
-            logger.debug(f"[{group_id}] Ignoring bot's own username mention in message from {message.from_user.id}.")
-            pass
-        else:
-            violation_detected = True
-            violation_type = "यूज़रनेम"
-            case_name = "यूज़रनेम प्रचार"
+    elif group_data.get('usernamedel_enabled', False) and (
+        promoted := await mention_allowlist.first_unknown(client, group_id, content.text, content.entities)
+    ):
+        # MENTION / TEXT_MENTION entities से; बॉट, एडमिन और ग्रुप के सदस्यों के मेंशन की अनुमति है
+        violation_detected = True
+        violation_type = "यूज़रनेम"
+        case_name = "यूज़रनेम प्रचार"
+        logger.debug("[%s] Mention %s is not a member of the group.", group_id, promoted)
+    elif group_data.get('usernamedel_enabled', False) and (
+        forwarded_from := await mention_allowlist.forward_not_allowed(client, group_id, content.forward_chat)
+    ):
+        # किसी दूसरे चैनल/ग्रुप से फ़ॉरवर्ड करना भी उसका प्रचार है (अपने लिंक्ड चैनल को छोड़कर)
+        violation_detected = True
+        violation_type = "फ़ॉरवर्ड प्रचार"
+        case_name = "बाहरी चैनल से फ़ॉरवर्ड"
+        logger.debug("[%s] Message forwarded from %s.", group_id, forwarded_from)
+    metrics.FILTER_SECONDS.observe(time.perf_counter() - filter_started_at, stage="content")
+    verdict_cache.store(group_id, message.id, content.digest, violation_type)
 
     if violation_detected:
+        metrics.VIOLATIONS.inc(type=violation_type)
+        if violation_type in SPAM_VIOLATION_TYPES:
+            flagged_users.record(group_id, message.from_user.id)
         logger.info(f"[{group_id}] Violation '{violation_type}' detected from user {message.from_user.id}. Attempting to delete message.")
         try:
             bot_member_in_chat = await client.get_chat_member(group_id, client.me.id)
@@ -816,26 +1176,28 @@ async def handle_group_messages(client: Client, message: Message):
 
             keyboard = [
                 [InlineKeyboardButton("👤 यूज़र प्रोफ़ाइल देखें", url=f"tg://user?id={message.from_user.id}")],
-                [InlineKeyboardButton("🔨 कार्रवाई करें", callback_data=f"take_action_{message.from_user.id}_{group_id}")],
+                [InlineKeyboardButton("🔨 कार्रवाई करें", callback_data=callback_router.build("act", message.from_user.id, group_id))],
                 [InlineKeyboardButton("📋 केस देखें", url=f"https://t.me/c/{str(CASE_LOG_CHANNEL_ID)[4:]}")]
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await client.send_message(
+            warning_card = await client.send_message(
                 chat_id=group_id,
                 text=warning_text,
                 reply_markup=reply_markup,
                 parse_mode=ParseMode.MARKDOWN
             )
+            expire_service_message(warning_card, service_ttl(group_data, "warning"))
             logger.info(f"[{group_id}] Warning message sent to group for user {message.from_user.id}.")
 
         except Exception as e:
             logger.error(f"[{group_id}] FATAL ERROR: Error handling violation for {message.from_user.id}: {e}", exc_info=True)
     else:
-        logger.info(f"[{group_id}] No violation detected for message from user {message.from_user.id}.")
+        logger.info("[%s] No violation detected for message from user %s.", group_id, message.from_user.id, extra=SAMPLED)
 
 
 # --- नए मेंबर/ग्रुप इवेंट्स हैंडलर ---
 @pyrogram_app.on_message(filters.new_chat_members | filters.left_chat_member & filters.group)
+@chat_scheduler.handler
 async def handle_new_chat_members(client: Client, message: Message):
     logger.info(f"[{message.chat.id}] New/Left chat members event in chat '{message.chat.title}'.")
 
@@ -883,28 +1245,37 @@ async def handle_new_chat_members(client: Client, message: Message):
                 logger.error(f"Error logging new group to channel: {e}")
         return
 
-    group_settings = get_group(message.chat.id)
+    group_settings = get_group(message.chat.id, stale_ok=True)
     if not group_settings or not group_settings.get('bot_enabled', True):
         logger.info(f"[{message.chat.id}] Bot disabled or no settings for this group. Ignoring new/left member event (after bot join).")
         return
 
     if message.new_chat_members:
+        federation_id = group_settings.get("federation_id")
         for member in message.new_chat_members:
+            if not member.is_bot and federation_id and federation_bans.is_banned(federation_id, member.id):
+                await enforce_fed_ban(client, message.chat.id, member.id, federation_id)
+                continue
+            if not member.is_bot:
+                mention_allowlist.note_sender(message.chat.id, member)
+                recent_joins.record(message.chat.id, member.id)
             if member.is_bot and member.id != client.me.id:
                 logger.info(f"[{message.chat.id}] New member is a bot: {member.id} ({member.first_name}). Attempting to kick.")
                 try:
                     bot_member_in_chat = await client.get_chat_member(message.chat.id, client.me.id)
                     if not bot_member_in_chat.can_restrict_members:
                         logger.warning(f"[{message.chat.id}] Bot does not have 'can_restrict_members' permission. Cannot kick bot {member.id}.")
-                        await client.send_message(message.chat.id, f"⚠️ **चेतावनी:** मैं नए बॉट [{member.first_name}](tg://user?id={member.id}) को हटा नहीं सकता क्योंकि मेरे पास 'सदस्यों को प्रतिबंधित करें' (Restrict Members) की अनुमति नहीं है।")
+                        notice = await client.send_message(message.chat.id, f"⚠️ **चेतावनी:** मैं नए बॉट [{member.first_name}](tg://user?id={member.id}) को हटा नहीं सकता क्योंकि मेरे पास 'सदस्यों को प्रतिबंधित करें' (Restrict Members) की अनुमति नहीं है।")
+                        expire_service_message(notice, service_ttl(group_settings, "botkick"))
                         continue
                         
                     await client.ban_chat_member(message.chat.id, member.id)
                     await client.unban_chat_member(message.chat.id, member.id)
-                    await client.send_message(
+                    notice = await client.send_message(
                         message.chat.id,
                         f"🤖 नया बॉट [{member.first_name}](tg://user?id={member.id}) पाया गया और हटा दिया गया।"
                     )
+                    expire_service_message(notice, service_ttl(group_settings, "botkick"))
                     logger.info(f"[{message.chat.id}] Bot {member.id} kicked successfully and message sent.")
                 except Exception as e:
                     logger.error(f"[{message.chat.id}] Error kicking bot {member.id}: {e}", exc_info=True)
@@ -931,8 +1302,13 @@ async def handle_new_chat_members(client: Client, message: Message):
                 ])
 
                 try:
-                    await client.send_message(message.chat.id, formatted_welcome, reply_markup=welcome_keyboard, parse_mode=ParseMode.MARKDOWN)
+                    welcome = await client.send_message(message.chat.id, formatted_welcome, reply_markup=welcome_keyboard, parse_mode=ParseMode.MARKDOWN)
                     logger.info(f"[{message.chat.id}] Welcome message sent to new user {member.id}.")
+                    expire_service_message(welcome, service_ttl(group_settings, "welcome"))
+                    # नया वेलकम पुराने की जगह लेता है, ताकि रेड में वेलकम का ढेर न लगे
+                    previous_welcome = last_welcomes.swap(message.chat.id, welcome.id)
+                    if previous_welcome is not None:
+                        await outbound_limiter.call(client.delete_messages, message.chat.id, previous_welcome)
                 except Exception as e:
                     logger.error(f"[{message.chat.id}] Error sending welcome message to {member.id}: {e}", exc_info=True)
 
@@ -966,6 +1342,7 @@ async def handle_new_chat_members(client: Client, message: Message):
 
 # --- बॉट मालिक कमांड्स ---
 @pyrogram_app.on_message(filters.command("broadcast") & filters.user(OWNER_ID) & filters.private)
+@chat_scheduler.handler
 async def broadcast_command(client: Client, message: Message):
     logger.info(f"Owner {message.from_user.id} received /broadcast command.")
     if not check_cooldown(message.from_user.id, "command"):
@@ -977,7 +1354,7 @@ async def broadcast_command(client: Client, message: Message):
         return
 
     message_to_broadcast = message.text.split(None, 1)[1]
-    all_groups = get_all_groups()
+    all_groups = get_all_groups(stale_ok=True)
     logger.info(f"Attempting to broadcast message to {len(all_groups)} groups.")
 
     sent_count = 0
@@ -986,12 +1363,12 @@ async def broadcast_command(client: Client, message: Message):
 
     for group in all_groups:
         try:
-            chat_member = await client.get_chat_member(group["_id"], client.me.id)
+            # दोनों कॉल लिमिटर से: हज़ारों ग्रुप्स में भी Telegram की सीमा के अंदर, FloodWait पर सब रुकते हैं
+            chat_member = await outbound_limiter.call(client.get_chat_member, group["_id"], client.me.id)
             if chat_member.status != ChatMemberStatus.LEFT:
-                await client.send_message(chat_id=group["_id"], text=message_to_broadcast)
+                await outbound_limiter.call(client.send_message, group["_id"], message_to_broadcast, chat_id=group["_id"])
                 sent_count += 1
                 logger.info(f"Broadcasted to group {group['_id']} ({group.get('title', 'N/A')}).")
-                await asyncio.sleep(0.1)
             else:
                 logger.warning(f"Bot is not a member of group {group['_id']} ({group.get('title', 'N/A')}). Skipping broadcast.")
                 failed_count += 1
@@ -1012,22 +1389,16 @@ async def broadcast_command(client: Client, message: Message):
     logger.info(f"Broadcast completed. Sent to {sent_count} groups, failed for {failed_count}.")
 
 @pyrogram_app.on_message(filters.command("stats") & filters.user(OWNER_ID) & filters.private)
+@chat_scheduler.handler
 async def stats_command(client: Client, message: Message):
     logger.info(f"Owner {message.from_user.id} received /stats command.")
     if not check_cooldown(message.from_user.id, "command"):
         return
 
-    group_count = len(get_all_groups())
-    # You might need to add get_total_users() and get_total_violations() to database.py
-    # For now, I'll use placeholders if they are not yet implemented.
-    # If you have them, ensure they are imported from database.py
-    total_users_count = 0 # Placeholder
+    # गिनती कलेक्शन मेटाडेटा से (secondary पर), सारे डॉक्यूमेंट लोड किए बिना
+    group_count = count_groups()
+    total_users_count = count_users()
     total_violations_count = 0 # Placeholder
-    
-    # Example of how to get actual counts if implemented in database.py
-    # from database import get_total_users, get_total_violations
-    # total_users_count = get_total_users()
-    # total_violations_count = get_total_violations()
 
 
     stats_message = (
@@ -1043,9 +1414,29 @@ async def stats_command(client: Client, message: Message):
     logger.info(f"Stats sent to owner {message.from_user.id}. Groups: {group_count}, Users: {total_users_count}, Violations: {total_violations_count}.")
 
 
+@pyrogram_app.on_message(filters.command("queues") & filters.user(OWNER_ID) & filters.private)
+@chat_scheduler.handler
+async def queues_command(client: Client, message: Message):
+    logger.info(f"Owner {message.from_user.id} received /queues command.")
+
+    depths = chat_scheduler.queue_depths()
+    queues_message = (
+        f"📥 **अपडेट कतारें** 📥\n\n"
+        f"**वर्कर:** `{chat_scheduler.workers}` (प्रति चैट `{chat_scheduler.per_chat_concurrency}`)\n"
+        f"**चल रहे हैंडलर:** `{chat_scheduler.in_flight()}`\n"
+        f"**कतार में कुल अपडेट:** `{chat_scheduler.total_queued()}`\n"
+        f"**प्रोसेस किए गए:** `{chat_scheduler.processed}` | **छोड़े गए:** `{chat_scheduler.dropped}`"
+    )
+    if depths:
+        queues_message += "\n\n**सबसे लंबी कतारें:**\n" + "\n".join(f"`{chat_id}`: {depth}" for chat_id, depth in depths)
+    await message.reply_text(queues_message, parse_mode=ParseMode.MARKDOWN)
+
+
 # --- Admin Commands (Group specific) ---
 
 @pyrogram_app.on_message(filters.command("ban") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def ban_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1055,11 +1446,12 @@ async def ban_command(client: Client, message: Message):
         return
     
     target_user_id = None
+    args = message.command[1:]
     if message.reply_to_message:
         target_user_id = message.reply_to_message.from_user.id
-    elif len(message.command) > 1:
+    elif args:
         try:
-            target_user_id = int(message.command[1])
+            target_user_id = int(args.pop(0))
         except ValueError:
             await message.reply_text("कृपया उस यूज़र को रिप्लाई करें या यूज़र ID प्रदान करें जिसे आप बैन करना चाहते हैं।")
             return
@@ -1067,6 +1459,15 @@ async def ban_command(client: Client, message: Message):
         await message.reply_text("कृपया उस यूज़र को रिप्लाई करें या यूज़र ID प्रदान करें जिसे आप बैन करना चाहते हैं।")
         return
 
+    # वैकल्पिक अवधि: `/ban 123456789 1d` या रिप्लाई में `/ban 1d`
+    duration = None
+    if args:
+        try:
+            duration = parse_duration(args[0])
+        except ValueError as e:
+            await message.reply_text(str(e))
+            return
+
     if target_user_id == client.me.id:
         await message.reply_text("मैं खुद को बैन नहीं कर सकता।")
         return
@@ -1078,10 +1479,18 @@ async def ban_command(client: Client, message: Message):
         return
 
     try:
-        await client.ban_chat_member(message.chat.id, target_user_id)
+        # until_date सिर्फ़ बैकअप है; अनबैन जॉब से होता है (Telegram 30 सेकंड से कम की अवधि को स्थायी मानता है)
+        await client.ban_chat_member(message.chat.id, target_user_id, (datetime.now() + timedelta(seconds=duration)) if duration else None)
+        if duration:
+            job_scheduler.schedule("unban", duration, message.chat.id, target_user_id, replace=True)
+        else:
+            job_scheduler.cancel("unban", message.chat.id, target_user_id)
         user_info = await client.get_users(target_user_id)
-        await message.reply_text(f"✅ {user_info.mention} को इस ग्रुप से बैन कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
-        logger.info(f"User {target_user_id} banned in group {message.chat.id} by {message.from_user.id}.")
+        if duration:
+            await message.reply_text(f"✅ {user_info.mention} को इस ग्रुप से {format_duration(duration)} के लिए बैन कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
+        else:
+            await message.reply_text(f"✅ {user_info.mention} को इस ग्रुप से बैन कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
+        logger.info(f"User {target_user_id} banned in group {message.chat.id} by {message.from_user.id}" + (f" for {duration}s." if duration else "."))
         
         if CASE_LOG_CHANNEL_ID:
             await client.send_message(
@@ -1089,7 +1498,8 @@ async def ban_command(client: Client, message: Message):
                 f"🚫 **यूज़र बैन किया गया:**\n"
                 f"ग्रुप: `{message.chat.title}` (ID: `{message.chat.id}`)\n"
                 f"बैन किया गया यूज़र: [{user_info.first_name}](tg://user?id={user_info.id}) (ID: `{user_info.id}`)\n"
-                f"बैन करने वाला एडमिन: {message.from_user.mention} (ID: `{message.from_user.id}`)"
+                f"बैन करने वाला एडमिन: {message.from_user.mention} (ID: `{message.from_user.id}`)\n"
+                f"अवधि: {format_duration(duration) if duration else 'स्थायी'}"
             )
     except Exception as e:
         logger.error(f"Error banning user {target_user_id} in {message.chat.id}: {e}")
@@ -1097,6 +1507,8 @@ async def ban_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("unban") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def unban_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1120,6 +1532,7 @@ async def unban_command(client: Client, message: Message):
 
     try:
         await client.unban_chat_member(message.chat.id, target_user_id)
+        job_scheduler.cancel("unban", message.chat.id, target_user_id)
         user_info = await client.get_users(target_user_id)
         await message.reply_text(f"✅ {user_info.mention} को इस ग्रुप से अनबैन कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
         logger.info(f"User {target_user_id} unbanned in group {message.chat.id} by {message.from_user.id}.")
@@ -1138,6 +1551,8 @@ async def unban_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("kick") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def kick_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1192,6 +1607,8 @@ async def kick_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("mute") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def mute_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1201,11 +1618,12 @@ async def mute_command(client: Client, message: Message):
         return
 
     target_user_id = None
+    args = message.command[1:]
     if message.reply_to_message:
         target_user_id = message.reply_to_message.from_user.id
-    elif len(message.command) > 1:
+    elif args:
         try:
-            target_user_id = int(message.command[1])
+            target_user_id = int(args.pop(0))
         except ValueError:
             await message.reply_text("कृपया उस यूज़र को रिप्लाई करें या यूज़र ID प्रदान करें जिसे आप म्यूट करना चाहते हैं।")
             return
@@ -1213,6 +1631,15 @@ async def mute_command(client: Client, message: Message):
         await message.reply_text("कृपया उस यूज़र को रिप्लाई करें या यूज़र ID प्रदान करें जिसे आप म्यूट करना चाहते हैं।")
         return
 
+    # वैकल्पिक अवधि: `/mute 123456789 30m` या रिप्लाई में `/mute 30m`
+    duration = None
+    if args:
+        try:
+            duration = parse_duration(args[0])
+        except ValueError as e:
+            await message.reply_text(str(e))
+            return
+
     if target_user_id == client.me.id:
         await message.reply_text("मैं खुद को म्यूट नहीं कर सकता।")
         return
@@ -1223,35 +1650,25 @@ async def mute_command(client: Client, message: Message):
         await message.reply_text("आप मालिक को म्यूट नहीं कर सकते।")
         return
 
-    duration = None
-    if len(message.command) > 2:
-        try:
-            duration_value = int(message.command[2])
-            duration_unit = message.command[3].lower() if len(message.command) > 3 else "m"
-            if duration_unit.startswith("h"):
-                duration = timedelta(hours=duration_value)
-            elif duration_unit.startswith("d"):
-                duration = timedelta(days=duration_value)
-            else: # default to minutes
-                duration = timedelta(minutes=duration_value)
-        except ValueError:
-            await message.reply_text("अमान्य अवधि। उदाहरण: `/mute 123456789 30m` (30 मिनट), `/mute 1h` (1 घंटा), `/mute 7d` (7 दिन)")
-            return
-
     try:
+        # until_date सिर्फ़ बैकअप है; अनम्यूट जॉब से होता है
         await client.restrict_chat_member(message.chat.id, target_user_id, 
                                           ChatPermissions(can_send_messages=False), 
-                                          (datetime.now() + duration) if duration else None)
+                                          (datetime.now() + timedelta(seconds=duration)) if duration else None)
+        if duration:
+            job_scheduler.schedule("unmute", duration, message.chat.id, target_user_id, replace=True)
+        else:
+            job_scheduler.cancel("unmute", message.chat.id, target_user_id)
         user_info = await client.get_users(target_user_id)
         if duration:
-            await message.reply_text(f"✅ {user_info.mention} को {duration.total_seconds() // 60} मिनट के लिए म्यूट कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
-            logger.info(f"User {target_user_id} muted for {duration} in group {message.chat.id} by {message.from_user.id}.")
+            await message.reply_text(f"✅ {user_info.mention} को {format_duration(duration)} के लिए म्यूट कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
+            logger.info(f"User {target_user_id} muted for {duration}s in group {message.chat.id} by {message.from_user.id}.")
         else:
             await message.reply_text(f"✅ {user_info.mention} को म्यूट कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
             logger.info(f"User {target_user_id} muted indefinitely in group {message.chat.id} by {message.from_user.id}.")
 
         if CASE_LOG_CHANNEL_ID:
-            duration_str = f" for {duration}" if duration else " indefinitely"
+            duration_str = format_duration(duration) if duration else "स्थायी"
             await client.send_message(
                 CASE_LOG_CHANNEL_ID,
                 f"🔇 **यूज़र म्यूट किया गया:**\n"
@@ -1266,6 +1683,8 @@ async def mute_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("unmute") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def unmute_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1288,17 +1707,8 @@ async def unmute_command(client: Client, message: Message):
         return
 
     try:
-        await client.restrict_chat_member(message.chat.id, target_user_id, ChatPermissions(
-            can_send_messages=True,
-            can_send_media_messages=True,
-            can_send_other_messages=True,
-            can_add_web_page_previews=True,
-            can_send_polls=True,
-            can_change_info=False,
-            can_invite_users=True,
-            can_pin_messages=False,
-            can_manage_topics=False
-        ))
+        await client.restrict_chat_member(message.chat.id, target_user_id, UNMUTED_PERMISSIONS)
+        job_scheduler.cancel("unmute", message.chat.id, target_user_id)
         user_info = await client.get_users(target_user_id)
         await message.reply_text(f"✅ {user_info.mention} को अनम्यूट कर दिया गया है।", parse_mode=ParseMode.MARKDOWN)
         logger.info(f"User {target_user_id} unmuted in group {message.chat.id} by {message.from_user.id}.")
@@ -1316,7 +1726,207 @@ async def unmute_command(client: Client, message: Message):
         await message.reply_text(f"यूज़र को अनम्यूट करने में त्रुटि आई: `{e}`")
 
 
+# --- Scheduled Jobs & Lockdown ---
+# अस्थायी म्यूट/बैन/लॉकडाउन DB के जॉब से हटते हैं (देखें jobs.py); until_date सिर्फ़ बैकअप है
+
+# अनम्यूट के बाद सदस्य की सामान्य अनुमतियाँ (जानकारी बदलना और पिन करना एडमिन के लिए)
+UNMUTED_PERMISSIONS = ChatPermissions(
+    can_send_messages=True,
+    can_send_media_messages=True,
+    can_send_other_messages=True,
+    can_add_web_page_previews=True,
+    can_send_polls=True,
+    can_change_info=False,
+    can_invite_users=True,
+    can_pin_messages=False
+)
+# लॉकडाउन से पहले ग्रुप की ये अनुमतियाँ सहेजी जाती हैं
+CHAT_PERMISSION_FIELDS = (
+    "can_send_messages", "can_send_media_messages", "can_send_other_messages", "can_add_web_page_previews",
+    "can_send_polls", "can_change_info", "can_invite_users", "can_pin_messages"
+)
+
+
+@job_scheduler.handler("unmute")
+async def unmute_job(job: dict):
+    await outbound_limiter.call(pyrogram_app.restrict_chat_member, job["chat_id"], job["user_id"], UNMUTED_PERMISSIONS)
+    logger.info(f"User {job['user_id']} unmuted in group {job['chat_id']} (mute expired).")
+
+
+@job_scheduler.handler("unban")
+async def unban_job(job: dict):
+    await outbound_limiter.call(pyrogram_app.unban_chat_member, job["chat_id"], job["user_id"])
+    logger.info(f"User {job['user_id']} unbanned in group {job['chat_id']} (ban expired).")
+
+
+@job_scheduler.handler("lift_lockdown")
+async def lift_lockdown_job(job: dict):
+    chat_id = job["chat_id"]
+    if await lift_lockdown(pyrogram_app, chat_id):
+        await outbound_limiter.call(pyrogram_app.send_message, chat_id, "🔓 लॉकडाउन का समय पूरा हुआ, ग्रुप फिर से खुल गया है।", chat_id=chat_id)
+        logger.info(f"Lockdown of group {chat_id} expired.")
+
+
+@job_scheduler.handler("delete_messages", batch=True)
+async def delete_messages_job(jobs: list[dict]):
+    """Deletes expired bot messages: one delete_messages call per chat for the jobs that came due together."""
+    message_ids = {}
+    for job in jobs:
+        message_ids.setdefault(job["chat_id"], []).extend(job["payload"]["message_ids"])
+
+    async def delete_in_chat(chat_id: int, ids: list[int]):
+        for start in range(0, len(ids), DELETE_BATCH_MAX):
+            try:
+                await outbound_limiter.call(pyrogram_app.delete_messages, chat_id, ids[start:start + DELETE_BATCH_MAX])
+            except Exception as e:
+                # बॉट ग्रुप से हट गया या मैसेज पहले ही हटा: बाकी चैट्स पर असर नहीं
+                logger.warning(f"Could not delete {len(ids)} expired bot messages in chat {chat_id}: {e}")
+                return
+
+    await asyncio.gather(*(delete_in_chat(chat_id, ids) for chat_id, ids in message_ids.items()))
+    logger.debug("Deleted %s expired bot messages in %s chats.", sum(map(len, message_ids.values())), len(message_ids))
+
+
+async def lift_lockdown(client: Client, chat_id: int) -> bool:
+    """Restores the permissions saved by /lockdown; False if the group is not locked down."""
+    saved = (get_group(chat_id) or {}).get("lockdown_permissions")
+    if saved is None:
+        return False
+    await outbound_limiter.call(client.set_chat_permissions, chat_id, ChatPermissions(**saved))
+    update_group_settings(chat_id, {"lockdown_permissions": None})
+    return True
+
+
+@pyrogram_app.on_message(filters.command("lockdown") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def lockdown_command(client: Client, message: Message):
+    chat_id = message.chat.id
+    if not await is_user_admin_in_chat(client, chat_id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+    if not await is_bot_admin_in_chat(client, chat_id):
+        await message.reply_text("मुझे ग्रुप की अनुमतियाँ बदलने के लिए एडमिन अनुमति चाहिए।")
+        return
+
+    duration = None
+    if len(message.command) > 1:
+        try:
+            duration = parse_duration(message.command[1])
+        except ValueError as e:
+            await message.reply_text(str(e))
+            return
+
+    try:
+        group = get_group(chat_id)
+        if not group:
+            add_or_update_group(chat_id, message.chat.title, message.from_user.id)
+            group = {}
+        # दोबारा /lockdown से सिर्फ़ समय बदलता है; सहेजी हुई (खुली) अनुमतियाँ वही रहती हैं
+        if group.get("lockdown_permissions") is None:
+            current = (await client.get_chat(chat_id)).permissions or UNMUTED_PERMISSIONS
+            update_group_settings(chat_id, {"lockdown_permissions": {field: bool(getattr(current, field, False)) for field in CHAT_PERMISSION_FIELDS}})
+            await client.set_chat_permissions(chat_id, ChatPermissions(can_send_messages=False))
+        if duration:
+            job_scheduler.schedule("lift_lockdown", duration, chat_id, replace=True)
+        else:
+            job_scheduler.cancel("lift_lockdown", chat_id)
+    except Exception as e:
+        logger.error(f"Error locking down group {chat_id}: {e}")
+        await message.reply_text(f"लॉकडाउन करने में त्रुटि आई: `{e}`")
+        return
+
+    until = f"{format_duration(duration)} बाद अपने आप खुलेगा" if duration else "`/unlock` से खोलें"
+    await message.reply_text(f"🔒 ग्रुप लॉकडाउन में है, सदस्य अभी मैसेज नहीं भेज सकते। {until}।", parse_mode=ParseMode.MARKDOWN)
+    logger.info(f"Group {chat_id} locked down by {message.from_user.id}" + (f" for {duration}s." if duration else "."))
+
+    if CASE_LOG_CHANNEL_ID:
+        await client.send_message(
+            CASE_LOG_CHANNEL_ID,
+            f"🔒 **ग्रुप लॉकडाउन:**\n"
+            f"ग्रुप: `{message.chat.title}` (ID: `{chat_id}`)\n"
+            f"एडमिन: {message.from_user.mention} (ID: `{message.from_user.id}`)\n"
+            f"अवधि: {format_duration(duration) if duration else 'जब तक /unlock न हो'}"
+        )
+
+
+@pyrogram_app.on_message(filters.command("unlock") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def unlock_command(client: Client, message: Message):
+    chat_id = message.chat.id
+    if not await is_user_admin_in_chat(client, chat_id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+
+    try:
+        job_scheduler.cancel("lift_lockdown", chat_id)
+        lifted = await lift_lockdown(client, chat_id)
+    except Exception as e:
+        logger.error(f"Error lifting lockdown of group {chat_id}: {e}")
+        await message.reply_text(f"लॉकडाउन हटाने में त्रुटि आई: `{e}`")
+        return
+    if not lifted:
+        await message.reply_text("यह ग्रुप लॉकडाउन में नहीं है।")
+        return
+    await message.reply_text("🔓 लॉकडाउन हटा दिया गया है, ग्रुप फिर से खुल गया है।")
+    logger.info(f"Lockdown of group {chat_id} lifted by {message.from_user.id}.")
+
+
+# --- Warn Escalation ---
+async def warn_user(client: Client, chat_id: int, chat_title: str, target_user, admin_user) -> str:
+    """
+    Adds a warn and applies the ladder step it reaches (see warn_ladder.py); returns the reply text.
+
+    The count is incremented, compared with the last step and reset in one
+    atomic DB call, so two admins warning at once cannot both trigger it.
+    """
+    ladder = ladder_for(get_group(chat_id) or {})
+    warn_limit = ladder[-1]["at"]
+    current_warns = escalate_warn(chat_id, target_user.id, warn_limit)
+    warn_message = f"⚠️ {target_user.mention} को {current_warns}/{warn_limit} चेतावनी मिली है।"
+    logger.info(f"User {target_user.id} warned in group {chat_id} by {admin_user.id}. Total warns: {current_warns}.")
+
+    step = step_for(ladder, current_warns)
+    if step is None:
+        return warn_message
+
+    action = step["action"]
+    try:
+        if action == "mute":
+            await client.restrict_chat_member(
+                chat_id, target_user.id, ChatPermissions(can_send_messages=False),
+                until_date=datetime.now() + timedelta(seconds=step["duration"])
+            )
+            job_scheduler.schedule("unmute", step["duration"], chat_id, target_user.id, replace=True)
+            warn_message += f"\n{target_user.mention} को {current_warns} चेतावनियों के बाद {format_duration(step['duration'])} के लिए म्यूट कर दिया गया है।"
+        elif action == "kick":
+            await client.ban_chat_member(chat_id, target_user.id)
+            await client.unban_chat_member(chat_id, target_user.id)
+            warn_message += f"\n{target_user.mention} को {current_warns} चेतावनियों के बाद ग्रुप से किक कर दिया गया है।"
+        else:
+            await client.ban_chat_member(chat_id, target_user.id)
+            warn_message += f"\n{target_user.mention} को {current_warns} चेतावनियों के बाद ग्रुप से बैन कर दिया गया है।"
+    except Exception as e:
+        logger.error(f"Error applying warn ladder step {action} to user {target_user.id} in group {chat_id}: {e}")
+        return warn_message + f"\n{ACTION_LABELS[action]} करने में त्रुटि आई: `{e}`"
+    logger.info(f"User {target_user.id} {action} in group {chat_id} after {current_warns} warns.")
+
+    if CASE_LOG_CHANNEL_ID:
+        await client.send_message(
+            CASE_LOG_CHANNEL_ID,
+            f"⛔ **चेतावनी के बाद {ACTION_LABELS[action]}:**\n"
+            f"ग्रुप: `{chat_title}` (ID: `{chat_id}`)\n"
+            f"यूज़र: [{target_user.first_name}](tg://user?id={target_user.id}) (ID: `{target_user.id}`)\n"
+            f"चेतावनी देने वाला एडमिन: {admin_user.mention} (ID: `{admin_user.id}`)\n"
+            f"चेतावनी संख्या: `{current_warns}`"
+        )
+    return warn_message
+
+
 @pyrogram_app.on_message(filters.command("warn") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def warn_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1352,33 +1962,13 @@ async def warn_command(client: Client, message: Message):
         await message.reply_text("आप मालिक को चेतावनी नहीं दे सकते।")
         return
 
-    current_warns = add_warn(message.chat.id, target_user.id)
-    group_data = get_group(message.chat.id)
-    warn_limit = group_data.get("warn_limit", 3) # Get warn limit from group settings
-
-    warn_message = f"⚠️ {target_user.mention} को {current_warns}/{warn_limit} चेतावनी मिली है।"
-    
-    if current_warns >= warn_limit:
-        await client.ban_chat_member(message.chat.id, target_user.id)
-        warn_message += f"\n{target_user.mention} को {warn_limit} चेतावनियों के बाद ग्रुप से बैन कर दिया गया है।"
-        delete_warns(message.chat.id, target_user.id)
-        logger.info(f"User {target_user.id} banned in group {message.chat.id} after reaching warn limit.")
-
-        if CASE_LOG_CHANNEL_ID:
-            await client.send_message(
-                CASE_LOG_CHANNEL_ID,
-                f"⛔ **चेतावनी के बाद बैन:**\n"
-                f"ग्रुप: `{message.chat.title}` (ID: `{message.chat.id}`)\n"
-                f"यूज़र: [{target_user.first_name}](tg://user?id={target_user.id}) (ID: `{target_user.id}`)\n"
-                f"चेतावनी देने वाला एडमिन: {message.from_user.mention} (ID: `{message.from_user.id}`)\n"
-                f"चेतावनी संख्या: `{current_warns}`"
-            )
-
+    warn_message = await warn_user(client, message.chat.id, message.chat.title, target_user, message.from_user)
     await message.reply_text(warn_message, parse_mode=ParseMode.MARKDOWN)
-    logger.info(f"User {target_user.id} warned in group {message.chat.id} by {message.from_user.id}. Total warns: {current_warns}.")
 
 
 @pyrogram_app.on_message(filters.command("warnings") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def warnings_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1406,6 +1996,8 @@ async def warnings_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("resetwarns") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def resetwarns_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1442,7 +2034,583 @@ async def resetwarns_command(client: Client, message: Message):
         )
 
 
+@pyrogram_app.on_message(filters.command("setwarnladder") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def set_warn_ladder_command(client: Client, message: Message):
+    if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+
+    args = message.command[1:]
+    if not args:
+        ladder = ladder_for(get_group(message.chat.id) or {})
+        await message.reply_text(
+            f"🪜 **चेतावनी सीढ़ी:**\n{format_ladder(ladder)}\n\n"
+            "बदलने के लिए: `/setwarnladder 3:mute:1h 5:mute:1d 7:ban`\nडिफ़ॉल्ट (3 पर बैन) के लिए: `/setwarnladder reset`",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+
+    if len(args) == 1 and args[0].lower() == "reset":
+        update_group_settings(message.chat.id, {"warn_ladder": None, "warn_limit": 3}, changed_by=message.from_user.id, source="warnladder")
+        ladder = ladder_for({})
+    else:
+        try:
+            ladder = parse_ladder(args)
+        except ValueError as e:
+            await message.reply_text(str(e))
+            return
+        # warn_limit आखिरी पायदान के साथ रहता है, ताकि "x/limit" वाले मैसेज सही रहें
+        update_group_settings(message.chat.id, {"warn_ladder": ladder, "warn_limit": ladder[-1]["at"]}, changed_by=message.from_user.id, source="warnladder")
+
+    await message.reply_text(f"✅ चेतावनी सीढ़ी अपडेट की गई है:\n{format_ladder(ladder)}")
+    logger.info(f"Group {message.chat.id}: warn ladder set to {ladder} by {message.from_user.id}.")
+
+
+@pyrogram_app.on_message(filters.command("servicettl") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def service_ttl_command(client: Client, message: Message):
+    if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+
+    args = [arg.lower() for arg in message.command[1:]]
+    group = get_group(message.chat.id)
+    if not group:
+        add_or_update_group(message.chat.id, message.chat.title, message.from_user.id)
+        group = {}
+    usage = (
+        "बदलने के लिए: `/servicettl <प्रकार | all> <30m | 1h | off>`\n"
+        f"प्रकार: {', '.join(f'`{kind}`' for kind in SERVICE_CLASSES)}"
+    )
+    if not args:
+        await message.reply_text(f"🧹 **बॉट के मैसेज कितनी देर बाद हटें:**\n{format_service_ttls(group)}\n\n{usage}", parse_mode=ParseMode.MARKDOWN)
+        return
+    if len(args) != 2 or (args[0] != "all" and args[0] not in SERVICE_CLASSES):
+        await message.reply_text(usage, parse_mode=ParseMode.MARKDOWN)
+        return
+    try:
+        ttl = parse_service_ttl(args[1])
+    except ValueError as e:
+        await message.reply_text(str(e))
+        return
+
+    ttls = dict(group.get("service_ttl") or {})
+    for kind in (SERVICE_CLASSES if args[0] == "all" else [args[0]]):
+        ttls[kind] = ttl
+    ttls = {kind: seconds for kind, seconds in ttls.items() if seconds}
+    update_group_settings(message.chat.id, {"service_ttl": ttls}, changed_by=message.from_user.id, source="servicettl")
+    await message.reply_text(f"✅ अपडेट किया गया:\n{format_service_ttls({'service_ttl': ttls})}", parse_mode=ParseMode.MARKDOWN)
+    logger.info(f"Group {message.chat.id}: service message TTLs set to {ttls} by {message.from_user.id}.")
+
+
+# --- Settings Profiles ---
+@pyrogram_app.on_message(filters.command("exportsettings") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def export_settings_command(client: Client, message: Message):
+    if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+    group = get_group(message.chat.id)
+    if not group:
+        await message.reply_text("इस ग्रुप की सेटिंग्स नहीं मिलीं।")
+        return
+
+    document = io.BytesIO(dump_profile(group))
+    document.name = f"settings-{message.chat.id}.json"
+    await message.reply_document(
+        document,
+        caption=(
+            f"⚙️ **{message.chat.title}** की सेटिंग्स प्रोफ़ाइल (वर्ज़न {group.get('settings_version', 0)})।\n"
+            "किसी दूसरे ग्रुप में इस फ़ाइल को रिप्लाई करके `/importsettings` चलाएँ; "
+            "फ़ेडरेशन के सभी ग्रुप्स पर एक साथ: `/importsettings fed`"
+        ),
+        parse_mode=ParseMode.MARKDOWN
+    )
+    logger.info(f"Group {message.chat.id}: settings profile exported by {message.from_user.id}.")
+
+
+@pyrogram_app.on_message(filters.command("importsettings") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def import_settings_command(client: Client, message: Message):
+    chat_id, user_id = message.chat.id, message.from_user.id
+    if not await is_user_admin_in_chat(client, chat_id, user_id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+    args = [arg.lower() for arg in message.command[1:]]
+    source = message.reply_to_message
+    if args not in ([], ["fed"]) or source is None or not (source.document or source.text):
+        await message.reply_text(
+            "उपयोग: `/exportsettings` से बनी JSON फ़ाइल (या JSON टेक्स्ट) को रिप्लाई करके `/importsettings` "
+            "(यह ग्रुप) या `/importsettings fed` (फ़ेडरेशन के सभी ग्रुप्स)।",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+
+    if source.document:
+        if (source.document.file_size or 0) > PROFILE_MAX_BYTES:
+            await message.reply_text(f"प्रोफ़ाइल {PROFILE_MAX_BYTES // 1024} KB से बड़ी नहीं हो सकती।")
+            return
+        raw = (await client.download_media(source, in_memory=True)).getvalue()
+    else:
+        raw = source.text
+    try:
+        settings = parse_profile(raw, GROUP_LIST_LIMIT)
+    except ValueError as e:
+        await message.reply_text(str(e), parse_mode=ParseMode.MARKDOWN)
+        return
+
+    if args == ["fed"]:
+        federation = group_federation(chat_id)
+        if federation is None:
+            await message.reply_text("यह ग्रुप किसी फ़ेडरेशन में नहीं है।")
+            return
+        if user_id not in (federation["owner_id"], OWNER_ID):
+            await message.reply_text("सिर्फ़ फ़ेडरेशन का मालिक सभी ग्रुप्स की सेटिंग्स बदल सकता है।")
+            return
+        # एक ही write में सभी ग्रुप्स; हर ग्रुप का settings_version बढ़ता है, इसलिए हर प्रोसेस के कैश अगली बार अपने आप नए बनते हैं
+        group_ids = get_federation_groups(federation["_id"])
+        updated = apply_group_settings(group_ids, settings, changed_by=user_id)
+        await message.reply_text(
+            f"✅ {len(settings)} सेटिंग्स फ़ेडरेशन **{federation['name']}** के {updated} ग्रुप्स पर लगाई गईं।",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        logger.info(f"Federation {federation['_id']}: settings profile applied to {updated}/{len(group_ids)} groups by {user_id}.")
+        return
+
+    if not get_group(chat_id):
+        add_or_update_group(chat_id, message.chat.title, user_id)
+    update_group_settings(chat_id, settings, changed_by=user_id, source="profile")
+    await message.reply_text(f"✅ {len(settings)} सेटिंग्स इस ग्रुप पर लगाई गईं। `/settings` से देखें।", parse_mode=ParseMode.MARKDOWN)
+    logger.info(f"Group {chat_id}: settings profile imported by {user_id}.")
+
+
+@pyrogram_app.on_message(filters.command("settingshistory") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def settings_history_command(client: Client, message: Message):
+    if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+    history = format_history(get_group(message.chat.id) or {})
+    await message.reply_text(
+        f"🕘 **सेटिंग्स में हाल के बदलाव:**\n{history}" if history else "अभी तक सेटिंग्स का कोई बदलाव दर्ज नहीं है।",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+
+# --- Bulk Moderation ---
+# रेड के बाद एक कमांड से बहुत से यूज़र्स पर कार्रवाई (देखें bulk_actions.py)
+BULK_COMMANDS = {"bulkban": "ban", "bulkkick": "kick", "bulkmute": "mute", "bulkwarn": "warn"}
+BULK_LABELS = {**ACTION_LABELS, "warn": "चेतावनी"}
+BULK_USAGE = (
+    "उपयोग:\n"
+    "`/bulkban 111 222 333` - इन यूज़र ID पर\n"
+    "`/bulkban joined 30m` - पिछले 30 मिनट में जुड़े सभी पर\n"
+    "`/bulkban flagged [2h]` - स्पैम फ़िल्टर में पकड़े गए सभी पर\n"
+    "`/bulkmute 1d joined 30m` - म्यूट की अवधि पहले दें (डिफ़ॉल्ट: हमेशा के लिए)\n"
+    "`/bulkkick`, `/bulkwarn` भी इसी तरह। रोकने के लिए `/bulkstop`।"
+)
+
+
+async def bulk_protected_ids(client: Client, chat_id: int, issuer_id: int) -> set[int]:
+    """IDs a bulk command must never act on: the chat's admins, the bot, the owner and the issuer."""
+    protected = {client.me.id, OWNER_ID, issuer_id}
+    async for member in client.get_chat_members(chat_id, filter=enums.ChatMembersFilter.ADMINISTRATORS):
+        protected.add(member.user.id)
+    return protected
+
+
+async def bulk_action_for(client: Client, message: Message, action: str, user_ids: list[int], duration: int | None):
+    """Returns the coroutine function ``perform(user_id)`` that applies ``action`` in the chat."""
+    chat_id = message.chat.id
+    # स्थायी बैन/म्यूट पहले के अस्थायी वाले का बाकी अनबैन/अनम्यूट जॉब रद्द करता है, वरना वह बाद में इसे पलट देता
+    if action == "ban":
+        async def ban(user_id: int):
+            await client.ban_chat_member(chat_id, user_id)
+            job_scheduler.cancel("unban", chat_id, user_id)
+        return ban
+    if action == "mute":
+        until_date = datetime.now() + timedelta(seconds=duration) if duration else None
+
+        async def mute(user_id: int):
+            await client.restrict_chat_member(chat_id, user_id, ChatPermissions(can_send_messages=False), until_date)
+            if duration:
+                job_scheduler.schedule("unmute", duration, chat_id, user_id, replace=True)
+            else:
+                job_scheduler.cancel("unmute", chat_id, user_id)
+        return mute
+    if action == "kick":
+        async def kick(user_id: int):
+            await client.ban_chat_member(chat_id, user_id)
+            # अनबैन अपनी retry के साथ अलग: इसकी FloodWait बाहर जाती तो BulkJob पूरी किक (बैन भी) दोहराता
+            try:
+                await outbound_limiter.call(client.unban_chat_member, chat_id, user_id, retries=2)
+            except Exception as e:
+                raise PartialFailure(f"बैन हुआ, अनबैन विफल ({type(e).__name__})") from e
+        return kick
+
+    # चेतावनी के मैसेज में नाम चाहिए: यूज़र्स 200 के बैच में एक साथ लाएँ
+    users = {}
+    for start in range(0, len(user_ids), 200):
+        for user in await outbound_limiter.call(client.get_users, user_ids[start:start + 200]):
+            users[user.id] = user
+
+    async def warn(user_id: int):
+        if user_id not in users:
+            raise LookupError("user not found")
+        await warn_user(client, chat_id, message.chat.title, users[user_id], message.from_user)
+    return warn
+
+
+async def run_bulk_job(client: Client, message: Message, status: Message, action: str, user_ids: list[int], duration: int | None):
+    chat_id = message.chat.id
+    label = BULK_LABELS[action]
+    job = None
+    stopped = False
+
+    async def report(job: BulkJob):
+        await outbound_limiter.call(
+            status.edit_text, f"⏳ बल्क {label}: {job.finished}/{job.total} ({len(job.failed)} विफल)…", chat_id=chat_id
+        )
+
+    try:
+        perform = await bulk_action_for(client, message, action, user_ids, duration)
+        # चेतावनी दोबारा चलाने पर गिनती दो बार बढ़ जाती, इसलिए उस पर FloodWait के बाद retry नहीं
+        job = BulkJob(
+            user_ids, perform, outbound_limiter, concurrency=BULK_CONCURRENCY,
+            retries=0 if action == "warn" else 2, on_progress=report
+        )
+        await job.run()
+    except asyncio.CancelledError:
+        stopped = True
+    except Exception as e:
+        logger.error(f"[{chat_id}] Bulk {action} failed: {e}", exc_info=True)
+    finally:
+        if bulk_jobs.get(chat_id) is asyncio.current_task():
+            del bulk_jobs[chat_id]
+
+    done, failed = (job.done, job.failed) if job else (0, {})
+    elapsed = job.elapsed() if job else 0
+    if action in ("ban", "kick") and job and not stopped:
+        handled = [user_id for user_id in user_ids if user_id not in failed]
+        recent_joins.discard(chat_id, handled)
+        flagged_users.discard(chat_id, handled)
+    logger.info(f"[{chat_id}] Bulk {action} by {message.from_user.id}: {done} done, {len(failed)} failed of {len(user_ids)} in {elapsed:.1f}s{' (stopped)' if stopped else ''}.")
+
+    summary = (
+        f"{'⏹ बल्क ' + label + ' रोका गया' if stopped else '✅ बल्क ' + label + ' पूरा'}: "
+        f"{done}/{len(user_ids)} सफल, {len(failed)} विफल ({elapsed:.0f} सेकंड)।"
+    )
+    if failed:
+        summary += "\n\n**विफल:**\n" + "\n".join(f"`{user_id}` - {error}" for user_id, error in list(failed.items())[:10])
+        if len(failed) > 10:
+            summary += f"\n...और {len(failed) - 10} अन्य।"
+    try:
+        await outbound_limiter.call(status.edit_text, summary, chat_id=chat_id)
+        if CASE_LOG_CHANNEL_ID:
+            await outbound_limiter.call(
+                client.send_message,
+                CASE_LOG_CHANNEL_ID,
+                f"🧹 **बल्क {label}:**\n"
+                f"ग्रुप: `{message.chat.title}` (ID: `{chat_id}`)\n"
+                f"एडमिन: {message.from_user.mention} (ID: `{message.from_user.id}`)\n"
+                f"सफल: `{done}`, विफल: `{len(failed)}`, कुल: `{len(user_ids)}`{' (रोका गया)' if stopped else ''}",
+                chat_id=CASE_LOG_CHANNEL_ID
+            )
+    except Exception as e:
+        logger.error(f"[{chat_id}] Error sending bulk {action} summary: {e}")
+
+
+@pyrogram_app.on_message(filters.command(list(BULK_COMMANDS)) & filters.group)
+@chat_scheduler.handler
+async def bulk_moderation_command(client: Client, message: Message):
+    chat_id = message.chat.id
+    if not await is_user_admin_in_chat(client, chat_id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+    if not await is_bot_admin_in_chat(client, chat_id):
+        await message.reply_text("मुझे बल्क कार्रवाई के लिए एडमिन अनुमति चाहिए।")
+        return
+    running = bulk_jobs.get(chat_id)
+    if running and not running.done():
+        await message.reply_text("इस ग्रुप में एक बल्क कार्रवाई पहले से चल रही है। रोकने के लिए `/bulkstop`।")
+        return
+
+    action = BULK_COMMANDS[message.command[0].lower()]
+    try:
+        source, value, duration = parse_bulk_args(message.command[1:], with_duration=action == "mute")
+    except ValueError as e:
+        await message.reply_text(f"{e}\n\n{BULK_USAGE}", parse_mode=ParseMode.MARKDOWN)
+        return
+
+    if source == "joined":
+        user_ids = recent_joins.since(chat_id, value)
+    elif source == "flagged":
+        user_ids = flagged_users.since(chat_id, value)
+    else:
+        user_ids = value
+    protected = await bulk_protected_ids(client, chat_id, message.from_user.id)
+    user_ids = [user_id for user_id in user_ids if user_id not in protected]
+    if not user_ids:
+        await message.reply_text("कोई यूज़र नहीं मिला (एडमिन और बॉट छोड़ दिए जाते हैं)।")
+        return
+    if len(user_ids) > BULK_MAX_TARGETS:
+        await message.reply_text(f"एक बार में अधिकतम {BULK_MAX_TARGETS} यूज़र; यहाँ {len(user_ids)} हैं। अवधि छोटी करें या ID की सूची दें।")
+        return
+
+    status = await message.reply_text(f"⏳ बल्क {BULK_LABELS[action]}: 0/{len(user_ids)}…")
+    logger.info(f"[{chat_id}] Bulk {action} ({source}) of {len(user_ids)} users started by {message.from_user.id}.")
+    # काम अलग टास्क में, ताकि इस चैट की कतार (और /bulkstop) उसके खत्म होने का इंतज़ार न करे
+    bulk_jobs[chat_id] = asyncio.create_task(run_bulk_job(client, message, status, action, user_ids, duration))
+
+
+@pyrogram_app.on_message(filters.command("bulkstop") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def bulk_stop_command(client: Client, message: Message):
+    if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+    running = bulk_jobs.get(message.chat.id)
+    if not running or running.done():
+        await message.reply_text("इस ग्रुप में कोई बल्क कार्रवाई नहीं चल रही है।")
+        return
+    running.cancel()
+    logger.info(f"[{message.chat.id}] Bulk job stopped by {message.from_user.id}.")
+
+
+# --- Federations ---
+# ग्रुप्स अपनी मर्ज़ी से किसी फ़ेडरेशन में जुड़ते हैं; उसके मालिक/एडमिन का /fban सभी सदस्य ग्रुप्स में लागू होता है
+async def enforce_fed_ban(client: Client, chat_id: int, user_id: int, federation_id: str, message: Message | None = None):
+    """Bans a federation-banned user in a member group (and deletes the message that revealed them)."""
+    try:
+        if message is not None:
+            await outbound_limiter.call(message.delete)
+        await outbound_limiter.call(client.ban_chat_member, chat_id, user_id)
+        logger.info(f"[{chat_id}] User {user_id} is banned in federation {federation_id}; banned here too.")
+    except Exception as e:
+        logger.error(f"[{chat_id}] Error enforcing federation {federation_id} ban on user {user_id}: {e}")
+
+
+def group_federation(chat_id: int) -> dict | None:
+    group_data = get_group(chat_id) or {}
+    return get_federation(group_data["federation_id"]) if group_data.get("federation_id") else None
+
+
+async def propagate_fed_ban(client: Client, status: Message, text: str, federation: dict, user_id: int, banned: bool):
+    """Bans (or unbans) the user in every member group through the outbound limiter; appends the result to ``status``."""
+    group_ids = get_federation_groups(federation["_id"])
+    method = client.ban_chat_member if banned else client.unban_chat_member
+
+    async def apply(group_id: int):
+        await method(group_id, user_id)
+        if banned:
+            # पहले के अस्थायी बैन का अनबैन जॉब फ़ेडरेशन बैन को न पलटे
+            job_scheduler.cancel("unban", group_id, user_id)
+
+    job = BulkJob(group_ids, apply, outbound_limiter, concurrency=BULK_CONCURRENCY)
+    try:
+        await job.run()
+    except Exception as e:
+        logger.error(f"Federation {federation['_id']}: propagating ban of {user_id} failed: {e}", exc_info=True)
+    logger.info(f"Federation {federation['_id']}: {'ban' if banned else 'unban'} of {user_id} applied in {job.done}/{job.total} groups.")
+    verb = "बैन" if banned else "अनबैन"
+    try:
+        await outbound_limiter.call(
+            status.edit_text,
+            f"{text}\n\n{verb}: {job.done}/{job.total} ग्रुप्स में" + (f", {len(job.failed)} में विफल।" if job.failed else "।"),
+            parse_mode=ParseMode.MARKDOWN,
+            chat_id=status.chat.id
+        )
+    except Exception as e:
+        logger.error(f"Error editing federation ban status: {e}")
+
+
+def start_fed_propagation(client: Client, status: Message, text: str, federation: dict, user_id: int, banned: bool):
+    # प्रसार अलग टास्क में: 300 ग्रुप्स में भी कमांड वाली चैट की कतार नहीं रुकती
+    task = asyncio.create_task(propagate_fed_ban(client, status, text, federation, user_id, banned))
+    federation_tasks.add(task)
+    task.add_done_callback(federation_tasks.discard)
+
+
+def fed_target_user_id(message: Message) -> int | None:
+    if message.reply_to_message and message.reply_to_message.from_user:
+        return message.reply_to_message.from_user.id
+    if len(message.command) > 1 and message.command[1].isdigit():
+        return int(message.command[1])
+    return None
+
+
+@pyrogram_app.on_message(filters.command("newfed") & filters.private)
+@chat_scheduler.handler
+async def new_federation_command(client: Client, message: Message):
+    if not check_cooldown(message.from_user.id, "command"):
+        return
+    name = message.text.split(None, 1)[1].strip() if len(message.command) > 1 else ""
+    if not name:
+        await message.reply_text("कृपया फ़ेडरेशन का नाम दें। उदाहरण: `/newfed मेरा नेटवर्क`", parse_mode=ParseMode.MARKDOWN)
+        return
+    name = name[:FEDERATION_NAME_MAX]
+    federation_id = new_federation_id()
+    create_federation(federation_id, name, message.from_user.id)
+    await message.reply_text(
+        f"✅ फ़ेडरेशन **{name}** बनाया गया।\nID: `{federation_id}`\n\n"
+        f"किसी ग्रुप को जोड़ने के लिए वहाँ एडमिन `/joinfed {federation_id}` चलाएँ।",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+
+@pyrogram_app.on_message(filters.command(["joinfed", "leavefed"]) & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def join_federation_command(client: Client, message: Message):
+    chat_id = message.chat.id
+    if not await is_user_admin_in_chat(client, chat_id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+
+    if message.command[0].lower() == "leavefed":
+        federation = group_federation(chat_id)
+        if federation is None:
+            await message.reply_text("यह ग्रुप किसी फ़ेडरेशन में नहीं है।")
+            return
+        update_group_settings(chat_id, {"federation_id": None}, changed_by=message.from_user.id, source="federation")
+        await message.reply_text(f"✅ यह ग्रुप फ़ेडरेशन **{federation['name']}** से अलग हो गया।", parse_mode=ParseMode.MARKDOWN)
+        logger.info(f"Group {chat_id} left federation {federation['_id']} ({message.from_user.id}).")
+        return
+
+    if len(message.command) != 2:
+        await message.reply_text("उपयोग: `/joinfed <फ़ेडरेशन ID>`", parse_mode=ParseMode.MARKDOWN)
+        return
+    federation = get_federation(message.command[1])
+    if federation is None:
+        await message.reply_text("यह फ़ेडरेशन नहीं मिला।")
+        return
+    if not get_group(chat_id):
+        add_or_update_group(chat_id, message.chat.title, message.from_user.id)
+    update_group_settings(chat_id, {"federation_id": federation["_id"]}, changed_by=message.from_user.id, source="federation")
+    await message.reply_text(
+        f"✅ यह ग्रुप फ़ेडरेशन **{federation['name']}** में जुड़ गया। उसकी बैन-सूची "
+        f"({federation_bans.count(federation['_id'])} यूज़र) अब यहाँ भी लागू है।",
+        parse_mode=ParseMode.MARKDOWN
+    )
+    logger.info(f"Group {chat_id} joined federation {federation['_id']} ({message.from_user.id}).")
+
+
+@pyrogram_app.on_message(filters.command(["fban", "unfban"]) & filters.group)
+@chat_scheduler.handler
+async def federation_ban_command(client: Client, message: Message):
+    banned = message.command[0].lower() == "fban"
+    federation = group_federation(message.chat.id)
+    if federation is None:
+        await message.reply_text("यह ग्रुप किसी फ़ेडरेशन में नहीं है। पहले `/joinfed <ID>` चलाएँ।", parse_mode=ParseMode.MARKDOWN)
+        return
+    if not (can_manage(federation, message.from_user.id) or message.from_user.id == OWNER_ID):
+        await message.reply_text("सिर्फ़ फ़ेडरेशन का मालिक या उसके एडमिन ही यह कमांड चला सकते हैं।")
+        return
+
+    target_user_id = fed_target_user_id(message)
+    if target_user_id is None:
+        await message.reply_text("कृपया उस यूज़र को रिप्लाई करें या यूज़र ID प्रदान करें।")
+        return
+    if banned and (target_user_id in (client.me.id, OWNER_ID) or can_manage(federation, target_user_id)):
+        await message.reply_text("इस यूज़र को फ़ेडरेशन से बैन नहीं किया जा सकता।")
+        return
+
+    federation_id = federation["_id"]
+    if banned:
+        # रिप्लाई में कारण कमांड के बाद, ID के साथ ID के बाद
+        reason_start = 1 if message.reply_to_message else 2
+        reason = " ".join(message.command[reason_start:]) or None
+        is_new = add_fed_ban(federation_id, target_user_id, reason, message.from_user.id)
+        text = (
+            f"🚫 `{target_user_id}` को फ़ेडरेशन **{federation['name']}** से बैन कर दिया गया है।"
+            if is_new else f"`{target_user_id}` पहले से फ़ेडरेशन से बैन है; कारण अपडेट किया गया।"
+        )
+        if reason:
+            text += f"\nकारण: {reason}"
+    else:
+        if not remove_fed_ban(federation_id, target_user_id):
+            await message.reply_text("यह यूज़र इस फ़ेडरेशन से बैन नहीं है।")
+            return
+        text = f"✅ `{target_user_id}` का फ़ेडरेशन **{federation['name']}** से बैन हटा दिया गया है।"
+
+    federation_bans.apply(federation_id, target_user_id, banned)
+    if shard_link is not None:
+        shard_link.publish("fedban", federation_id, target_user_id, banned)
+    logger.info(f"Federation {federation_id}: user {target_user_id} {'banned' if banned else 'unbanned'} by {message.from_user.id}.")
+
+    status = await message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+    start_fed_propagation(client, status, text, federation, target_user_id, banned)
+    if CASE_LOG_CHANNEL_ID:
+        await outbound_limiter.call(
+            client.send_message,
+            CASE_LOG_CHANNEL_ID,
+            f"{'🚫 **फ़ेडरेशन बैन:**' if banned else '✅ **फ़ेडरेशन अनबैन:**'}\n"
+            f"फ़ेडरेशन: `{federation['name']}` (ID: `{federation_id}`)\n"
+            f"यूज़र ID: `{target_user_id}`\n"
+            f"एडमिन: {message.from_user.mention} (ID: `{message.from_user.id}`)\n"
+            f"ग्रुप: `{message.chat.title}` (ID: `{message.chat.id}`)",
+            chat_id=CASE_LOG_CHANNEL_ID
+        )
+
+
+@pyrogram_app.on_message(filters.command("fedadmin") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def federation_admin_command(client: Client, message: Message):
+    federation = group_federation(message.chat.id)
+    if federation is None:
+        await message.reply_text("यह ग्रुप किसी फ़ेडरेशन में नहीं है।")
+        return
+    if message.from_user.id != federation["owner_id"]:
+        await message.reply_text("सिर्फ़ फ़ेडरेशन का मालिक एडमिन बदल सकता है।")
+        return
+    args = message.command[1:]
+    if len(args) != 2 or args[0].lower() not in ("add", "remove") or not args[1].isdigit():
+        await message.reply_text("उपयोग: `/fedadmin add|remove <यूज़र ID>`", parse_mode=ParseMode.MARKDOWN)
+        return
+
+    user_id = int(args[1])
+    admins = [admin for admin in federation.get("admins", []) if admin != user_id]
+    if args[0].lower() == "add":
+        admins.append(user_id)
+    update_federation(federation["_id"], {"admins": admins})
+    await message.reply_text(f"✅ फ़ेडरेशन **{federation['name']}** के एडमिन: {', '.join(f'`{admin}`' for admin in admins) or 'कोई नहीं'}", parse_mode=ParseMode.MARKDOWN)
+    logger.info(f"Federation {federation['_id']}: admins set to {admins} by {message.from_user.id}.")
+
+
+@pyrogram_app.on_message(filters.command("fedinfo") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def federation_info_command(client: Client, message: Message):
+    federation = group_federation(message.chat.id)
+    if federation is None:
+        await message.reply_text("यह ग्रुप किसी फ़ेडरेशन में नहीं है।")
+        return
+    target_user_id = fed_target_user_id(message)
+    text = (
+        f"🌐 **फ़ेडरेशन:** {federation['name']}\n"
+        f"ID: `{federation['_id']}`\n"
+        f"मालिक: `{federation['owner_id']}`\n"
+        f"एडमिन: {len(federation.get('admins', []))}\n"
+        f"ग्रुप्स: {len(get_federation_groups(federation['_id']))}\n"
+        f"बैन यूज़र: {federation_bans.count(federation['_id'])}"
+    )
+    if target_user_id is not None:
+        ban = get_fed_ban(federation["_id"], target_user_id)
+        text += f"\n\nयूज़र `{target_user_id}`: " + (f"बैन ({ban.get('reason') or 'कारण नहीं दिया'})" if ban else "बैन नहीं")
+    await message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+
+
 @pyrogram_app.on_message(filters.command("info") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def info_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1465,7 +2633,7 @@ async def info_command(client: Client, message: Message):
         await message.reply_text("कोई मान्य यूज़र नहीं मिला।")
         return
 
-    user_data = get_user(target_user.id)
+    user_data = get_user(target_user.id, stale_ok=True)
     warn_count = get_warns(message.chat.id, target_user.id)
 
     info_text = (
@@ -1488,6 +2656,8 @@ async def info_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("setwelcome") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def set_welcome_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1502,7 +2672,7 @@ async def set_welcome_command(client: Client, message: Message):
         await message.reply_text("कृपया एक वेलकम मैसेज प्रदान करें। उदाहरण: `/setwelcome वेलकम {username}!`")
         return
     
-    update_group_settings(message.chat.id, {"welcome_message": new_welcome_message})
+    update_group_settings(message.chat.id, {"welcome_message": new_welcome_message}, changed_by=message.from_user.id, source="welcome")
     await message.reply_text(
         f"✅ वेलकम मैसेज अपडेट किया गया है।\nनया मैसेज: `{html.escape(new_welcome_message)}`\n\n"
         "यह सुनिश्चित करने के लिए कि यह काम करता है, वेलकम मैसेज सेटिंग चालू है या नहीं, `/settings` देखें।"
@@ -1510,7 +2680,63 @@ async def set_welcome_command(client: Client, message: Message):
     logger.info(f"Group {message.chat.id}: Custom welcome message set by {message.from_user.id}.")
 
 
+@pyrogram_app.on_message(filters.command(list(GROUP_LISTS)) & filters.group)
+@chat_scheduler.handler
+@expiring_replies
+async def group_list_command(client: Client, message: Message):
+    if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
+        await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
+        return
+
+    command = message.command[0].lower()
+    field, title = GROUP_LISTS[command]
+    group_data = get_group(message.chat.id) or {}
+    action = message.command[1].lower() if len(message.command) > 1 else "show"
+
+    if action == "show":
+        await message.reply_text(format_group_lists(group_data), parse_mode=ParseMode.MARKDOWN)
+        return
+    if action not in ("add", "remove", "clear"):
+        await message.reply_text(f"उपयोग: `/{command} add ...`, `/{command} remove ...`, `/{command} clear`")
+        return
+
+    values = []
+    for raw in message.command[2:]:
+        if field in DOMAIN_LIST_FIELDS:
+            value = link_domain(raw)
+            if value is None:
+                await message.reply_text(f"अमान्य डोमेन: `{raw}`")
+                return
+        else:
+            value = raw.strip().lower()
+            if len(value) > 64:
+                await message.reply_text("कोई भी शब्द 64 अक्षरों से लंबा नहीं हो सकता।")
+                return
+        if value and value not in values:
+            values.append(value)
+
+    if action == "clear":
+        remove_from_group_list(message.chat.id, field)
+        await message.reply_text(f"✅ {title} खाली कर दी गई है।")
+    elif not values:
+        await message.reply_text(f"कृपया कम से कम एक मान प्रदान करें। उदाहरण: `/{command} {action} ...`")
+        return
+    elif action == "add":
+        current = set(group_data.get(field) or [])
+        if len(current | set(values)) > GROUP_LIST_LIMIT:
+            await message.reply_text(f"{title} में अधिकतम {GROUP_LIST_LIMIT} मान हो सकते हैं।")
+            return
+        add_to_group_list(message.chat.id, field, values)
+        await message.reply_text(f"✅ {len(values)} मान {title} में जोड़े गए।")
+    else:
+        remove_from_group_list(message.chat.id, field, values)
+        await message.reply_text(f"✅ {len(values)} मान {title} से हटाए गए।")
+    logger.info(f"Group {message.chat.id}: {field} {action} {len(values)} values by {message.from_user.id}.")
+
+
 @pyrogram_app.on_message(filters.command("clean") & filters.group)
+@chat_scheduler.handler
+@expiring_replies
 async def clean_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1543,6 +2769,7 @@ async def clean_command(client: Client, message: Message):
 
 
 @pyrogram_app.on_message(filters.command("settings") & filters.group)
+@chat_scheduler.handler
 async def group_settings_command(client: Client, message: Message):
     if not await is_user_admin_in_chat(client, message.chat.id, message.from_user.id):
         await message.reply_text("आपको यह कमांड चलाने के लिए एडमिन होना चाहिए।")
@@ -1551,11 +2778,52 @@ async def group_settings_command(client: Client, message: Message):
         await message.reply_text("मैं इस ग्रुप में एडमिन नहीं हूँ। कृपया मुझे एडमिन अनुमति दें।")
         return
     
-    await show_group_settings(client, message, message.chat.id)
+    await show_group_settings(client, message, message.chat.id, reply=True)
+
+
+startup_profile.mark("handlers")
 
 
 # --- Run the Bot ---
+async def main(link=None):
+    """Runs the bot; ``link`` is the ShardLink when started as a shard worker by sharding.py."""
+    global shard_link
+    # पूल के वर्कर fork होते हैं, इसलिए Telegram कनेक्शन खुलने से पहले
+    content_analyzer.start()
+    startup_profile.mark("analysis pool")
+    # हेल्थ सर्वर, Mongo का पहला पिंग (थ्रेड में) और Telegram लॉग-इन + get_me एक साथ; कोल्ड स्टार्ट
+    # इनके योग की जगह सबसे धीमे जितना लगता है। /readyz तब तक 503 देगा जब तक दोनों तैयार न हों
+    # (क्रम मायने रखता है: नेटवर्क वाले काम पहले शुरू हों, फिर हेल्थ सर्वर का aiohttp इम्पोर्ट)
+    _, _, health_runner = await asyncio.gather(
+        startup_profile.timed("telegram login", pyrogram_app.start()),
+        startup_profile.timed("storage connect", asyncio.to_thread(connect_database)),
+        startup_profile.timed("health server", start_health_server(pyrogram_app, ping_database, port=PORT))
+    )
+    chat_scheduler.start()
+    job_scheduler.start()
+    if link is not None:
+        shard_link = link
+        shard_link.listeners["fingerprint"] = fingerprint_store.observe_fingerprint
+        shard_link.listeners["fedban"] = federation_bans.apply
+        # FloodWait पूरे बॉट पर लगता है: एक वर्कर को मिले तो बाकी भी उतनी देर रुकें
+        shard_link.listeners["floodwait"] = outbound_limiter.hold
+        outbound_limiter.on_flood_wait = lambda seconds: shard_link.publish("floodwait", seconds)
+        shard_link.start(pyrogram_app)
+        logger.info(f"Shard {link.shard_id}/{link.shard_count} started as @{pyrogram_app.me.username}.")
+    else:
+        logger.info(f"Bot started as @{pyrogram_app.me.username}.")
+    startup_profile.report(logger, detailed=STARTUP_PROFILE)
+    try:
+        await idle()
+    finally:
+        await job_scheduler.stop()
+        await pyrogram_app.stop()
+        await chat_scheduler.stop()
+        content_analyzer.shutdown()
+        await health_runner.cleanup()
+
+
 if __name__ == "__main__":
     logger.info("Bot starting...")
-    pyrogram_app.run()
+    pyrogram_app.run(main())
     logger.info("Bot stopped.")
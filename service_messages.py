@@ -0,0 +1,70 @@
+# service_messages.py
+#
+# बॉट के अपने मैसेज (चेतावनी कार्ड, वेलकम, बॉट हटाने की सूचना, कमांड के जवाब) ग्रुप की सेटिंग के हिसाब से
+# कुछ देर बाद अपने आप हटते हैं, ताकि बड़े ग्रुप्स की हिस्ट्री बॉट के मैसेज से न भरे।
+
+import math
+import time
+from collections import OrderedDict
+
+from warn_ladder import format_duration, parse_duration
+
+# ग्रुप डॉक्युमेंट के ``service_ttl`` की कुंजियाँ -> नाम
+SERVICE_CLASSES = {
+    "warning": "चेतावनी कार्ड",
+    "welcome": "वेलकम",
+    "botkick": "बॉट हटाने की सूचना",
+    "command": "कमांड के जवाब",
+}
+SERVICE_TTL_MIN = 60
+SERVICE_TTL_MAX = 47 * 3600 # Telegram 48 घंटे से पुराने मैसेज नहीं हटाने देता
+# हटाने का समय इस सेकंड-खिड़की तक आगे बढ़ता है, ताकि पास-पास के मैसेज एक ही delete_messages कॉल में जाएँ
+DELETE_GRANULARITY = 10
+DELETE_BATCH_MAX = 100 # एक delete_messages कॉल में अधिकतम मैसेज
+
+
+def service_ttl(group: dict, kind: str) -> int | None:
+    """Seconds after which the group's bot messages of that class are deleted (None: never)."""
+    return (group.get("service_ttl") or {}).get(kind)
+
+
+def parse_service_ttl(text: str) -> int | None:
+    """``off`` -> None, otherwise a duration like ``5m``; raises ValueError with a message for the user."""
+    if text.lower() in ("off", "0"):
+        return None
+    seconds = parse_duration(text)
+    if not SERVICE_TTL_MIN <= seconds <= SERVICE_TTL_MAX:
+        raise ValueError(f"अवधि {format_duration(SERVICE_TTL_MIN)} से {format_duration(SERVICE_TTL_MAX)} के बीच होनी चाहिए।")
+    return seconds
+
+
+def format_service_ttls(group: dict) -> str:
+    return "\n".join(
+        f"• {label} (`{kind}`): {format_duration(ttl) if (ttl := service_ttl(group, kind)) else 'नहीं हटते'}"
+        for kind, label in SERVICE_CLASSES.items()
+    )
+
+
+def delete_delay(ttl: float, now: float | None = None) -> float:
+    """``ttl`` rounded up so the deletion falls on a DELETE_GRANULARITY boundary."""
+    now = time.time() if now is None else now
+    return math.ceil((now + ttl) / DELETE_GRANULARITY) * DELETE_GRANULARITY - now
+
+
+class LastMessages:
+    """Per chat, the id of the latest bot message of one class (the welcome that the next one replaces)."""
+
+    def __init__(self, max_chats: int = 4096):
+        self.max_chats = max_chats
+        self._chats: OrderedDict[int, int] = OrderedDict()
+
+    def swap(self, chat_id: int, message_id: int) -> int | None:
+        """Records ``message_id`` and returns the one it replaces."""
+        previous = self._chats.pop(chat_id, None)
+        self._chats[chat_id] = message_id
+        if len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+        return previous
+
+    def __len__(self) -> int:
+        return len(self._chats)
@@ -0,0 +1,273 @@
+# sharding.py
+#
+# शार्डेड मोड: एक कोऑर्डिनेटर Telegram से अपडेट लेता है और हर अपडेट को
+# chat_id % SHARD_COUNT वाले वर्कर प्रोसेस को भेजता है। हर वर्कर server.py का पूरा बॉट
+# चलाता है (अपने सेशन से API कॉल करता है), पर Telegram से सीधे अपडेट नहीं लेता।
+#
+#   SHARD_COUNT=4 python sharding.py
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+from pyrogram import raw, utils
+from pyrogram.raw.core import TLObject
+
+from instrumented_client import InstrumentedClient
+
+logger = logging.getLogger(__name__)
+
+# वर्कर मर जाए तो कितने सेकंड बाद जाँचकर दोबारा शुरू करें
+SUPERVISE_INTERVAL = 5.0
+
+
+def raw_update_chat_id(update) -> int | None:
+    """The (Bot API style) chat id a raw MTProto update belongs to, or None if it has none."""
+    message = getattr(update, "message", None)
+    if isinstance(message, (raw.types.Message, raw.types.MessageService)):
+        return utils.get_peer_id(message.peer_id)
+    peer = getattr(update, "peer", None)
+    if isinstance(peer, (raw.types.PeerUser, raw.types.PeerChat, raw.types.PeerChannel)):
+        return utils.get_peer_id(peer)  # कॉलबैक क्वेरी, जॉइन रिक्वेस्ट
+    channel_id = getattr(update, "channel_id", None)
+    if channel_id is not None:
+        return utils.get_channel_id(channel_id)
+    chat_id = getattr(update, "chat_id", None)
+    if chat_id is not None:
+        return -chat_id
+    return getattr(update, "user_id", None)  # इनलाइन क्वेरी, यूज़र स्टेटस (प्राइवेट चैट की तरह)
+
+
+def shard_for(chat_id: int | None, shard_count: int) -> int:
+    # Python का % नेगेटिव ग्रुप id पर भी 0..N-1 देता है
+    return chat_id % shard_count if chat_id is not None else 0
+
+
+def encode_update(update, users: dict, chats: dict) -> tuple:
+    """Raw TL bytes of an update and its users/chats, cheap to send through a multiprocessing queue."""
+    return update.write(), [user.write() for user in users.values()], [chat.write() for chat in chats.values()]
+
+
+def decode_update(encoded: tuple) -> tuple:
+    """Inverse of ``encode_update``: the (update, users, chats) packet Pyrogram's dispatcher expects."""
+    update_bytes, user_bytes, chat_bytes = encoded
+    users = [TLObject.read(io.BytesIO(data)) for data in user_bytes]
+    chats = [TLObject.read(io.BytesIO(data)) for data in chat_bytes]
+    return (
+        TLObject.read(io.BytesIO(update_bytes)),
+        {user.id: user for user in users},
+        {chat.id: chat for chat in chats}
+    )
+
+
+class _RoutingQueue(asyncio.Queue):
+    """
+    Stands in for the coordinator dispatcher's update queue: updates are routed
+    to the shards right away instead of being parsed into Message objects here.
+    """
+
+    def __init__(self, route):
+        super().__init__()
+        self._route = route
+
+    def put_nowait(self, item):
+        if item is None:
+            # dispatcher.stop() का संकेत, उसके वर्कर तक पहुँचना चाहिए
+            return super().put_nowait(item)
+        self._route(*item)
+
+
+class ShardCoordinator:
+    """
+    Owns the Telegram update stream and fans it out to ``shard_count`` worker processes.
+
+    Every update goes to the worker with ``chat_id % shard_count``, so all of a
+    chat's updates are handled by one process and per-chat state (queues,
+    compiled word lists, verdict cache) stays local to it. Workers report
+    cross-chat events (spam fingerprints) back here and they are relayed to
+    every other worker. Dead workers are restarted with the same queues.
+    """
+
+    def __init__(self, client, shard_count: int):
+        self.client = client
+        self.shard_count = shard_count
+        self._context = multiprocessing.get_context("spawn")
+        self._inboxes = [self._context.Queue() for _ in range(shard_count)]
+        self._outbox = self._context.Queue()
+        self._processes: list = [None] * shard_count
+        self._relay_thread: threading.Thread | None = None
+        self.routed = [0] * shard_count
+        client.dispatcher.updates_queue = _RoutingQueue(self.route)
+
+    def route(self, update, users, chats):
+        shard = shard_for(raw_update_chat_id(update), self.shard_count)
+        self._inboxes[shard].put(("update", encode_update(update, users, chats)))
+        self.routed[shard] += 1
+
+    def start(self):
+        for shard in range(self.shard_count):
+            self._spawn(shard)
+        self._relay_thread = threading.Thread(target=self._relay, name="shard-relay", daemon=True)
+        self._relay_thread.start()
+        logger.info(f"Shard coordinator started {self.shard_count} workers.")
+
+    async def supervise(self):
+        while True:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for shard, process in enumerate(self._processes):
+                if not process.is_alive():
+                    logger.error(f"Shard {shard} exited with code {process.exitcode}; restarting.")
+                    self._spawn(shard)
+
+    def stop(self, timeout: float = 10.0):
+        for inbox in self._inboxes:
+            inbox.put(None)
+        self._outbox.put(None)
+        for shard, process in enumerate(self._processes):
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"Shard {shard} did not stop in {timeout}s; terminating.")
+                process.terminate()
+
+    def _spawn(self, shard: int):
+        process = self._context.Process(
+            target=run_worker,
+            args=(shard, self.shard_count, self._inboxes[shard], self._outbox),
+            name=f"shard-{shard}"
+        )
+        process.start()
+        self._processes[shard] = process
+
+    def _relay(self):
+        # वर्कर से आए इवेंट बाकी सभी वर्कर को
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            kind, source, payload = item
+            for shard, inbox in enumerate(self._inboxes):
+                if shard != source:
+                    inbox.put((kind, payload))
+
+
+class ShardWorkerClient(InstrumentedClient):
+    """
+    Client of a shard worker process.
+
+    Its session is opened with ``no_updates`` so Telegram does not push
+    updates to it (the coordinator owns the update stream), but the
+    dispatcher still runs: ``ShardLink`` feeds it the routed updates.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, no_updates=True, **kwargs)
+
+    async def start(self):
+        await super().start()
+        # no_updates होने पर pyrogram dispatcher के वर्कर शुरू नहीं करता; start() में कोई await नहीं,
+        # इसलिए बीच में कोई API कॉल बिना no_updates के नहीं जाती
+        self.no_updates = False
+        try:
+            await self.dispatcher.start()
+        finally:
+            self.no_updates = True
+        return self
+
+    async def stop(self, block: bool = True):
+        for _ in self.dispatcher.handler_worker_tasks:
+            self.dispatcher.updates_queue.put_nowait(None)
+        await asyncio.gather(*self.dispatcher.handler_worker_tasks)
+        self.dispatcher.handler_worker_tasks.clear()
+        return await super().stop(block)
+
+    async def handle_updates(self, updates):
+        # जो इक्का-दुक्का अपडेट फिर भी आएँ, वे कोऑर्डिनेटर के ज़रिए दोबारा आ चुके होंगे
+        return
+
+
+class ShardLink:
+    """
+    A worker's end of the coordinator queues.
+
+    ``start`` feeds routed updates into the client's dispatcher (so the
+    normal handlers run) and calls ``listeners[kind](*payload)`` on the event
+    loop for events published by other shards. ``publish`` sends an event to
+    all other shards.
+    """
+
+    def __init__(self, shard_id: int, shard_count: int, inbox, outbox):
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self._inbox = inbox
+        self._outbox = outbox
+        self.listeners: dict = {}
+
+    def start(self, client):
+        loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read, args=(client, loop), name="shard-inbox", daemon=True).start()
+
+    def publish(self, kind: str, *payload):
+        self._outbox.put((kind, self.shard_id, payload))
+
+    def _read(self, client, loop):
+        # डिकोड इसी थ्रेड में होता है; event loop पर सिर्फ़ कतार में डालना
+        while True:
+            item = self._inbox.get()
+            if item is None:
+                # कोऑर्डिनेटर बंद हो रहा है: idle() को वैसे ही रोको जैसे Ctrl+C से
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+            kind, payload = item
+            try:
+                if kind == "update":
+                    loop.call_soon_threadsafe(client.dispatcher.updates_queue.put_nowait, decode_update(payload))
+                elif kind in self.listeners:
+                    loop.call_soon_threadsafe(self.listeners[kind], *payload)
+            except RuntimeError:
+                return  # loop बंद हो चुका है
+            except Exception as e:
+                logger.error(f"Shard {self.shard_id}: could not handle {kind} from coordinator: {e}")
+
+
+def run_worker(shard_id: int, shard_count: int, inbox, outbox):
+    """Entry point of a worker process: the full bot from server.py, fed by the coordinator."""
+    os.environ["SHARD_ID"] = str(shard_id)
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    import server
+
+    server.pyrogram_app.run(server.main(ShardLink(shard_id, shard_count, inbox, outbox)))
+
+
+async def run_coordinator():
+    from pyrogram import idle
+
+    import metrics
+    from config import API_HASH, API_ID, BOT_TOKEN, PORT, SHARD_COUNT
+    from database import ping as ping_database
+    from health_server import start_health_server
+
+    # सिर्फ़ यही सेशन Telegram से अपडेट लेता है (single-process मोड वाला ही सेशन नाम)
+    client = InstrumentedClient("GroupPoliceBot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
+    coordinator = ShardCoordinator(client, SHARD_COUNT)
+    metrics.SHARD_UPDATES.set_function(lambda: {(str(shard),): count for shard, count in enumerate(coordinator.routed)})
+
+    health_runner = await start_health_server(client, ping_database, port=PORT)
+    coordinator.start()
+    await client.start()
+    supervisor = asyncio.create_task(coordinator.supervise())
+    logger.info(f"Coordinator started as @{client.me.username} with {SHARD_COUNT} shards.")
+    try:
+        await idle()
+    finally:
+        supervisor.cancel()
+        await client.stop()
+        coordinator.stop()
+        await health_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_coordinator())
@@ -0,0 +1,183 @@
+# spam_fingerprint.py
+
+import functools
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+# SimHash के 64 बिट को 4 बैंड में बाँटा जाता है; ≤3 बिट के अंतर वाले दो हैश कम से कम एक बैंड साझा करते हैं
+HASH_BITS = 64
+BANDS = 4
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+MAX_HAMMING_DISTANCE = BANDS - 1
+
+# हर फ़ीचर-हैश के 64 बिट को 16-बिट "लेन" में फैलाकर एक ही बड़े int में जोड़ा जाता है, ताकि
+# 64 काउंटर एक-एक करके न बढ़ाने पड़ें: हर बाइट-पोज़िशन की अपनी 256-एंट्री टेबल है
+_LANE_BITS = 16
+_MAX_FEATURES = (1 << _LANE_BITS) - 1
+_SPREAD = tuple(
+    tuple(
+        sum(1 << ((position * 8 + bit) * _LANE_BITS) for bit in range(8) if byte & (1 << bit))
+        for byte in range(256)
+    )
+    for position in range(8)
+)
+_S0, _S1, _S2, _S3, _S4, _S5, _S6, _S7 = _SPREAD
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _feature_hash(feature: str) -> int:
+    # Python का hash() हर प्रोसेस में अलग होता है; शार्ड्स के बीच एक जैसा हैश चाहिए।
+    # कैंपेन में वही शब्द-जोड़े बार-बार आते हैं, इसलिए कैश ज़्यादातर हिट होता है
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _features(text: str) -> set[str]:
+    words = _PUNCTUATION.sub(" ", text.lower()).split()
+    if len(words) >= 4:
+        return {f"{a} {b}" for a, b in zip(words, words[1:])}
+    joined = " ".join(words)
+    return {joined[i:i + 4] for i in range(max(1, len(joined) - 3))}
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the text's word bigrams (character 4-grams for very short texts)."""
+    hashes = [_feature_hash(feature) for feature in _features(text)][:_MAX_FEATURES]
+    accumulator = 0
+    for value in hashes:
+        accumulator += (
+            _S0[value & 0xFF] | _S1[(value >> 8) & 0xFF] | _S2[(value >> 16) & 0xFF] | _S3[(value >> 24) & 0xFF]
+            | _S4[(value >> 32) & 0xFF] | _S5[(value >> 40) & 0xFF] | _S6[(value >> 48) & 0xFF] | _S7[value >> 56]
+        )
+
+    half = len(hashes) / 2
+    lanes = memoryview(accumulator.to_bytes(HASH_BITS * _LANE_BITS // 8, "little")).cast("H")
+    fingerprint = 0
+    for bit, count in enumerate(lanes):
+        if count > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SpamVerdict(NamedTuple):
+    is_spam: bool
+    fingerprint: int
+    users: int
+    chats: int
+    repeats: int # इसी यूज़र के इस क्लस्टर में मैसेज
+
+
+# बहुत छोटे टेक्स्ट (या जिनका फ़िंगरप्रिंट बना ही नहीं) के लिए
+NOT_FINGERPRINTED = SpamVerdict(False, 0, 0, 0, 0)
+
+
+class _Cluster:
+    __slots__ = ("fingerprint", "users", "chats", "last_seen")
+
+    def __init__(self, fingerprint: int, now: float):
+        self.fingerprint = fingerprint
+        self.users: dict[int, int] = {} # यूज़र -> इस क्लस्टर में उसके मैसेज
+        self.chats: set[int] = set()
+        self.last_seen = now
+
+
+class FingerprintStore:
+    """
+    Rolling store of near-duplicate message clusters across all chats.
+
+    Every message's SimHash is looked up through 4 band indexes, so finding
+    its cluster is O(1) regardless of how many messages were seen. Clusters
+    expire ``ttl`` seconds after their last message and the store never holds
+    more than ``max_clusters`` of them; users/chats per cluster are capped
+    too, so memory stays bounded under any load. A cluster is spam once it
+    has been posted by ``min_users`` accounts across ``min_chats`` chats (a
+    greeting forwarded by a few people in one group is not a campaign), or
+    ``min_repeats`` times by one account.
+    """
+
+    def __init__(self, ttl: float = 600, max_clusters: int = 50_000, min_users: int = 3, min_chats: int = 2,
+                 min_repeats: int = 5, min_length: int = 40, max_tracked_ids: int = 64):
+        self.ttl = ttl
+        self.max_clusters = max_clusters
+        self.min_users = min_users
+        self.min_chats = min_chats
+        self.min_repeats = min_repeats
+        self.min_length = min_length
+        self.max_tracked_ids = max_tracked_ids
+        self._clusters: OrderedDict[int, _Cluster] = OrderedDict()
+        self._bands: list[dict[int, set[int]]] = [{} for _ in range(BANDS)]
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def observe(self, text: str, chat_id: int, user_id: int, now: float | None = None) -> SpamVerdict:
+        """Records a message and returns whether its cluster now looks like a spam campaign."""
+        if len(text) < self.min_length:
+            return NOT_FINGERPRINTED
+        return self.observe_fingerprint(simhash(text), chat_id, user_id, now)
+
+    def observe_fingerprint(self, fingerprint: int, chat_id: int, user_id: int, now: float | None = None) -> SpamVerdict:
+        """Same as ``observe`` for an already computed SimHash (e.g. from another process)."""
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+
+        cluster_id = self._find(fingerprint)
+        if cluster_id is None:
+            cluster_id = self._add(fingerprint, now)
+        cluster = self._clusters[cluster_id]
+        self._clusters.move_to_end(cluster_id)
+        cluster.last_seen = now
+        if user_id in cluster.users or len(cluster.users) < self.max_tracked_ids:
+            cluster.users[user_id] = cluster.users.get(user_id, 0) + 1
+        if len(cluster.chats) < self.max_tracked_ids:
+            cluster.chats.add(chat_id)
+
+        repeats = cluster.users.get(user_id, 0)
+        is_spam = (
+            (len(cluster.users) >= self.min_users and len(cluster.chats) >= self.min_chats)
+            or repeats >= self.min_repeats
+        )
+        return SpamVerdict(is_spam, fingerprint, len(cluster.users), len(cluster.chats), repeats)
+
+    def _find(self, fingerprint: int) -> int | None:
+        for band_index, band in enumerate(self._bands):
+            candidates = band.get((fingerprint >> (band_index * BAND_BITS)) & BAND_MASK)
+            if not candidates:
+                continue
+            for cluster_id in candidates:
+                if (self._clusters[cluster_id].fingerprint ^ fingerprint).bit_count() <= MAX_HAMMING_DISTANCE:
+                    return cluster_id
+        return None
+
+    def _add(self, fingerprint: int, now: float) -> int:
+        cluster_id = self._next_id
+        self._next_id += 1
+        self._clusters[cluster_id] = _Cluster(fingerprint, now)
+        for band_index, band in enumerate(self._bands):
+            band.setdefault((fingerprint >> (band_index * BAND_BITS)) & BAND_MASK, set()).add(cluster_id)
+        while len(self._clusters) > self.max_clusters:
+            self._evict_oldest()
+        return cluster_id
+
+    def _expire(self, now: float):
+        while self._clusters:
+            oldest = next(iter(self._clusters.values()))
+            if now - oldest.last_seen <= self.ttl:
+                break
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        cluster_id, cluster = self._clusters.popitem(last=False)
+        for band_index, band in enumerate(self._bands):
+            key = (cluster.fingerprint >> (band_index * BAND_BITS)) & BAND_MASK
+            members = band.get(key)
+            if members is not None:
+                members.discard(cluster_id)
+                if not members:
+                    del band[key]
@@ -0,0 +1,35 @@
+# startup_profile.py
+#
+# स्टार्टअप में कहाँ समय जाता है: server.py सबसे पहले इसे इम्पोर्ट करता है और हर चरण के बाद mark()
+# करता है। STARTUP_PROFILE=1 पर हर चरण लॉग होता है, वरना सिर्फ़ कुल समय।
+
+import time
+
+_STARTED_AT = time.perf_counter()
+_last_mark = _STARTED_AT
+_phases: list[tuple[str, float]] = []
+
+
+def mark(name: str):
+    """Records the time since the previous mark (or process start) as phase ``name``."""
+    global _last_mark
+    now = time.perf_counter()
+    _phases.append((name, now - _last_mark))
+    _last_mark = now
+
+
+async def timed(name: str, awaitable):
+    """Awaits ``awaitable`` and records its duration; for phases that run concurrently."""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        _phases.append((name, time.perf_counter() - started))
+
+
+def report(logger, detailed: bool = False):
+    total = time.perf_counter() - _STARTED_AT
+    if detailed:
+        for name, seconds in _phases:
+            logger.info(f"Startup phase {name}: {seconds * 1000:.0f} ms")
+    logger.info(f"Startup finished in {total:.2f}s.")
@@ -0,0 +1,24 @@
+# storage/__init__.py
+#
+# database.py का बैकएंड STORAGE_URI की स्कीम से चुना जाता है:
+#   mongodb:// , mongodb+srv://  -> MongoDB
+#   mongomock://                  -> इन-मेमोरी Mongo (बेंचमार्क)
+#   sqlite:///path/to/bot.db      -> लोकल SQLite फ़ाइल (sqlite:///:memory: भी)
+
+from storage.base import COLLECTIONS, DEFAULT_GROUP_SETTINGS, SETTINGS_HISTORY_LIMIT, Storage
+
+SQLITE_PREFIX = "sqlite:///"
+
+
+def open_storage(uri: str) -> Storage:
+    """Creates the backend for ``uri``; the backend modules are imported only when used."""
+    if uri.startswith(("mongodb://", "mongodb+srv://", "mongomock://")):
+        from storage.mongo import MongoStorage
+        return MongoStorage(uri)
+    if uri.startswith(SQLITE_PREFIX):
+        from storage.sqlite import SQLiteStorage
+        return SQLiteStorage(uri[len(SQLITE_PREFIX):])
+    raise ValueError(f"Unsupported storage URI scheme: {uri.split('://', 1)[0]!r}")
+
+
+__all__ = ["COLLECTIONS", "DEFAULT_GROUP_SETTINGS", "SETTINGS_HISTORY_LIMIT", "Storage", "open_storage"]
@@ -0,0 +1,206 @@
+# storage/base.py
+
+from datetime import datetime
+
+# export/import और migrate इन्हीं नामों से चलते हैं
+COLLECTIONS = ("users", "groups", "warns", "cooldowns", "pending_inputs", "federations", "fed_bans", "jobs")
+
+# नया ग्रुप जुड़ने पर उसकी शुरुआती सेटिंग्स
+DEFAULT_GROUP_SETTINGS = {
+    "welcome_enabled": True,
+    "welcome_message": "👋 नमस्ते {username}! {groupname} में आपका स्वागत है।",
+    "anti_link_enabled": False,
+    "anti_flood_enabled": False,
+    "warn_limit": 3 # Default warn limit before a ban
+}
+
+# ग्रुप डॉक्युमेंट के ``settings_history`` में रखी आखिरी प्रविष्टियाँ: {"at", "by", "src", "keys"}
+SETTINGS_HISTORY_LIMIT = 20
+
+
+class Storage:
+    """
+    The bot's persistence interface; database.py forwards every call to one backend.
+
+    Documents are plain dicts shaped like the MongoDB documents (``_id`` is
+    the user/group id), whatever the backend stores underneath. ``stale_ok``
+    lets a backend serve a read from a replica that may lag a few seconds;
+    backends without replicas ignore it.
+    """
+    name = "storage"
+
+    # --- Lifecycle ---
+    def connect(self):
+        """Blocks until the backend is usable; raises if it is not."""
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # --- Users ---
+    def add_or_update_user(self, user_id: int, username: str | None, first_name: str, last_name: str | None, is_bot: bool):
+        raise NotImplementedError
+
+    def get_user(self, user_id: int, stale_ok: bool = False) -> dict | None:
+        raise NotImplementedError
+
+    def count_users(self, stale_ok: bool = True) -> int:
+        raise NotImplementedError
+
+    # --- Groups ---
+    def add_or_update_group(self, group_id: int, title: str, added_by_user_id: int):
+        """Sets the title; on insert also ``added_by``, ``added_at`` and DEFAULT_GROUP_SETTINGS."""
+        raise NotImplementedError
+
+    def get_group(self, group_id: int, stale_ok: bool = False) -> dict | None:
+        raise NotImplementedError
+
+    def update_group_settings(self, group_id: int, settings: dict, audit: dict | None = None) -> dict | None:
+        """
+        Sets top-level fields, increments ``settings_version`` and returns the
+        updated document (None if there is no group). ``audit`` is appended to
+        ``settings_history``, which keeps the last SETTINGS_HISTORY_LIMIT entries.
+        """
+        raise NotImplementedError
+
+    def apply_group_settings(self, group_ids: list[int], settings: dict, audit: dict | None = None) -> int:
+        """Like update_group_settings for every listed group, in one write; returns how many groups were updated."""
+        raise NotImplementedError
+
+    def add_to_group_list(self, group_id: int, list_name: str, values: list[str]):
+        """Appends the values not already in the list and increments ``settings_version``."""
+        raise NotImplementedError
+
+    def remove_from_group_list(self, group_id: int, list_name: str, values: list[str] | None = None):
+        """Removes the values (all of them if None) and increments ``settings_version``."""
+        raise NotImplementedError
+
+    def get_all_groups(self, stale_ok: bool = False) -> list[dict]:
+        raise NotImplementedError
+
+    def list_groups(self, after: int | None = None, limit: int = 50, stale_ok: bool = False) -> list[dict]:
+        """``{"_id", "title"}`` of the groups with ``_id`` greater than ``after``, in id order (one page of a cursor)."""
+        raise NotImplementedError
+
+    def count_groups(self, stale_ok: bool = True) -> int:
+        raise NotImplementedError
+
+    def delete_group(self, group_id: int):
+        """Deletes the group and its warns."""
+        raise NotImplementedError
+
+    # --- Warns ---
+    def add_warn(self, group_id: int, user_id: int) -> int:
+        """Atomically increments the user's warns in the group and returns the new count."""
+        raise NotImplementedError
+
+    def escalate_warn(self, group_id: int, user_id: int, limit: int) -> int:
+        """
+        Atomically increments the warns and returns the new count; a count of
+        ``limit`` or more is stored as 0, so only one caller ever sees it.
+        """
+        raise NotImplementedError
+
+    def get_warns(self, group_id: int, user_id: int) -> int:
+        raise NotImplementedError
+
+    def delete_warns(self, group_id: int, user_id: int):
+        raise NotImplementedError
+
+    # --- Cooldowns ---
+    def add_command_cooldown(self, user_id: int, command_name: str, timestamp: datetime):
+        raise NotImplementedError
+
+    def get_command_cooldown(self, user_id: int, command_name: str) -> datetime | None:
+        raise NotImplementedError
+
+    def reset_command_cooldown(self, user_id: int, command_name: str):
+        raise NotImplementedError
+
+    # --- Pending Inputs ---
+    def set_pending_input(self, user_id: int, kind: str, group_id: int):
+        raise NotImplementedError
+
+    def get_pending_input(self, user_id: int) -> dict | None:
+        raise NotImplementedError
+
+    def clear_pending_input(self, user_id: int):
+        raise NotImplementedError
+
+    # --- Federations ---
+    # ग्रुप किस फ़ेडरेशन में है, यह ग्रुप डॉक्युमेंट के ``federation_id`` में रहता है
+    def create_federation(self, federation_id: str, name: str, owner_id: int):
+        """Inserts ``{"_id", "name", "owner_id", "admins": [], "created_at"}``."""
+        raise NotImplementedError
+
+    def get_federation(self, federation_id: str) -> dict | None:
+        raise NotImplementedError
+
+    def update_federation(self, federation_id: str, fields: dict):
+        raise NotImplementedError
+
+    def get_federation_groups(self, federation_id: str) -> list[int]:
+        """Ids of the groups whose ``federation_id`` is this federation."""
+        raise NotImplementedError
+
+    def add_fed_ban(self, federation_id: str, user_id: int, reason: str | None, banned_by: int) -> bool:
+        """Records the ban (replacing the reason of an existing one); True if the user was not banned yet."""
+        raise NotImplementedError
+
+    def remove_fed_ban(self, federation_id: str, user_id: int) -> bool:
+        """True if there was a ban to remove."""
+        raise NotImplementedError
+
+    def get_fed_ban(self, federation_id: str, user_id: int) -> dict | None:
+        raise NotImplementedError
+
+    def get_fed_ban_ids(self, federation_id: str) -> list[int]:
+        """Every banned user id of the federation (loaded into memory by federations.py)."""
+        raise NotImplementedError
+
+    # --- Scheduled Jobs ---
+    # {"_id", "kind", "due_at", "chat_id", "user_id", "payload", "attempts"}; due_at पर इंडेक्स, ताकि अगला काम बिना स्कैन मिले
+    def add_job(self, job_id: str, kind: str, due_at: datetime, chat_id: int, user_id: int | None = None, payload: dict | None = None):
+        raise NotImplementedError
+
+    def next_job_due(self) -> datetime | None:
+        """The earliest ``due_at`` (for a leased job, the end of its lease)."""
+        raise NotImplementedError
+
+    def take_due_jobs(self, now: datetime, limit: int, lease_seconds: float = 300) -> list[dict]:
+        """
+        Leases and returns up to ``limit`` jobs with ``due_at <= now``, earliest
+        first, incrementing their ``attempts``. Atomic: with several processes
+        on one store each job is returned to exactly one of them. A leased job
+        stays stored with ``due_at`` moved to the end of the lease, so it comes
+        due again if its process dies before finish_jobs or retry_job.
+        """
+        raise NotImplementedError
+
+    def finish_jobs(self, job_ids: list[str]):
+        """Deletes jobs that ran (or were given up)."""
+        raise NotImplementedError
+
+    def retry_job(self, job_id: str, due_at: datetime):
+        """Ends the lease of a failed job and makes it due again at ``due_at``."""
+        raise NotImplementedError
+
+    def cancel_jobs(self, kind: str, chat_id: int, user_id: int | None = None) -> int:
+        """Deletes the pending jobs of that kind for the chat (and user, if given); returns how many."""
+        raise NotImplementedError
+
+    # --- Bulk (migrate, benchmarks) ---
+    def export_documents(self, collection: str):
+        """Yields every document of a collection (one of COLLECTIONS) in the shared dict shape."""
+        raise NotImplementedError
+
+    def import_documents(self, collection: str, documents: list[dict]):
+        """Inserts or replaces documents exported by any backend."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Deletes everything (benchmarks, ``migrate --replace``)."""
+        raise NotImplementedError
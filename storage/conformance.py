@@ -0,0 +1,347 @@
+# storage/conformance.py
+#
+# हर बैकएंड को एक ही व्यवहार देना चाहिए: यह जाँच दोनों पर चलाएँ (नया बैकएंड जोड़ें तो उस पर भी)।
+# हर जाँच से पहले स्टोर खाली किया जाता है, इसलिए असली डेटा वाले स्टोर पर न चलाएँ।
+#
+#   python -m storage.conformance mongomock:// sqlite:///:memory:
+#   python -m storage.conformance "mongodb://localhost:27017" --clear
+
+import argparse
+import sys
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from storage import COLLECTIONS, DEFAULT_GROUP_SETTINGS, SETTINGS_HISTORY_LIMIT, Storage, open_storage
+
+GROUP = -1001234567890
+OTHER_GROUP = -1009876543210
+USER = 424242
+OTHER_USER = 434343
+
+
+def _same_time(a: datetime | None, b: datetime) -> bool:
+    # MongoDB datetime को मिलीसेकंड तक ही रखता है
+    return a is not None and abs(a - b) < timedelta(milliseconds=1)
+
+
+def check_users(storage: Storage):
+    assert storage.get_user(USER) is None
+    storage.add_or_update_user(USER, "raju", "Raju", None, False)
+    user = storage.get_user(USER)
+    assert user["_id"] == USER and user["username"] == "raju" and user["last_name"] is None and user["is_bot"] is False
+    created_at = user["created_at"]
+    storage.add_or_update_user(USER, None, "Raju", "Kumar", False)
+    user = storage.get_user(USER, stale_ok=True)
+    assert user["username"] is None and user["last_name"] == "Kumar"
+    assert _same_time(user["created_at"], created_at), "created_at must only be set on insert"
+    assert user["last_seen"] >= created_at - timedelta(milliseconds=1)
+    storage.add_or_update_user(OTHER_USER, "bot", "Bot", None, True)
+    assert storage.count_users() == 2 and storage.count_users(stale_ok=False) == 2
+
+
+def check_groups(storage: Storage):
+    assert storage.get_group(GROUP) is None
+    storage.add_or_update_group(GROUP, "Test Group", USER)
+    group = storage.get_group(GROUP)
+    assert group["_id"] == GROUP and group["title"] == "Test Group" and group["added_by"] == USER
+    for key, value in DEFAULT_GROUP_SETTINGS.items():
+        assert group[key] == value, f"default {key}"
+    assert isinstance(group["added_at"], datetime)
+
+    updated = storage.update_group_settings(GROUP, {"warn_limit": 5, "anti_link_enabled": True})
+    assert updated["warn_limit"] == 5 and updated["settings_version"] == 1 and updated["title"] == "Test Group"
+    storage.add_or_update_group(GROUP, "Renamed", OTHER_USER)
+    group = storage.get_group(GROUP, stale_ok=True)
+    assert group["title"] == "Renamed" and group["added_by"] == USER, "added_by must only be set on insert"
+    assert group["warn_limit"] == 5 and group["anti_link_enabled"] is True
+    assert group["settings_version"] == 1
+
+    assert storage.update_group_settings(OTHER_GROUP, {"warn_limit": 9}) is None
+    assert storage.get_group(OTHER_GROUP) is None, "settings update must not create a group"
+
+    for i in range(SETTINGS_HISTORY_LIMIT + 2):
+        audit = {"at": datetime(2024, 1, 1, 12, 0, i), "by": USER, "src": "toggle", "keys": ["anti_flood_enabled"]}
+        storage.update_group_settings(GROUP, {"anti_flood_enabled": bool(i % 2)}, audit)
+    history = storage.get_group(GROUP)["settings_history"]
+    assert len(history) == SETTINGS_HISTORY_LIMIT, "settings_history keeps the last entries only"
+    assert history[-1]["at"] == datetime(2024, 1, 1, 12, 0, SETTINGS_HISTORY_LIMIT + 1) and history[0]["by"] == USER
+    version = storage.get_group(GROUP)["settings_version"]
+
+    storage.add_or_update_group(OTHER_GROUP, "Other", USER)
+    assert storage.count_groups() == 2 and storage.count_groups(stale_ok=False) == 2
+
+    audit = {"at": datetime(2024, 1, 2), "by": OTHER_USER, "src": "profile", "keys": ["anti_link_enabled", "blocklist"]}
+    settings = {"anti_link_enabled": False, "blocklist": ["spam"]}
+    assert storage.apply_group_settings([GROUP, OTHER_GROUP, -1009999999999], settings, audit) == 2
+    assert storage.apply_group_settings([], settings) == 0
+    group, other = storage.get_group(GROUP), storage.get_group(OTHER_GROUP)
+    assert group["anti_link_enabled"] is False and other["blocklist"] == ["spam"] and group["title"] == "Renamed"
+    assert group["settings_version"] == version + 1 and other["settings_version"] == 1
+    assert group["settings_history"][-1] == audit and other["settings_history"] == [audit]
+    assert len(group["settings_history"]) == SETTINGS_HISTORY_LIMIT
+    assert storage.get_group(-1009999999999) is None, "applying settings must not create groups"
+    assert sorted(g["_id"] for g in storage.get_all_groups()) == sorted([GROUP, OTHER_GROUP])
+
+    for i in range(5):
+        storage.add_or_update_group(-1009000000000 + i, f"Page {i}", USER)
+    ids = sorted([GROUP, OTHER_GROUP] + [-1009000000000 + i for i in range(5)])
+    first = storage.list_groups(limit=3)
+    assert [g["_id"] for g in first] == ids[:3] and first[0]["title"]
+    assert [g["_id"] for g in storage.list_groups(after=first[-1]["_id"], limit=10, stale_ok=True)] == ids[3:]
+    assert storage.list_groups(after=ids[-1]) == []
+
+
+def check_group_lists(storage: Storage):
+    storage.add_or_update_group(GROUP, "Test Group", USER)
+    storage.add_to_group_list(GROUP, "blocklist", ["spam", "scam"])
+    storage.add_to_group_list(GROUP, "blocklist", ["scam", "fraud"])
+    assert storage.get_group(GROUP)["blocklist"] == ["spam", "scam", "fraud"]
+    storage.remove_from_group_list(GROUP, "blocklist", ["spam", "missing"])
+    assert storage.get_group(GROUP)["blocklist"] == ["scam", "fraud"]
+    storage.remove_from_group_list(GROUP, "allowlist", ["x"])
+    storage.remove_from_group_list(GROUP, "blocklist")
+    group = storage.get_group(GROUP)
+    assert group["blocklist"] == [] and "allowlist" not in group
+    assert group["settings_version"] == 5, "every list change bumps settings_version"
+
+
+def check_warns(storage: Storage):
+    assert storage.get_warns(GROUP, USER) == 0
+    assert storage.add_warn(GROUP, USER) == 1
+    assert storage.add_warn(GROUP, USER) == 2
+    assert storage.add_warn(OTHER_GROUP, USER) == 1
+    assert storage.get_warns(GROUP, USER) == 2 and storage.get_warns(GROUP, OTHER_USER) == 0
+    storage.delete_warns(GROUP, USER)
+    assert storage.get_warns(GROUP, USER) == 0 and storage.get_warns(OTHER_GROUP, USER) == 1
+
+
+def check_concurrent_warns(storage: Storage):
+    threads, per_thread = 8, 25
+    counts = []
+
+    def warn_many():
+        for _ in range(per_thread):
+            counts.append(storage.add_warn(GROUP, USER))
+
+    workers = [threading.Thread(target=warn_many) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # हर add_warn को अलग गिनती मिलनी चाहिए, वरना लिमिट पर बैन छूट सकता है
+    assert sorted(counts) == list(range(1, threads * per_thread + 1))
+    assert storage.get_warns(GROUP, USER) == threads * per_thread
+
+
+def check_warn_escalation(storage: Storage):
+    assert [storage.escalate_warn(GROUP, USER, 3) for _ in range(4)] == [1, 2, 3, 1]
+    assert storage.get_warns(GROUP, USER) == 1
+    storage.add_warn(GROUP, USER)
+    storage.add_warn(GROUP, USER)
+    assert storage.escalate_warn(GROUP, USER, 2) == 4, "a count past a lowered limit still escalates"
+    assert storage.get_warns(GROUP, USER) == 0
+
+    storage.delete_warns(GROUP, USER)
+    limit, threads, per_thread = 10, 8, 25
+    counts = []
+
+    def warn_many():
+        for _ in range(per_thread):
+            counts.append(storage.escalate_warn(GROUP, USER, limit))
+
+    workers = [threading.Thread(target=warn_many) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # दो एडमिन एक साथ चेतावनी दें तो भी सीमा हर `limit` चेतावनियों पर ठीक एक बार पहुँचे
+    assert counts.count(limit) == threads * per_thread // limit and max(counts) == limit
+    assert storage.get_warns(GROUP, USER) == 0
+
+
+def check_delete_group(storage: Storage):
+    storage.add_or_update_group(GROUP, "Test Group", USER)
+    storage.add_or_update_group(OTHER_GROUP, "Other", USER)
+    storage.add_warn(GROUP, USER)
+    storage.add_warn(OTHER_GROUP, USER)
+    storage.delete_group(GROUP)
+    assert storage.get_group(GROUP) is None and storage.get_warns(GROUP, USER) == 0
+    assert storage.get_group(OTHER_GROUP) is not None and storage.get_warns(OTHER_GROUP, USER) == 1
+
+
+def check_cooldowns(storage: Storage):
+    assert storage.get_command_cooldown(USER, "command") is None
+    first = datetime.now() - timedelta(seconds=30)
+    storage.add_command_cooldown(USER, "command", first)
+    assert _same_time(storage.get_command_cooldown(USER, "command"), first)
+    second = datetime.now()
+    storage.add_command_cooldown(USER, "command", second)
+    assert _same_time(storage.get_command_cooldown(USER, "command"), second)
+    assert storage.get_command_cooldown(OTHER_USER, "command") is None
+    storage.reset_command_cooldown(USER, "command")
+    assert storage.get_command_cooldown(USER, "command") is None
+
+
+def check_pending_inputs(storage: Storage):
+    assert storage.get_pending_input(USER) is None
+    storage.set_pending_input(USER, "welcome_message", GROUP)
+    storage.set_pending_input(USER, "blocklist", OTHER_GROUP)
+    pending = storage.get_pending_input(USER)
+    assert pending["kind"] == "blocklist" and pending["group_id"] == OTHER_GROUP
+    assert isinstance(pending["created_at"], datetime)
+    storage.clear_pending_input(USER)
+    assert storage.get_pending_input(USER) is None
+
+
+def check_federations(storage: Storage):
+    assert storage.get_federation("fed1") is None
+    storage.create_federation("fed1", "Network", USER)
+    federation = storage.get_federation("fed1")
+    assert federation["name"] == "Network" and federation["owner_id"] == USER and federation["admins"] == []
+    storage.update_federation("fed1", {"admins": [OTHER_USER]})
+    assert storage.get_federation("fed1")["admins"] == [OTHER_USER]
+
+    storage.add_or_update_group(GROUP, "Test Group", USER)
+    storage.add_or_update_group(OTHER_GROUP, "Other", USER)
+    assert storage.get_federation_groups("fed1") == []
+    storage.update_group_settings(GROUP, {"federation_id": "fed1"})
+    assert storage.get_federation_groups("fed1") == [GROUP]
+    storage.update_group_settings(GROUP, {"federation_id": None})
+    assert storage.get_federation_groups("fed1") == []
+
+    assert storage.add_fed_ban("fed1", USER, "spam", OTHER_USER) is True
+    assert storage.add_fed_ban("fed1", USER, "scam", OTHER_USER) is False
+    assert storage.add_fed_ban("fed2", USER, None, OTHER_USER) is True
+    ban = storage.get_fed_ban("fed1", USER)
+    assert ban["reason"] == "scam" and ban["banned_by"] == OTHER_USER and isinstance(ban["banned_at"], datetime)
+    assert storage.get_fed_ban_ids("fed1") == [USER] and storage.get_fed_ban("fed1", OTHER_USER) is None
+    assert storage.remove_fed_ban("fed1", USER) is True and storage.remove_fed_ban("fed1", USER) is False
+    assert storage.get_fed_ban_ids("fed1") == [] and storage.get_fed_ban_ids("fed2") == [USER]
+
+
+def check_jobs(storage: Storage):
+    now = datetime.now()
+    assert storage.next_job_due() is None and storage.take_due_jobs(now, 10) == []
+    storage.add_job("late", "unban", now + timedelta(minutes=5), GROUP, USER)
+    storage.add_job("soon", "unmute", now - timedelta(seconds=1), GROUP, USER, {"note": "स्पैम"})
+    storage.add_job("first", "unmute", now - timedelta(seconds=5), OTHER_GROUP, OTHER_USER)
+    assert _same_time(storage.next_job_due(), now - timedelta(seconds=5))
+    jobs = storage.take_due_jobs(now, 10, lease_seconds=60)
+    assert [job["_id"] for job in jobs] == ["first", "soon"], "due jobs come earliest first"
+    assert jobs[1]["payload"] == {"note": "स्पैम"} and jobs[0]["payload"] is None and jobs[1]["user_id"] == USER
+    assert [job["attempts"] for job in jobs] == [1, 1]
+    assert storage.take_due_jobs(now, 10) == [], "a leased job is not taken again"
+    assert _same_time(storage.next_job_due(), now + timedelta(seconds=60)), "a leased job comes due when its lease ends"
+
+    # पट्टा खत्म (प्रोसेस बीच में बंद हो गया): काम फिर मिलता है
+    again = storage.take_due_jobs(now + timedelta(seconds=61), 10, lease_seconds=60)
+    assert sorted(job["_id"] for job in again) == ["first", "soon"] and {job["attempts"] for job in again} == {2}
+    storage.finish_jobs(["first"])
+    storage.retry_job("soon", now + timedelta(seconds=90))
+    assert storage.take_due_jobs(now + timedelta(seconds=89), 10) == []
+    retried = storage.take_due_jobs(now + timedelta(seconds=90), 10)
+    assert [job["_id"] for job in retried] == ["soon"] and retried[0]["attempts"] == 3
+    storage.finish_jobs(["soon"])
+    storage.finish_jobs([])
+    assert _same_time(storage.next_job_due(), now + timedelta(minutes=5))
+
+    storage.add_job("other", "unban", now, GROUP, OTHER_USER)
+    assert storage.cancel_jobs("unban", GROUP, USER) == 1 and storage.cancel_jobs("unmute", GROUP) == 0
+    assert storage.cancel_jobs("unban", GROUP) == 1 and storage.next_job_due() is None
+
+    for i in range(200):
+        storage.add_job(f"job{i}", "unmute", now - timedelta(seconds=i), GROUP, i)
+    taken = []
+
+    def take_all():
+        while batch := storage.take_due_jobs(datetime.now(), 7):
+            taken.extend(job["_id"] for job in batch)
+            storage.finish_jobs([job["_id"] for job in batch])
+
+    workers = [threading.Thread(target=take_all) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # कई शार्ड एक ही स्टोर पर: हर काम ठीक एक बार
+    assert sorted(taken) == sorted(f"job{i}" for i in range(200))
+
+
+def check_export_import(storage: Storage):
+    storage.add_or_update_user(USER, "raju", "Raju", None, False)
+    storage.add_or_update_group(GROUP, "Test Group", USER)
+    storage.add_to_group_list(GROUP, "blocklist", ["स्पैम"])
+    storage.add_warn(GROUP, USER)
+    storage.add_warn(GROUP, USER)
+    storage.add_command_cooldown(USER, "command", datetime.now())
+    storage.set_pending_input(USER, "welcome_message", GROUP)
+    storage.create_federation("fed1", "Network", USER)
+    storage.add_fed_ban("fed1", OTHER_USER, "spam", USER)
+    storage.add_job("job1", "unmute", datetime.now(), GROUP, USER, {"reason": "x"})
+    exported = {collection: list(storage.export_documents(collection)) for collection in COLLECTIONS}
+    assert all(len(documents) == 1 for documents in exported.values()), {c: len(d) for c, d in exported.items()}
+    group = storage.get_group(GROUP)
+
+    storage.clear()
+    assert storage.get_group(GROUP) is None and storage.get_warns(GROUP, USER) == 0
+    for collection, documents in exported.items():
+        storage.import_documents(collection, documents)
+        storage.import_documents(collection, documents) # दोबारा इम्पोर्ट से डुप्लिकेट नहीं बनने चाहिए
+    assert storage.get_group(GROUP) == group
+    assert storage.get_group(GROUP)["blocklist"] == ["स्पैम"]
+    assert storage.get_warns(GROUP, USER) == 2 and storage.add_warn(GROUP, USER) == 3
+    assert storage.get_user(USER)["username"] == "raju"
+    assert storage.get_command_cooldown(USER, "command") is not None
+    assert storage.get_pending_input(USER)["group_id"] == GROUP
+    assert storage.get_federation("fed1")["name"] == "Network" and storage.get_fed_ban_ids("fed1") == [OTHER_USER]
+    assert all(sum(1 for _ in storage.export_documents(c)) == 1 for c in COLLECTIONS)
+    assert storage.take_due_jobs(datetime.now(), 10)[0]["payload"] == {"reason": "x"}
+
+
+CHECKS = [
+    check_users, check_groups, check_group_lists, check_warns, check_concurrent_warns,
+    check_warn_escalation, check_delete_group, check_cooldowns, check_pending_inputs, check_federations,
+    check_jobs, check_export_import,
+]
+
+
+def run(storage: Storage) -> list[str]:
+    """Runs every check on an emptied ``storage``; returns the names of the failed ones."""
+    failed = []
+    for check in CHECKS:
+        storage.clear()
+        try:
+            check(storage)
+        except Exception:
+            failed.append(check.__name__)
+            print(f"  FAIL {check.__name__}")
+            traceback.print_exc()
+        else:
+            print(f"  ok   {check.__name__}")
+    storage.clear()
+    return failed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m storage.conformance", description="Check that storage backends behave the same.")
+    parser.add_argument("uris", nargs="+", help="STORAGE_URI values to check")
+    parser.add_argument("--clear", action="store_true", help="allow running on a store that already has data (it is deleted)")
+    args = parser.parse_args(argv)
+
+    exit_code = 0
+    for uri in args.uris:
+        storage = open_storage(uri)
+        storage.connect()
+        print(f"{storage.name} ({uri.split('://', 1)[0]}):")
+        if not args.clear and (storage.count_groups(stale_ok=False) or storage.count_users(stale_ok=False)):
+            print("  store is not empty; pass --clear to run anyway (all data is deleted)")
+            exit_code = 2
+        elif run(storage):
+            exit_code = 1
+        storage.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# storage/migrate.py
+#
+# एक बैकएंड से दूसरे में पूरा डेटा कॉपी करना (बॉट बंद रखकर चलाएँ):
+#
+#   python -m storage.migrate "mongodb+srv://..." sqlite:///data/bot.db
+#   python -m storage.migrate sqlite:///data/bot.db "mongodb+srv://..." --replace
+
+import argparse
+import logging
+import sys
+from itertools import islice
+
+from storage import COLLECTIONS, Storage, open_storage
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(source: Storage, target: Storage, batch_size: int = 1000) -> dict[str, int]:
+    """Copies every collection from ``source`` to ``target`` in batches; returns the counts copied."""
+    copied = {}
+    for collection in COLLECTIONS:
+        documents = source.export_documents(collection)
+        copied[collection] = 0
+        while batch := list(islice(documents, batch_size)):
+            target.import_documents(collection, batch)
+            copied[collection] += len(batch)
+        logger.info(f"Copied {copied[collection]} documents of {collection}.")
+    return copied
+
+
+def verify(source: Storage, target: Storage) -> list[str]:
+    """Collections whose document count differs between the two stores."""
+    mismatched = []
+    for collection in COLLECTIONS:
+        source_count = sum(1 for _ in source.export_documents(collection))
+        target_count = sum(1 for _ in target.export_documents(collection))
+        if source_count != target_count:
+            logger.error(f"{collection}: {source_count} documents in the source, {target_count} in the target.")
+            mismatched.append(collection)
+    return mismatched
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m storage.migrate", description="Copy all bot data between storage backends.")
+    parser.add_argument("source", help="STORAGE_URI to copy from")
+    parser.add_argument("target", help="STORAGE_URI to copy to")
+    parser.add_argument("--replace", action="store_true", help="delete everything in the target first")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    source, target = open_storage(args.source), open_storage(args.target)
+    source.connect()
+    target.connect()
+    if args.replace:
+        target.clear()
+    elif any(True for _ in target.export_documents("groups")):
+        # बिना --replace पुराना डेटा रहता है और एक ही _id वाले डॉक्युमेंट बदल दिए जाते हैं
+        logger.warning("Target already has groups; documents with the same id will be overwritten.")
+
+    copied = migrate(source, target, args.batch_size)
+    mismatched = verify(source, target) if args.replace else []
+    source.close()
+    target.close()
+    if mismatched:
+        return 1
+    logger.info(f"Migration finished: {sum(copied.values())} documents copied.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,356 @@
+# storage/mongo.py
+
+import logging
+import os
+import uuid
+import warnings
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, ReplaceOne, ReturnDocument, monitoring
+from pymongo.read_preferences import SecondaryPreferred
+
+from metrics import DB_POOL_CHECKOUT_FAILURES, DB_POOL_WAIT_SECONDS
+from storage.base import COLLECTIONS, DEFAULT_GROUP_SETTINGS, SETTINGS_HISTORY_LIMIT, Storage
+
+logger = logging.getLogger(__name__)
+
+# --- Connection Pool & Read Routing ---
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 5)) # इतने कनेक्शन पहले से खुले रहें, पीक पर नए हैंडशेक न हों
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000)) # पूल भरा हो तो कनेक्शन का अधिकतम इंतज़ार
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib") # सर्वर के साथ पहला साझा विकल्प चुना जाता है
+# stale_ok=True वाली रीड secondary से; MongoDB 90 सेकंड से कम की सीमा स्वीकार नहीं करता
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", 90))
+
+
+class PoolWaitListener(monitoring.ConnectionPoolListener):
+    """Records how long operations wait to check a connection out of the pool."""
+
+    def connection_checked_out(self, event):
+        if getattr(event, "duration", None) is not None:
+            DB_POOL_WAIT_SECONDS.observe(event.duration)
+
+    def connection_check_out_failed(self, event):
+        DB_POOL_CHECKOUT_FAILURES.inc(reason=str(event.reason))
+
+    # बाकी पूल इवेंट्स की ज़रूरत नहीं
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+def _mongo_client(uri: str):
+    if uri.startswith("mongomock://"):
+        # In-memory stand-in for benchmarks and local runs (pip install mongomock)
+        import mongomock
+        return mongomock.MongoClient()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        client = MongoClient(
+            uri,
+            appname="GroupPoliceBot",
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            compressors=MONGO_COMPRESSORS,
+            event_listeners=[PoolWaitListener()]
+        )
+    # जिस compressor की लाइब्रेरी इंस्टॉल नहीं (python-snappy, zstandard), pymongo उसे छोड़कर चेतावनी देता है
+    for warning in caught:
+        logger.info(f"MongoDB client: {warning.message}")
+    return client
+
+
+class MongoStorage(Storage):
+    """MongoDB (or mongomock) backend. The client does no I/O until ``connect`` or the first query."""
+    name = "mongodb"
+
+    def __init__(self, uri: str, database_name: str = "group_police_bot"):
+        self.client = _mongo_client(uri)
+        # mongomock का bulk_write नए pymongo के ReplaceOne को नहीं समझता
+        self._bulk_writes = not uri.startswith("mongomock://")
+        self.db = self.client.get_database(database_name)
+        # कुछ सेकंड पुराना डेटा चल जाए, ऐसी रीड (मॉडरेशन, सूचियाँ, आंकड़े) secondary पर, ताकि primary पर भार कम हो
+        self.stale_db = self.db.with_options(read_preference=SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS))
+        self.users = self.db.users
+        self.groups = self.db.groups
+        self.warns = self.db.warns
+        self.cooldowns = self.db.cooldowns
+        self.pending_inputs = self.db.pending_inputs
+        self.federations = self.db.federations
+        self.fed_bans = self.db.fed_bans
+        self.jobs = self.db.jobs
+
+    def connect(self):
+        self.client.admin.command('ping')
+        # पहले से हों तो कुछ नहीं होता; फ़ेड-बैन की एक ही प्रविष्टि और सदस्य ग्रुप्स की बिना स्कैन खोज
+        self.fed_bans.create_index([("federation_id", 1), ("user_id", 1)], unique=True)
+        self.groups.create_index("federation_id", sparse=True)
+        self.jobs.create_index([("due_at", 1)])
+        self.jobs.create_index([("kind", 1), ("chat_id", 1), ("user_id", 1)])
+
+    def ping(self) -> bool:
+        try:
+            self.client.admin.command('ping')
+            return True
+        except Exception as e:
+            logger.warning(f"MongoDB ping failed: {e}")
+            return False
+
+    def close(self):
+        self.client.close()
+
+    # --- Users ---
+    def add_or_update_user(self, user_id, username, first_name, last_name, is_bot):
+        self.users.update_one(
+            {"_id": user_id}, # Use _id for MongoDB's primary key for efficient lookup
+            {
+                "$set": {
+                    "username": username,
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "is_bot": is_bot,
+                    "last_seen": datetime.now() # Update last seen timestamp on every interaction
+                },
+                "$setOnInsert": {
+                    "created_at": datetime.now() # Set creation timestamp only if it's a new document
+                }
+            },
+            upsert=True # Create a new document if _id does not exist
+        )
+
+    def get_user(self, user_id, stale_ok=False):
+        return (self.stale_db.users if stale_ok else self.users).find_one({"_id": user_id})
+
+    def count_users(self, stale_ok=True):
+        return (self.stale_db.users if stale_ok else self.users).estimated_document_count()
+
+    # --- Groups ---
+    def add_or_update_group(self, group_id, title, added_by_user_id):
+        self.groups.update_one(
+            {"_id": group_id},
+            {
+                "$set": {"title": title, "last_updated": datetime.now()},
+                "$setOnInsert": {"added_by": added_by_user_id, "added_at": datetime.now(), **DEFAULT_GROUP_SETTINGS}
+            },
+            upsert=True
+        )
+
+    def get_group(self, group_id, stale_ok=False):
+        return (self.stale_db.groups if stale_ok else self.groups).find_one({"_id": group_id})
+
+    @staticmethod
+    def _settings_update(settings, audit):
+        update = {"$set": settings, "$inc": {"settings_version": 1}} # वर्ज़न बदलने पर कैश किए गए मैचर दोबारा बनते हैं
+        if audit is not None:
+            update["$push"] = {"settings_history": {"$each": [audit], "$slice": -SETTINGS_HISTORY_LIMIT}}
+        return update
+
+    def update_group_settings(self, group_id, settings, audit=None):
+        return self.groups.find_one_and_update(
+            {"_id": group_id},
+            self._settings_update(settings, audit),
+            return_document=ReturnDocument.AFTER
+        )
+
+    def apply_group_settings(self, group_ids, settings, audit=None):
+        # सभी ग्रुप्स पर एक ही अपडेट: एक update_many कमांड, हर ग्रुप के लिए अलग राउंड-ट्रिप नहीं
+        if not group_ids:
+            return 0
+        return self.groups.update_many({"_id": {"$in": list(group_ids)}}, self._settings_update(settings, audit)).matched_count
+
+    def add_to_group_list(self, group_id, list_name, values):
+        self.groups.update_one(
+            {"_id": group_id},
+            {"$addToSet": {list_name: {"$each": values}}, "$inc": {"settings_version": 1}}
+        )
+
+    def remove_from_group_list(self, group_id, list_name, values=None):
+        if values is None:
+            update = {"$set": {list_name: []}, "$inc": {"settings_version": 1}}
+        else:
+            update = {"$pull": {list_name: {"$in": values}}, "$inc": {"settings_version": 1}}
+        self.groups.update_one({"_id": group_id}, update)
+
+    def get_all_groups(self, stale_ok=False):
+        return list((self.stale_db.groups if stale_ok else self.groups).find({}))
+
+    def list_groups(self, after=None, limit=50, stale_ok=False):
+        query = {} if after is None else {"_id": {"$gt": after}}
+        return list((self.stale_db.groups if stale_ok else self.groups).find(query, {"title": 1}).sort("_id", 1).limit(limit))
+
+    def count_groups(self, stale_ok=True):
+        return (self.stale_db.groups if stale_ok else self.groups).estimated_document_count()
+
+    def delete_group(self, group_id):
+        self.groups.delete_one({"_id": group_id})
+        self.warns.delete_many({"group_id": group_id}) # Also clean up associated warns
+
+    # --- Warns ---
+    def add_warn(self, group_id, user_id):
+        result = self.warns.find_one_and_update(
+            {"group_id": group_id, "user_id": user_id},
+            {"$inc": {"warns": 1}, "$set": {"last_warned": datetime.now()}},
+            upsert=True,
+            return_document=True # Returns the updated document
+        )
+        return result["warns"]
+
+    def escalate_warn(self, group_id, user_id, limit):
+        # पाइपलाइन अपडेट: बढ़ाना, सीमा से तुलना और शून्य करना एक ही डॉक्युमेंट ऑपरेशन में
+        result = self.warns.find_one_and_update(
+            {"group_id": group_id, "user_id": user_id},
+            [
+                {"$set": {"last_count": {"$add": [{"$ifNull": ["$warns", 0]}, 1]}, "last_warned": {"$literal": datetime.now()}}},
+                {"$set": {"warns": {"$cond": [{"$gte": ["$last_count", limit]}, 0, "$last_count"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return result["last_count"]
+
+    def get_warns(self, group_id, user_id):
+        result = self.warns.find_one({"group_id": group_id, "user_id": user_id})
+        return result["warns"] if result else 0
+
+    def delete_warns(self, group_id, user_id):
+        self.warns.delete_one({"group_id": group_id, "user_id": user_id})
+
+    # --- Cooldowns ---
+    def add_command_cooldown(self, user_id, command_name, timestamp):
+        self.cooldowns.update_one(
+            {"_id": user_id, "command": command_name},
+            {"$set": {"last_used": timestamp}},
+            upsert=True
+        )
+
+    def get_command_cooldown(self, user_id, command_name):
+        result = self.cooldowns.find_one({"_id": user_id, "command": command_name})
+        return result["last_used"] if result else None
+
+    def reset_command_cooldown(self, user_id, command_name):
+        self.cooldowns.delete_one({"_id": user_id, "command": command_name})
+
+    # --- Pending Inputs ---
+    def set_pending_input(self, user_id, kind, group_id):
+        self.pending_inputs.update_one(
+            {"_id": user_id},
+            {"$set": {"kind": kind, "group_id": group_id, "created_at": datetime.now()}},
+            upsert=True
+        )
+
+    def get_pending_input(self, user_id):
+        return self.pending_inputs.find_one({"_id": user_id})
+
+    def clear_pending_input(self, user_id):
+        self.pending_inputs.delete_one({"_id": user_id})
+
+    # --- Federations ---
+    def create_federation(self, federation_id, name, owner_id):
+        self.federations.insert_one({"_id": federation_id, "name": name, "owner_id": owner_id, "admins": [], "created_at": datetime.now()})
+
+    def get_federation(self, federation_id):
+        return self.federations.find_one({"_id": federation_id})
+
+    def update_federation(self, federation_id, fields):
+        self.federations.update_one({"_id": federation_id}, {"$set": fields})
+
+    def get_federation_groups(self, federation_id):
+        return [group["_id"] for group in self.groups.find({"federation_id": federation_id}, {"_id": 1})]
+
+    def add_fed_ban(self, federation_id, user_id, reason, banned_by):
+        result = self.fed_bans.update_one(
+            {"federation_id": federation_id, "user_id": user_id},
+            {"$set": {"reason": reason, "banned_by": banned_by, "banned_at": datetime.now()}},
+            upsert=True
+        )
+        return result.upserted_id is not None
+
+    def remove_fed_ban(self, federation_id, user_id):
+        return self.fed_bans.delete_one({"federation_id": federation_id, "user_id": user_id}).deleted_count > 0
+
+    def get_fed_ban(self, federation_id, user_id):
+        return self.fed_bans.find_one({"federation_id": federation_id, "user_id": user_id}, {"_id": 0})
+
+    def get_fed_ban_ids(self, federation_id):
+        return [ban["user_id"] for ban in self.fed_bans.find({"federation_id": federation_id}, {"user_id": 1, "_id": 0})]
+
+    # --- Scheduled Jobs ---
+    def add_job(self, job_id, kind, due_at, chat_id, user_id=None, payload=None):
+        self.jobs.insert_one({
+            "_id": job_id, "kind": kind, "due_at": due_at, "chat_id": chat_id, "user_id": user_id, "payload": payload, "attempts": 0
+        })
+
+    def next_job_due(self):
+        job = self.jobs.find_one({}, {"due_at": 1}, sort=[("due_at", 1)])
+        return job["due_at"] if job else None
+
+    def take_due_jobs(self, now, limit, lease_seconds=300):
+        # पट्टा (lease): due_at पट्टे के अंत तक आगे बढ़ता है। "due_at <= now" की शर्त हर डॉक्युमेंट पर atomic है,
+        # इसलिए दो प्रोसेस एक ही काम नहीं उठाते; पूरा बैच तीन राउंड ट्रिप में
+        due = [job["_id"] for job in self.jobs.find({"due_at": {"$lte": now}}, {"_id": 1}).sort("due_at", 1).limit(limit)]
+        if not due:
+            return []
+        lease = uuid.uuid4().hex
+        self.jobs.update_many(
+            {"_id": {"$in": due}, "due_at": {"$lte": now}},
+            {"$set": {"due_at": now + timedelta(seconds=lease_seconds), "lease": lease}, "$inc": {"attempts": 1}}
+        )
+        order = {job_id: index for index, job_id in enumerate(due)}
+        jobs = sorted(self.jobs.find({"_id": {"$in": due}, "lease": lease}), key=lambda job: order[job["_id"]])
+        for job in jobs:
+            del job["lease"]
+        return jobs
+
+    def finish_jobs(self, job_ids):
+        if job_ids:
+            self.jobs.delete_many({"_id": {"$in": list(job_ids)}})
+
+    def retry_job(self, job_id, due_at):
+        self.jobs.update_one({"_id": job_id}, {"$set": {"due_at": due_at}, "$unset": {"lease": ""}})
+
+    def cancel_jobs(self, kind, chat_id, user_id=None):
+        query = {"kind": kind, "chat_id": chat_id}
+        if user_id is not None:
+            query["user_id"] = user_id
+        return self.jobs.delete_many(query).deleted_count
+
+    # --- Bulk ---
+    def export_documents(self, collection):
+        for document in self.db[collection].find({}):
+            if collection in ("warns", "fed_bans"):
+                document.pop("_id", None) # ObjectId; ये (group_id/federation_id, user_id) से पहचाने जाते हैं
+            yield document
+
+    def import_documents(self, collection, documents):
+        if not documents:
+            return
+        target = self.db[collection]
+        if collection == "warns":
+            keyed = [({"group_id": doc["group_id"], "user_id": doc["user_id"]}, doc) for doc in documents]
+        elif collection == "fed_bans":
+            keyed = [({"federation_id": doc["federation_id"], "user_id": doc["user_id"]}, doc) for doc in documents]
+        else:
+            keyed = [({"_id": doc["_id"]}, doc) for doc in documents]
+        if not self._bulk_writes:
+            if collection in ("warns", "fed_bans"):
+                for key, doc in keyed:
+                    target.replace_one(key, doc, upsert=True)
+            else:
+                # mongomock में हर upsert पूरी कलेक्शन स्कैन करता है; हटाकर एक साथ डालना कहीं तेज़ है
+                target.delete_many({"_id": {"$in": [doc["_id"] for doc in documents]}})
+                target.insert_many(documents)
+            return
+        target.bulk_write([ReplaceOne(key, doc, upsert=True) for key, doc in keyed], ordered=False)
+
+    def clear(self):
+        for collection in COLLECTIONS:
+            self.db[collection].delete_many({})
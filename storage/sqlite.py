@@ -0,0 +1,523 @@
+# storage/sqlite.py
+#
+# एम्बेडेड बैकएंड: एक लोकल SQLite फ़ाइल (WAL मोड)। छोटे और मध्यम डिप्लॉयमेंट के लिए, जहाँ हर
+# सेटिंग्स रीड पर रिमोट MongoDB तक नेटवर्क का चक्कर नहीं चाहिए।
+#
+#   STORAGE_URI=sqlite:///data/bot.db       (रिलेटिव पाथ)
+#   STORAGE_URI=sqlite:////var/lib/bot.db   (एब्सोल्यूट पाथ)
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from storage.base import COLLECTIONS, DEFAULT_GROUP_SETTINGS, SETTINGS_HISTORY_LIMIT, Storage
+
+logger = logging.getLogger(__name__)
+
+# दूसरा प्रोसेस (जैसे कोई और शार्ड) लिख रहा हो तो इतने ms तक इंतज़ार, फिर "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS groups (id INTEGER PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS warns (
+    group_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    warns INTEGER NOT NULL,
+    last_warned TEXT,
+    PRIMARY KEY (group_id, user_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cooldowns (
+    user_id INTEGER NOT NULL,
+    command TEXT NOT NULL,
+    last_used TEXT NOT NULL,
+    PRIMARY KEY (user_id, command)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pending_inputs (
+    user_id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    group_id INTEGER,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS federations (id TEXT PRIMARY KEY, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS fed_bans (
+    federation_id TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    reason TEXT,
+    banned_by INTEGER,
+    banned_at TEXT,
+    PRIMARY KEY (federation_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS groups_federation ON groups (json_extract(doc, '$.federation_id'));
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    due_at TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER,
+    payload TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (due_at);
+CREATE INDEX IF NOT EXISTS jobs_target ON jobs (kind, chat_id, user_id);
+"""
+
+
+# यूज़र/ग्रुप डॉक्युमेंट JSON में रहते हैं; datetime को MongoDB Extended JSON की तरह {"$date": ...} लिखते हैं
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _dumps(document: dict) -> str:
+    return json.dumps(document, default=_encode, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(text: str) -> dict:
+    return json.loads(text, object_hook=_decode)
+
+
+def _to_text(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _from_text(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+class SQLiteStorage(Storage):
+    """
+    SQLite backend in WAL mode.
+
+    Users and groups are stored as JSON documents keyed by id, warns,
+    cooldowns and pending inputs as plain rows. A lookup is a primary-key
+    read from the page cache, a few microseconds. One connection is shared
+    by the event loop and the health-check thread behind a lock;
+    read-modify-write updates run in ``BEGIN IMMEDIATE`` so that several
+    processes (shards) can share the file.
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        # isolation_level=None: हर स्टेटमेंट अपने आप कमिट, ट्रांज़ैक्शन सिर्फ़ जहाँ हम BEGIN लिखें
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL") # WAL में कमिट पर fsync नहीं, चेकपॉइंट पर
+            self._conn.executescript(_SCHEMA)
+
+    def connect(self):
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+
+    def ping(self) -> bool:
+        try:
+            self.connect()
+            return True
+        except Exception as e:
+            logger.warning(f"SQLite ping failed: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _one(self, query: str, params: tuple):
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
+
+    def _run(self, query: str, params: tuple = ()):
+        with self._lock:
+            self._conn.execute(query, params)
+
+    def _modify(self, table: str, key: int, update, insert=None):
+        """
+        Read-modify-write of one JSON document in a write transaction.
+
+        ``update(doc)`` changes an existing document in place; if there is
+        none, ``insert()`` returns the new one (or nothing happens if it is None).
+        Returns the stored document.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(f"SELECT doc FROM {table} WHERE id = ?", (key,)).fetchone()
+                document = None
+                if row is not None:
+                    document = _loads(row[0])
+                    update(document)
+                    self._conn.execute(f"UPDATE {table} SET doc = ? WHERE id = ?", (_dumps(document), key))
+                elif insert is not None:
+                    document = insert()
+                    self._conn.execute(f"INSERT INTO {table} (id, doc) VALUES (?, ?)", (key, _dumps(document)))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return document
+
+    # --- Users ---
+    def add_or_update_user(self, user_id, username, first_name, last_name, is_bot):
+        now = datetime.now()
+        fields = {"username": username, "first_name": first_name, "last_name": last_name, "is_bot": is_bot, "last_seen": now}
+        self._modify("users", user_id, lambda doc: doc.update(fields), lambda: {"_id": user_id, **fields, "created_at": now})
+
+    def get_user(self, user_id, stale_ok=False):
+        row = self._one("SELECT doc FROM users WHERE id = ?", (user_id,))
+        return _loads(row[0]) if row else None
+
+    def count_users(self, stale_ok=True):
+        return self._one("SELECT count(*) FROM users", ())[0]
+
+    # --- Groups ---
+    def add_or_update_group(self, group_id, title, added_by_user_id):
+        now = datetime.now()
+        fields = {"title": title, "last_updated": now}
+        self._modify(
+            "groups", group_id,
+            lambda doc: doc.update(fields),
+            lambda: {"_id": group_id, **fields, "added_by": added_by_user_id, "added_at": now, **DEFAULT_GROUP_SETTINGS}
+        )
+
+    def get_group(self, group_id, stale_ok=False):
+        row = self._one("SELECT doc FROM groups WHERE id = ?", (group_id,))
+        return _loads(row[0]) if row else None
+
+    @staticmethod
+    def _apply_settings(doc, settings, audit):
+        doc.update(settings)
+        doc["settings_version"] = doc.get("settings_version", 0) + 1
+        if audit is not None:
+            doc["settings_history"] = (doc.get("settings_history") or [])[-(SETTINGS_HISTORY_LIMIT - 1):] + [audit]
+
+    def update_group_settings(self, group_id, settings, audit=None):
+        return self._modify("groups", group_id, lambda doc: self._apply_settings(doc, settings, audit))
+
+    def apply_group_settings(self, group_ids, settings, audit=None):
+        # सभी ग्रुप्स एक ही write ट्रांज़ैक्शन में: बीच में कोई दूसरा प्रोसेस आधी लगी सेटिंग्स नहीं देखता
+        if not group_ids:
+            return 0
+        placeholders = ",".join("?" * len(group_ids))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(f"SELECT id, doc FROM groups WHERE id IN ({placeholders})", tuple(group_ids)).fetchall()
+                updated = []
+                for group_id, raw in rows:
+                    document = _loads(raw)
+                    self._apply_settings(document, settings, audit)
+                    updated.append((_dumps(document), group_id))
+                self._conn.executemany("UPDATE groups SET doc = ? WHERE id = ?", updated)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(updated)
+
+    def add_to_group_list(self, group_id, list_name, values):
+        def update(doc):
+            current = doc.setdefault(list_name, [])
+            for value in values:
+                if value not in current:
+                    current.append(value)
+            doc["settings_version"] = doc.get("settings_version", 0) + 1
+        self._modify("groups", group_id, update)
+
+    def remove_from_group_list(self, group_id, list_name, values=None):
+        def update(doc):
+            if values is None:
+                doc[list_name] = []
+            elif list_name in doc:
+                doc[list_name] = [value for value in doc[list_name] if value not in values]
+            doc["settings_version"] = doc.get("settings_version", 0) + 1
+        self._modify("groups", group_id, update)
+
+    def get_all_groups(self, stale_ok=False):
+        with self._lock:
+            rows = self._conn.execute("SELECT doc FROM groups").fetchall()
+        return [_loads(row[0]) for row in rows]
+
+    def list_groups(self, after=None, limit=50, stale_ok=False):
+        # id प्राइमरी की है, इसलिए कर्सर वाला पेज इंडेक्स से (पूरी टेबल पढ़े बिना)
+        if after is None:
+            query, params = "SELECT id, json_extract(doc, '$.title') FROM groups ORDER BY id LIMIT ?", (limit,)
+        else:
+            query, params = "SELECT id, json_extract(doc, '$.title') FROM groups WHERE id > ? ORDER BY id LIMIT ?", (after, limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{"_id": group_id, "title": title} for group_id, title in rows]
+
+    def count_groups(self, stale_ok=True):
+        return self._one("SELECT count(*) FROM groups", ())[0]
+
+    def delete_group(self, group_id):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM groups WHERE id = ?", (group_id,))
+                self._conn.execute("DELETE FROM warns WHERE group_id = ?", (group_id,)) # Also clean up associated warns
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # --- Warns ---
+    def add_warn(self, group_id, user_id):
+        # एक ही स्टेटमेंट में बढ़ाना और नई गिनती लौटाना, इसलिए दो एक-साथ वॉर्न की गिनती नहीं खोती
+        row = self._one(
+            "INSERT INTO warns (group_id, user_id, warns, last_warned) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT (group_id, user_id) DO UPDATE SET warns = warns + 1, last_warned = excluded.last_warned "
+            "RETURNING warns",
+            (group_id, user_id, _to_text(datetime.now()))
+        )
+        return row[0]
+
+    def escalate_warn(self, group_id, user_id, limit):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._conn.execute(
+                    "INSERT INTO warns (group_id, user_id, warns, last_warned) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT (group_id, user_id) DO UPDATE SET warns = warns + 1, last_warned = excluded.last_warned "
+                    "RETURNING warns",
+                    (group_id, user_id, _to_text(datetime.now()))
+                ).fetchone()[0]
+                if count >= limit:
+                    self._conn.execute("UPDATE warns SET warns = 0 WHERE group_id = ? AND user_id = ?", (group_id, user_id))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def get_warns(self, group_id, user_id):
+        row = self._one("SELECT warns FROM warns WHERE group_id = ? AND user_id = ?", (group_id, user_id))
+        return row[0] if row else 0
+
+    def delete_warns(self, group_id, user_id):
+        self._run("DELETE FROM warns WHERE group_id = ? AND user_id = ?", (group_id, user_id))
+
+    # --- Cooldowns ---
+    def add_command_cooldown(self, user_id, command_name, timestamp):
+        self._run(
+            "INSERT INTO cooldowns (user_id, command, last_used) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, command) DO UPDATE SET last_used = excluded.last_used",
+            (user_id, command_name, _to_text(timestamp))
+        )
+
+    def get_command_cooldown(self, user_id, command_name):
+        row = self._one("SELECT last_used FROM cooldowns WHERE user_id = ? AND command = ?", (user_id, command_name))
+        return _from_text(row[0]) if row else None
+
+    def reset_command_cooldown(self, user_id, command_name):
+        self._run("DELETE FROM cooldowns WHERE user_id = ? AND command = ?", (user_id, command_name))
+
+    # --- Pending Inputs ---
+    def set_pending_input(self, user_id, kind, group_id):
+        self._run(
+            "INSERT OR REPLACE INTO pending_inputs (user_id, kind, group_id, created_at) VALUES (?, ?, ?, ?)",
+            (user_id, kind, group_id, _to_text(datetime.now()))
+        )
+
+    def get_pending_input(self, user_id):
+        row = self._one("SELECT kind, group_id, created_at FROM pending_inputs WHERE user_id = ?", (user_id,))
+        if row is None:
+            return None
+        return {"_id": user_id, "kind": row[0], "group_id": row[1], "created_at": _from_text(row[2])}
+
+    def clear_pending_input(self, user_id):
+        self._run("DELETE FROM pending_inputs WHERE user_id = ?", (user_id,))
+
+    # --- Federations ---
+    def create_federation(self, federation_id, name, owner_id):
+        document = {"_id": federation_id, "name": name, "owner_id": owner_id, "admins": [], "created_at": datetime.now()}
+        self._run("INSERT INTO federations (id, doc) VALUES (?, ?)", (federation_id, _dumps(document)))
+
+    def get_federation(self, federation_id):
+        row = self._one("SELECT doc FROM federations WHERE id = ?", (federation_id,))
+        return _loads(row[0]) if row else None
+
+    def update_federation(self, federation_id, fields):
+        self._modify("federations", federation_id, lambda doc: doc.update(fields))
+
+    def get_federation_groups(self, federation_id):
+        # एक्सप्रेशन इंडेक्स groups_federation से, पूरी टेबल पढ़े बिना
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM groups WHERE json_extract(doc, '$.federation_id') = ?", (federation_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def add_fed_ban(self, federation_id, user_id, reason, banned_by):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existed = self._conn.execute(
+                    "SELECT 1 FROM fed_bans WHERE federation_id = ? AND user_id = ?", (federation_id, user_id)
+                ).fetchone() is not None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO fed_bans (federation_id, user_id, reason, banned_by, banned_at) VALUES (?, ?, ?, ?, ?)",
+                    (federation_id, user_id, reason, banned_by, _to_text(datetime.now()))
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return not existed
+
+    def remove_fed_ban(self, federation_id, user_id):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM fed_bans WHERE federation_id = ? AND user_id = ?", (federation_id, user_id))
+            return cursor.rowcount > 0
+
+    def get_fed_ban(self, federation_id, user_id):
+        row = self._one(
+            "SELECT reason, banned_by, banned_at FROM fed_bans WHERE federation_id = ? AND user_id = ?", (federation_id, user_id)
+        )
+        if row is None:
+            return None
+        return {"federation_id": federation_id, "user_id": user_id, "reason": row[0], "banned_by": row[1], "banned_at": _from_text(row[2])}
+
+    def get_fed_ban_ids(self, federation_id):
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id FROM fed_bans WHERE federation_id = ?", (federation_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    # --- Scheduled Jobs ---
+    # due_at ISO टेक्स्ट है, जिसका क्रम समय के क्रम जैसा ही है, इसलिए jobs_due इंडेक्स से तुलना और सॉर्ट
+    def add_job(self, job_id, kind, due_at, chat_id, user_id=None, payload=None):
+        self._run(
+            "INSERT INTO jobs (id, kind, due_at, chat_id, user_id, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, _to_text(due_at), chat_id, user_id, _dumps(payload) if payload is not None else None)
+        )
+
+    def next_job_due(self):
+        row = self._one("SELECT min(due_at) FROM jobs", ())
+        return _from_text(row[0])
+
+    def take_due_jobs(self, now, limit, lease_seconds=300):
+        # पट्टा (lease): due_at पट्टे के अंत तक आगे, उसी write ट्रांज़ैक्शन में जिसमें काम चुने गए
+        lease_end = _to_text(now + timedelta(seconds=lease_seconds))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                due = [row[0] for row in self._conn.execute(
+                    "SELECT id FROM jobs WHERE due_at <= ? ORDER BY due_at LIMIT ?", (_to_text(now), limit)
+                ).fetchall()]
+                rows = self._conn.execute(
+                    f"UPDATE jobs SET due_at = ?, attempts = attempts + 1 WHERE id IN ({','.join('?' * len(due))}) "
+                    "RETURNING id, kind, due_at, chat_id, user_id, payload, attempts",
+                    (lease_end, *due)
+                ).fetchall() if due else []
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        order = {job_id: index for index, job_id in enumerate(due)}
+        return sorted((self._job(row) for row in rows), key=lambda job: order[job["_id"]]) # RETURNING का क्रम तय नहीं
+
+    def finish_jobs(self, job_ids):
+        if job_ids:
+            self._run(f"DELETE FROM jobs WHERE id IN ({','.join('?' * len(job_ids))})", tuple(job_ids))
+
+    def retry_job(self, job_id, due_at):
+        self._run("UPDATE jobs SET due_at = ? WHERE id = ?", (_to_text(due_at), job_id))
+
+    def cancel_jobs(self, kind, chat_id, user_id=None):
+        with self._lock:
+            if user_id is None:
+                cursor = self._conn.execute("DELETE FROM jobs WHERE kind = ? AND chat_id = ?", (kind, chat_id))
+            else:
+                cursor = self._conn.execute("DELETE FROM jobs WHERE kind = ? AND chat_id = ? AND user_id = ?", (kind, chat_id, user_id))
+            return cursor.rowcount
+
+    @staticmethod
+    def _job(row) -> dict:
+        return {
+            "_id": row[0], "kind": row[1], "due_at": _from_text(row[2]), "chat_id": row[3], "user_id": row[4],
+            "payload": _loads(row[5]) if row[5] is not None else None, "attempts": row[6]
+        }
+
+    # --- Bulk ---
+    def export_documents(self, collection):
+        # पूरी टेबल एक बार में पढ़ी जाती है, ताकि yield के बीच लॉक न पकड़ा रहे
+        with self._lock:
+            if collection in ("users", "groups", "federations"):
+                rows = self._conn.execute(f"SELECT doc FROM {collection}").fetchall()
+            elif collection == "warns":
+                rows = self._conn.execute("SELECT group_id, user_id, warns, last_warned FROM warns").fetchall()
+            elif collection == "cooldowns":
+                rows = self._conn.execute("SELECT user_id, command, last_used FROM cooldowns").fetchall()
+            elif collection == "pending_inputs":
+                rows = self._conn.execute("SELECT user_id, kind, group_id, created_at FROM pending_inputs").fetchall()
+            elif collection == "fed_bans":
+                rows = self._conn.execute("SELECT federation_id, user_id, reason, banned_by, banned_at FROM fed_bans").fetchall()
+            elif collection == "jobs":
+                rows = self._conn.execute("SELECT id, kind, due_at, chat_id, user_id, payload, attempts FROM jobs").fetchall()
+            else:
+                raise ValueError(f"Unknown collection {collection!r}")
+        for row in rows:
+            if collection in ("users", "groups", "federations"):
+                yield _loads(row[0])
+            elif collection == "warns":
+                yield {"group_id": row[0], "user_id": row[1], "warns": row[2], "last_warned": _from_text(row[3])}
+            elif collection == "cooldowns":
+                yield {"_id": row[0], "command": row[1], "last_used": _from_text(row[2])}
+            elif collection == "fed_bans":
+                yield {"federation_id": row[0], "user_id": row[1], "reason": row[2], "banned_by": row[3], "banned_at": _from_text(row[4])}
+            elif collection == "jobs":
+                yield self._job(row)
+            else:
+                yield {"_id": row[0], "kind": row[1], "group_id": row[2], "created_at": _from_text(row[3])}
+
+    def import_documents(self, collection, documents):
+        if collection in ("users", "groups", "federations"):
+            query = f"INSERT OR REPLACE INTO {collection} (id, doc) VALUES (?, ?)"
+            rows = [(doc["_id"], _dumps(doc)) for doc in documents]
+        elif collection == "warns":
+            query = "INSERT OR REPLACE INTO warns (group_id, user_id, warns, last_warned) VALUES (?, ?, ?, ?)"
+            rows = [(doc["group_id"], doc["user_id"], doc["warns"], _to_text(doc.get("last_warned"))) for doc in documents]
+        elif collection == "cooldowns":
+            query = "INSERT OR REPLACE INTO cooldowns (user_id, command, last_used) VALUES (?, ?, ?)"
+            rows = [(doc["_id"], doc["command"], _to_text(doc["last_used"])) for doc in documents]
+        elif collection == "pending_inputs":
+            query = "INSERT OR REPLACE INTO pending_inputs (user_id, kind, group_id, created_at) VALUES (?, ?, ?, ?)"
+            rows = [(doc["_id"], doc["kind"], doc.get("group_id"), _to_text(doc.get("created_at"))) for doc in documents]
+        elif collection == "fed_bans":
+            query = "INSERT OR REPLACE INTO fed_bans (federation_id, user_id, reason, banned_by, banned_at) VALUES (?, ?, ?, ?, ?)"
+            rows = [
+                (doc["federation_id"], doc["user_id"], doc.get("reason"), doc.get("banned_by"), _to_text(doc.get("banned_at")))
+                for doc in documents
+            ]
+        elif collection == "jobs":
+            query = "INSERT OR REPLACE INTO jobs (id, kind, due_at, chat_id, user_id, payload, attempts) VALUES (?, ?, ?, ?, ?, ?, ?)"
+            rows = [
+                (doc["_id"], doc["kind"], _to_text(doc["due_at"]), doc["chat_id"], doc.get("user_id"),
+                 _dumps(doc["payload"]) if doc.get("payload") is not None else None, doc.get("attempts", 0))
+                for doc in documents
+            ]
+        else:
+            raise ValueError(f"Unknown collection {collection!r}")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(query, rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            for collection in COLLECTIONS:
+                self._conn.execute(f"DELETE FROM {collection}")
@@ -0,0 +1,86 @@
+# warn_ladder.py
+#
+# चेतावनी की सीढ़ी: कितनी चेतावनियों पर कौन सी कार्रवाई हो। ग्रुप डॉक्युमेंट में "warn_ladder" के रूप में:
+#   [{"at": 3, "action": "mute", "duration": 3600}, {"at": 5, "action": "mute", "duration": 86400}, {"at": 7, "action": "ban"}]
+# आखिरी पायदान पर पहुँचते ही गिनती शून्य हो जाती है। सीढ़ी न हो तो warn_limit पर बैन (पुराना व्यवहार)।
+
+LADDER_ACTIONS = ("mute", "kick", "ban")
+LADDER_MAX_STEPS = 10
+ACTION_LABELS = {"mute": "म्यूट", "kick": "किक", "ban": "बैन"}
+
+_DURATION_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> int:
+    """Seconds in ``30m``, ``1h`` or ``7d`` (a bare number is minutes)."""
+    text = text.strip().lower()
+    unit = _DURATION_UNITS.get(text[-1:]) if text[-1:].isalpha() else 60
+    number = text[:-1] if text[-1:].isalpha() else text
+    if unit is None or not number.isdigit() or int(number) <= 0:
+        raise ValueError(f"अमान्य अवधि: `{text}` (उदाहरण: `30m`, `1h`, `7d`)")
+    return int(number) * unit
+
+
+def format_duration(seconds: int) -> str:
+    if seconds % 86400 == 0:
+        return f"{seconds // 86400} दिन"
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600} घंटे"
+    return f"{seconds // 60} मिनट"
+
+
+def parse_ladder(args: list[str]) -> list[dict]:
+    """
+    Parses ``/setwarnladder`` arguments such as ``3:mute:1h 5:mute:1d 7:ban``.
+
+    Raises ValueError with a message for the user if a step is malformed or
+    the counts do not increase.
+    """
+    if not args:
+        raise ValueError("कम से कम एक पायदान दें।")
+    if len(args) > LADDER_MAX_STEPS:
+        raise ValueError(f"सीढ़ी में अधिकतम {LADDER_MAX_STEPS} पायदान हो सकते हैं।")
+    ladder = []
+    for arg in args:
+        parts = arg.lower().split(":")
+        if len(parts) not in (2, 3) or not parts[0].isdigit() or parts[1] not in LADDER_ACTIONS:
+            raise ValueError(f"अमान्य पायदान: `{arg}` (उदाहरण: `3:mute:1h`, `5:kick`, `7:ban`)")
+        step = {"at": int(parts[0]), "action": parts[1]}
+        if step["action"] == "mute":
+            step["duration"] = parse_duration(parts[2]) if len(parts) == 3 else 3600
+        elif len(parts) == 3:
+            raise ValueError(f"अवधि सिर्फ़ म्यूट के लिए दी जा सकती है: `{arg}`")
+        if step["at"] < 1 or (ladder and step["at"] <= ladder[-1]["at"]):
+            raise ValueError("चेतावनियों की संख्या 1 से शुरू होकर हर पायदान पर बढ़नी चाहिए।")
+        ladder.append(step)
+    return ladder
+
+
+def ladder_for(group_data: dict) -> list[dict]:
+    """The group's ladder, or a single ban step at its ``warn_limit``."""
+    return group_data.get("warn_ladder") or [{"at": group_data.get("warn_limit", 3), "action": "ban"}]
+
+
+def step_for(ladder: list[dict], count: int) -> dict | None:
+    """
+    The step a user reaches with ``count`` warns, if any.
+
+    Intermediate steps apply only at their exact count; the last one at or
+    above it, so a user past a lowered limit is still escalated.
+    """
+    if count >= ladder[-1]["at"]:
+        return ladder[-1]
+    for step in ladder[:-1]:
+        if step["at"] == count:
+            return step
+    return None
+
+
+def format_ladder(ladder: list[dict]) -> str:
+    lines = []
+    for step in ladder:
+        text = f"  • {step['at']} चेतावनी: {ACTION_LABELS[step['action']]}"
+        if step["action"] == "mute":
+            text += f" ({format_duration(step['duration'])})"
+        lines.append(text)
+    return "\n".join(lines)